@@ -0,0 +1,103 @@
+import gc
+import math
+import platform
+import statistics
+import time
+import tracemalloc
+
+import django
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test.utils import CaptureQueriesContext
+
+PERCENTILES = (50, 90, 95, 99)
+
+
+def percentile(samples, rank):
+    """Перцентиль методом ближайшего ранга по отсортированной выборке."""
+    ordered = sorted(samples)
+    index = max(math.ceil(rank / 100 * len(ordered)) - 1, 0)
+    return ordered[index]
+
+
+def summarize(samples):
+    """Сводка по замерам времени в миллисекундах."""
+    summary = {
+        'min': min(samples),
+        'max': max(samples),
+        'mean': statistics.mean(samples),
+        'stdev': statistics.stdev(samples) if len(samples) > 1 else 0.0,
+    }
+    for rank in PERCENTILES:
+        summary[f'p{rank}'] = percentile(samples, rank)
+    return {key: round(value, 3) for key, value in summary.items()}
+
+
+class Benchmark:
+    """
+    Замеры в духе pytest-benchmark: прогрев, затем rounds вызовов
+    с временем каждого, отдельный проход для запросов и памяти,
+    чтобы tracemalloc не искажал время.
+    """
+
+    def __init__(self, rounds=50, warmup=5, before_round=None,
+                 using=DEFAULT_DB_ALIAS):
+        self.rounds = rounds
+        self.warmup = warmup
+        self.before_round = before_round or (lambda: None)
+        self.using = using
+        self.results = {}
+
+    def __call__(self, name, func, *args, **kwargs):
+        for _ in range(self.warmup):
+            self.before_round()
+            func(*args, **kwargs)
+        samples = []
+        for _ in range(self.rounds):
+            self.before_round()
+            started = time.perf_counter()
+            func(*args, **kwargs)
+            samples.append((time.perf_counter() - started) * 1000)
+
+        self.before_round()
+        gc.collect()
+        with CaptureQueriesContext(connections[self.using]) as queries:
+            tracemalloc.start()
+            try:
+                func(*args, **kwargs)
+                _, peak = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+        self.results[name] = {
+            'rounds': self.rounds,
+            'latency_ms': summarize(samples),
+            'queries': len(queries),
+            'query_ms': round(sum(
+                float(query['time']) for query in queries.captured_queries
+            ) * 1000, 3),
+            'peak_memory_kb': round(peak / 1024, 1),
+        }
+        return self.results[name]
+
+
+def environment():
+    """Что нужно знать, сравнивая отчёты разных запусков."""
+    return {
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'database': connections[DEFAULT_DB_ALIAS].vendor,
+        'machine': platform.machine(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+    }
+
+
+def compare(current, baseline, metric='p50'):
+    """Изменение метрики latency по каждому замеру относительно базы, в %."""
+    changes = {}
+    for name, result in current.items():
+        if name not in baseline:
+            continue
+        before = baseline[name]['latency_ms'][metric]
+        after = result['latency_ms'][metric]
+        changes[name] = (round((after - before) / before * 100, 1)
+                         if before else None)
+    return changes
@@ -0,0 +1,84 @@
+import threading
+import time
+
+
+class FakeRedis:
+    """
+    Минимальная замена redis.Redis в памяти процесса: ровно те команды,
+    что нужны RedisCache. Клиенты с одним url делят одни данные,
+    как воркеры с одним сервером.
+    """
+    _servers = {}
+    _servers_lock = threading.Lock()
+
+    def __init__(self, store):
+        self._store = store
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_url(cls, url):
+        with cls._servers_lock:
+            store = cls._servers.setdefault(url, {})
+        return cls(store)
+
+    def _alive(self, key):
+        item = self._store.get(key)
+        if item is None:
+            return None
+        value, expires = item
+        if expires is not None and expires <= time.time():
+            del self._store[key]
+            return None
+        return item
+
+    def get(self, key):
+        with self._lock:
+            item = self._alive(key)
+            return None if item is None else item[0]
+
+    def set(self, key, value, ex=None, nx=False):
+        with self._lock:
+            if nx and self._alive(key) is not None:
+                return None
+            expires = None if ex is None else time.time() + ex
+            self._store[key] = (value, expires)
+            return True
+
+    def delete(self, *keys):
+        with self._lock:
+            return sum(
+                self._store.pop(key, None) is not None for key in keys
+            )
+
+    def exists(self, *keys):
+        with self._lock:
+            return sum(self._alive(key) is not None for key in keys)
+
+    def expire(self, key, seconds):
+        with self._lock:
+            item = self._alive(key)
+            if item is None:
+                return False
+            self._store[key] = (item[0], time.time() + seconds)
+            return True
+
+    def persist(self, key):
+        with self._lock:
+            item = self._alive(key)
+            if item is None:
+                return False
+            self._store[key] = (item[0], None)
+            return True
+
+    def incrby(self, key, amount):
+        with self._lock:
+            item = self._alive(key)
+            value, expires = item if item else (b'0', None)
+            value = int(value) + amount
+            self._store[key] = (str(value).encode(), expires)
+            return value
+
+    def flushdb(self):
+        with self._lock:
+            self._store.clear()
+        return True
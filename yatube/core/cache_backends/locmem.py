@@ -0,0 +1,14 @@
+from django.core.cache.backends.locmem import LocMemCache
+
+from .metrics import CacheMetricsMixin
+
+_missing = object()
+
+
+class LocMemMetricsCache(CacheMetricsMixin, LocMemCache):
+    """LocMemCache с метриками: для разработки и одного процесса."""
+
+    def get(self, key, default=None, version=None):
+        value = super().get(key, _missing, version)
+        self.record(key, value is not _missing)
+        return default if value is _missing else value
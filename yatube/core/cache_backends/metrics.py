@@ -0,0 +1,73 @@
+import re
+import threading
+from collections import Counter
+
+from .. import perf
+
+METRICS_PREFIX = 'cache_metrics'
+PREFIXES_KEY = f'{METRICS_PREFIX}:prefixes'
+FLUSH_EVERY = 100
+
+
+def key_prefix(key):
+    """Префикс ключа: всё до первого ':', '|' или '.'."""
+    return re.split(r'[:|.]', key, 1)[0] or key
+
+
+class CacheMetricsMixin:
+    """
+    Считает попадания и промахи по префиксам ключей.
+    Счётчики копятся в процессе и каждые FLUSH_EVERY обращений
+    сбрасываются в сам кэш, так что общий бэкенд видит сумму
+    по всем воркерам.
+    """
+    flush_every = FLUSH_EVERY
+
+    def _metrics_state(self):
+        if not hasattr(self, '_metrics_lock'):
+            self._metrics_lock = threading.Lock()
+            self._metrics_pending = Counter()
+        return self._metrics_lock
+
+    def record(self, key, hit):
+        prefix = key_prefix(key)
+        if prefix == METRICS_PREFIX:
+            return
+        perf.note_cache(hit)
+        with self._metrics_state():
+            self._metrics_pending[(prefix, 'hits' if hit else 'misses')] += 1
+            if sum(self._metrics_pending.values()) < self.flush_every:
+                return
+            pending, self._metrics_pending = self._metrics_pending, Counter()
+        self._flush_metrics(pending)
+
+    def flush_metrics(self):
+        with self._metrics_state():
+            pending, self._metrics_pending = self._metrics_pending, Counter()
+        self._flush_metrics(pending)
+
+    def _flush_metrics(self, pending):
+        if not pending:
+            return
+        prefixes = {prefix for prefix, _ in pending}
+        known = set(self.get(PREFIXES_KEY) or ())
+        if not prefixes <= known:
+            self.set(PREFIXES_KEY, sorted(known | prefixes), None)
+        for (prefix, kind), count in pending.items():
+            key = f'{METRICS_PREFIX}:{prefix}:{kind}'
+            if not self.add(key, count, None):
+                try:
+                    self.incr(key, count)
+                except ValueError:
+                    self.add(key, count, None)
+
+    def get_metrics(self):
+        """Возвращает {префикс: {'hits': n, 'misses': n}}."""
+        self.flush_metrics()
+        metrics = {}
+        for prefix in self.get(PREFIXES_KEY) or ():
+            metrics[prefix] = {
+                kind: self.get(f'{METRICS_PREFIX}:{prefix}:{kind}') or 0
+                for kind in ('hits', 'misses')
+            }
+        return metrics
@@ -0,0 +1,94 @@
+import pickle
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.utils.functional import cached_property
+from django.utils.module_loading import import_string
+
+from .metrics import CacheMetricsMixin
+
+
+class RedisCache(CacheMetricsMixin, BaseCache):
+    """
+    Кэш в Redis. Клиент задаётся OPTIONS['CLIENT_CLASS']
+    (по умолчанию redis.Redis, пакет ставится отдельно),
+    в тестах вместо него подставляется FakeRedis.
+    Целые числа хранятся как есть, чтобы incr делал INCRBY.
+    """
+
+    def __init__(self, server, params):
+        super().__init__(params)
+        self._server = server
+        options = params.get('OPTIONS', {})
+        self._client_class = options.get('CLIENT_CLASS', 'redis.Redis')
+
+    @cached_property
+    def _client(self):
+        return import_string(self._client_class).from_url(self._server)
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def _ttl(self, timeout):
+        if timeout == DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+        return None if timeout is None else int(timeout)
+
+    @staticmethod
+    def _dumps(value):
+        if type(value) is int:
+            return str(value).encode()
+        return pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def _loads(raw):
+        try:
+            return int(raw)
+        except ValueError:
+            return pickle.loads(raw)
+
+    def get(self, key, default=None, version=None):
+        raw = self._client.get(self._key(key, version))
+        self.record(key, raw is not None)
+        if raw is None:
+            return default
+        return self._loads(raw)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        ttl = self._ttl(timeout)
+        if ttl is not None and ttl <= 0:
+            self._client.delete(key)
+            return
+        self._client.set(key, self._dumps(value), ex=ttl)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        ttl = self._ttl(timeout)
+        if ttl is not None and ttl <= 0:
+            return False
+        return bool(self._client.set(
+            self._key(key, version), self._dumps(value), ex=ttl, nx=True
+        ))
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        ttl = self._ttl(timeout)
+        if ttl is None:
+            return bool(self._client.persist(key))
+        return bool(self._client.expire(key, ttl))
+
+    def delete(self, key, version=None):
+        return bool(self._client.delete(self._key(key, version)))
+
+    def has_key(self, key, version=None):
+        return bool(self._client.exists(self._key(key, version)))
+
+    def incr(self, key, delta=1, version=None):
+        key = self._key(key, version)
+        if not self._client.exists(key):
+            raise ValueError(f"Key '{key}' not found")
+        return self._client.incrby(key, delta)
+
+    def clear(self):
+        self._client.flushdb()
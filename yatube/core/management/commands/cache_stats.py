@@ -0,0 +1,30 @@
+import json
+
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = 'Показывает попадания и промахи кэша по префиксам ключей'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--alias', default='default')
+        parser.add_argument('--json', action='store_true')
+
+    def handle(self, *args, **options):
+        backend = caches[options['alias']]
+        if not hasattr(backend, 'get_metrics'):
+            raise CommandError(
+                f'Бэкенд {type(backend).__name__} не собирает метрики'
+            )
+        metrics = backend.get_metrics()
+        if options['json']:
+            self.stdout.write(json.dumps(metrics, indent=2, sort_keys=True))
+            return
+        for prefix, counts in sorted(metrics.items()):
+            total = counts['hits'] + counts['misses']
+            rate = counts['hits'] / total * 100 if total else 0
+            self.stdout.write(
+                f'{prefix:<30} hits={counts["hits"]:<8} '
+                f'misses={counts["misses"]:<8} hit rate={rate:.1f}%'
+            )
@@ -0,0 +1,44 @@
+import json
+import statistics
+
+from django.core.management.base import BaseCommand
+
+from core import overhead
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает время запуска и накладные расходы middleware '
+            'в настройках dev и prod')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--environments', nargs='+',
+                            default=['dev', 'prod'])
+        parser.add_argument('--processes', type=int, default=5,
+                            help='сколько свежих процессов на окружение')
+        parser.add_argument('--rounds', type=int, default=50)
+        parser.add_argument('--url', default=overhead.PROBE_URL)
+        parser.add_argument('--json', action='store_true')
+
+    def handle(self, *args, **options):
+        report = {}
+        for environment in options['environments']:
+            runs = [
+                overhead.measure(environment, options['rounds'],
+                                 options['url'])
+                for _ in range(options['processes'])
+            ]
+            report[environment] = {
+                key: statistics.median(run[key] for run in runs)
+                for key in runs[0]
+            }
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+        for environment, result in report.items():
+            self.stdout.write(
+                f'{environment:<5} import={result["import_ms"]:.1f} ms '
+                f'request={result["request_ms"]:.2f} ms '
+                f'middleware={result["middleware_overhead_ms"]:.2f} ms '
+                f'({result["middleware"]} шт., '
+                f'{result["installed_apps"]} приложений)'
+            )
@@ -0,0 +1,76 @@
+import json
+import logging
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from . import perf
+from .query_budget import format_queries, get_budget
+
+logger = logging.getLogger('yatube.query_budget')
+perf_logger = logging.getLogger('yatube.perf')
+
+
+class QueryBudgetMiddleware:
+    """
+    В режиме DEBUG считает SQL-запросы каждого запроса
+    и пишет предупреждение, если вьюшка вышла за свой лимит.
+    """
+
+    def __init__(self, get_response):
+        if not settings.DEBUG:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with CaptureQueriesContext(connection) as context:
+            response = self.get_response(request)
+        match = request.resolver_match
+        if match is None:
+            return response
+        limit = get_budget(match.view_name)
+        if limit is not None and len(context) > limit:
+            logger.warning(
+                '%s: %s запросов при лимите %s\n%s',
+                match.view_name, len(context), limit,
+                format_queries(context.captured_queries)
+            )
+        return response
+
+
+class PerfMiddleware:
+    """
+    Лёгкая инструментовка для продакшена: время запроса, число и время
+    SQL-запросов, время рендера шаблонов и обращения к кэшу. Каждый
+    запрос - одна JSON-строка в логгер yatube.perf; по url из
+    PERF_NAMESPACES копятся гистограммы для /admin/perf/.
+    """
+
+    def __init__(self, get_response):
+        if not settings.PERF_INSTRUMENTATION:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        perf.instrument_templates()
+
+    def __call__(self, request):
+        stats = perf.start()
+        try:
+            with connection.execute_wrapper(perf.sql_wrapper):
+                response = self.get_response(request)
+        finally:
+            perf.stop()
+        record = stats.as_dict()
+        match = request.resolver_match
+        view_name = match.view_name if match else None
+        perf_logger.info(json.dumps({
+            'view': view_name,
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            **record,
+        }))
+        if view_name and match.namespace in settings.PERF_NAMESPACES:
+            perf.histograms.add(view_name, record)
+        return response
@@ -0,0 +1,59 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+
+PROBE_URL = '/about/tech/'
+
+
+def _median_request_ms(client, url, rounds):
+    samples = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        client.get(url, REMOTE_ADDR='127.0.0.1')
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def probe(rounds, url=PROBE_URL):
+    """
+    Выполняется в свежем процессе: время импорта настроек, приложений
+    и URLconf, затем медиана запроса с MIDDLEWARE и без него.
+    """
+    started = time.perf_counter()
+    import django
+    django.setup()
+    from django.urls import get_resolver
+    get_resolver().url_patterns
+    import_ms = (time.perf_counter() - started) * 1000
+
+    from django.test import Client
+    from django.test.utils import override_settings
+    full_ms = _median_request_ms(Client(), url, rounds)
+    with override_settings(MIDDLEWARE=[]):
+        bare_ms = _median_request_ms(Client(), url, rounds)
+    return {
+        'import_ms': round(import_ms, 2),
+        'request_ms': round(full_ms, 3),
+        'bare_request_ms': round(bare_ms, 3),
+        'middleware_overhead_ms': round(full_ms - bare_ms, 3),
+        'middleware': len(settings.MIDDLEWARE),
+        'installed_apps': len(settings.INSTALLED_APPS),
+    }
+
+
+def measure(environment, rounds, url=PROBE_URL):
+    """Запускает probe в отдельном процессе с YATUBE_ENV=environment."""
+    env = dict(os.environ,
+               DJANGO_SETTINGS_MODULE=f'yatube.settings.{environment}')
+    code = ('import json, sys; from core.overhead import probe; '
+            f'print(json.dumps(probe({int(rounds)}, {url!r})))')
+    output = subprocess.run(
+        [sys.executable, '-c', code], cwd=settings.BASE_DIR, env=env,
+        check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
@@ -0,0 +1,203 @@
+import functools
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+
+PERF_PREFIX = 'perf'
+VIEWS_KEY = f'{PERF_PREFIX}:views'
+# верхние границы корзин гистограммы, мс; последняя - всё, что дольше
+BUCKETS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+LABELS = tuple(f'le_{bound}' for bound in BUCKETS) + ('le_inf',)
+COUNTERS = ('count', 'wall_us', 'sql_queries', 'sql_us', 'template_us',
+            'cache_hits', 'cache_misses')
+
+_local = threading.local()
+
+
+class RequestStats:
+    """Что успело набежать за время обработки одного запроса."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.sql_queries = 0
+        self.sql_seconds = 0.0
+        self.template_seconds = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.rendering = False
+
+    def as_dict(self):
+        return {
+            'wall_ms': round((time.perf_counter() - self.started) * 1000, 3),
+            'sql_queries': self.sql_queries,
+            'sql_ms': round(self.sql_seconds * 1000, 3),
+            'template_ms': round(self.template_seconds * 1000, 3),
+            'cache_hits': self.cache_hits,
+            'cache_misses': self.cache_misses,
+        }
+
+
+def current():
+    return getattr(_local, 'stats', None)
+
+
+def start():
+    _local.stats = RequestStats()
+    return _local.stats
+
+
+def stop():
+    _local.stats = None
+
+
+def note_cache(hit):
+    """Зовётся бэкендами кэша с метриками на каждом get."""
+    stats = current()
+    if stats is None:
+        return
+    if hit:
+        stats.cache_hits += 1
+    else:
+        stats.cache_misses += 1
+
+
+def sql_wrapper(execute, sql, params, many, context):
+    """execute_wrapper: считает запросы и их время без DEBUG-курсора."""
+    stats = current()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.sql_queries += 1
+        stats.sql_seconds += time.perf_counter() - started
+
+
+def instrument_templates():
+    """
+    Оборачивает render шаблонов бэкенда Django один раз на процесс.
+    Вложенные рендеры не суммируются повторно; ленивые запросы,
+    выполненные из шаблона, входят и во время шаблона.
+    """
+    from django.template.backends.django import Template
+    if getattr(Template.render, 'perf_instrumented', False):
+        return
+    original = Template.render
+
+    @functools.wraps(original)
+    def render(self, context=None, request=None):
+        stats = current()
+        if stats is None or stats.rendering:
+            return original(self, context, request)
+        stats.rendering = True
+        started = time.perf_counter()
+        try:
+            return original(self, context, request)
+        finally:
+            stats.template_seconds += time.perf_counter() - started
+            stats.rendering = False
+
+    render.perf_instrumented = True
+    Template.render = render
+
+
+def bucket_label(wall_ms):
+    for bound in BUCKETS:
+        if wall_ms <= bound:
+            return f'le_{bound}'
+    return 'le_inf'
+
+
+class Histograms:
+    """
+    Гистограммы времени по имени url. Как и метрики кэша, копятся
+    в процессе и раз в PERF_FLUSH_EVERY запросов сбрасываются
+    в общий кэш, чтобы эндпоинт видел сумму по всем воркерам.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = Counter()
+        self._requests = 0
+
+    def add(self, view_name, record):
+        with self._lock:
+            pending = self._pending
+            pending[(view_name, 'count')] += 1
+            pending[(view_name, bucket_label(record['wall_ms']))] += 1
+            pending[(view_name, 'wall_us')] += int(record['wall_ms'] * 1000)
+            pending[(view_name, 'sql_queries')] += record['sql_queries']
+            pending[(view_name, 'sql_us')] += int(record['sql_ms'] * 1000)
+            pending[(view_name, 'template_us')] += int(
+                record['template_ms'] * 1000
+            )
+            pending[(view_name, 'cache_hits')] += record['cache_hits']
+            pending[(view_name, 'cache_misses')] += record['cache_misses']
+            self._requests += 1
+            if self._requests < settings.PERF_FLUSH_EVERY:
+                return
+        self.flush()
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, Counter()
+            self._requests = 0
+        if not pending:
+            return
+        views = {view_name for view_name, _ in pending}
+        known = set(cache.get(VIEWS_KEY) or ())
+        if not views <= known:
+            cache.set(VIEWS_KEY, sorted(known | views), None)
+        for (view_name, field), value in pending.items():
+            key = f'{PERF_PREFIX}:{view_name}:{field}'
+            if not cache.add(key, value, None):
+                try:
+                    cache.incr(key, value)
+                except ValueError:
+                    cache.add(key, value, None)
+
+    def report(self):
+        """{имя url: сводка и корзины} по всем воркерам."""
+        self.flush()
+        report = {}
+        for view_name in cache.get(VIEWS_KEY) or ():
+            values = cache.get_many([
+                f'{PERF_PREFIX}:{view_name}:{field}'
+                for field in COUNTERS + LABELS
+            ])
+
+            def value(field):
+                return values.get(f'{PERF_PREFIX}:{view_name}:{field}', 0)
+
+            count = value('count')
+            if not count:
+                continue
+            report[view_name] = {
+                'count': count,
+                'mean_wall_ms': round(value('wall_us') / count / 1000, 3),
+                'mean_sql_queries': round(value('sql_queries') / count, 2),
+                'mean_sql_ms': round(value('sql_us') / count / 1000, 3),
+                'mean_template_ms': round(
+                    value('template_us') / count / 1000, 3
+                ),
+                'cache_hits': value('cache_hits'),
+                'cache_misses': value('cache_misses'),
+                'buckets': {label: value(label) for label in LABELS},
+            }
+        return report
+
+    def reset(self):
+        with self._lock:
+            self._pending = Counter()
+            self._requests = 0
+        for view_name in cache.get(VIEWS_KEY) or ():
+            cache.delete_many([f'{PERF_PREFIX}:{view_name}:{field}'
+                               for field in COUNTERS + LABELS])
+        cache.delete(VIEWS_KEY)
+
+
+histograms = Histograms()
@@ -0,0 +1,68 @@
+from contextlib import ContextDecorator
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def get_budget(view_name):
+    """Лимит запросов для вьюшки из settings.QUERY_BUDGETS."""
+    return settings.QUERY_BUDGETS.get(view_name)
+
+
+def format_queries(queries):
+    return '\n'.join(
+        f'{number}. {query["sql"]}'
+        for number, query in enumerate(queries, start=1)
+    )
+
+
+class query_budget(ContextDecorator):
+    """
+    Контекстный менеджер и декоратор: падает, если внутри
+    выполнено больше limit SQL-запросов.
+    """
+
+    def __init__(self, limit, label='', using=DEFAULT_DB_ALIAS):
+        self.limit = limit
+        self.label = label
+        self.using = using
+
+    def __enter__(self):
+        self.context = CaptureQueriesContext(connections[self.using])
+        self.context.__enter__()
+        return self.context
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.context.__exit__(exc_type, exc_value, traceback)
+        if exc_type is not None:
+            return False
+        executed = len(self.context)
+        if executed > self.limit:
+            raise QueryBudgetExceeded(
+                f'{self.label or "Блок"}: {executed} запросов '
+                f'при лимите {self.limit}\n'
+                f'{format_queries(self.context.captured_queries)}'
+            )
+        return False
+
+
+class QueryBudgetMixin:
+    """Примесь к TestCase с проверкой лимита запросов на url."""
+
+    def assertQueryBudget(self, url, limit=None, client=None,
+                          method='get', data=None):
+        client = client or self.client
+        view_name = resolve(url.split('?')[0]).view_name
+        if limit is None:
+            limit = get_budget(view_name)
+        if limit is None:
+            self.fail(f'Для {view_name} не задан QUERY_BUDGETS')
+        with query_budget(limit, label=f'{view_name} ({url})'):
+            response = getattr(client, method)(url, data)
+        return response
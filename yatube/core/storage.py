@@ -0,0 +1,109 @@
+import hashlib
+import os
+import posixpath
+import tempfile
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+
+CHUNK_SIZE = 64 * 1024
+TEMP_PREFIX = '.upload-'
+
+
+def addressed_name(directory, digest, extension):
+    """posts/ab/abcdef....png: первые два знака хэша - подкаталог."""
+    return posixpath.join(directory, digest[:2], digest + extension.lower())
+
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as source:
+        for chunk in iter(lambda: source.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def iter_files(root, directory=''):
+    """
+    (имя относительно root, os.DirEntry) всех файлов под directory.
+    os.scandir читает каталог потоком, тип файла приходит из самого
+    каталога без stat; временные файлы загрузок пропускаются.
+    """
+    stack = [directory]
+    while stack:
+        current = stack.pop()
+        try:
+            entries = os.scandir(os.path.join(root, current))
+        except FileNotFoundError:
+            continue
+        with entries:
+            for entry in entries:
+                name = posixpath.join(current, entry.name)
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(name)
+                elif (entry.is_file(follow_symlinks=False)
+                      and not entry.name.startswith(TEMP_PREFIX)):
+                    yield name, entry
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Файлы под CONTENT_ADDRESSED_PREFIXES хранятся под sha256 содержимого.
+    Хэш считается на лету, пока загрузка пишется во временный файл
+    рядом, затем файл атомарно переименовывается; если такой уже есть,
+    копия просто удаляется, а у имеющегося обновляется mtime.
+    Одинаковые картинки получают одно имя, а значит, и общий набор
+    миниатюр sorl. Остальные пути, в том числе миниатюры, у которых
+    sorl сам выбирает имя, сохраняются как обычно.
+    Файл может принадлежать нескольким постам и загрузке, пост которой
+    ещё не закоммичен, поэтому удаляет их только сборщик мусора,
+    и только файлы старше MEDIA_GC_MIN_AGE.
+    """
+
+    def _addressed(self, name):
+        """Каталог верхнего уровня для имён под хэшем или None."""
+        for prefix in settings.CONTENT_ADDRESSED_PREFIXES:
+            if name.startswith(prefix):
+                return prefix.rstrip('/')
+        return None
+
+    def get_available_name(self, name, max_length=None):
+        if self._addressed(name) is not None:
+            # имя всё равно заменит хэш, подбирать свободное незачем
+            return name
+        return super().get_available_name(name, max_length)
+
+    def _save(self, name, content):
+        directory = self._addressed(name)
+        if directory is None:
+            return super()._save(name, content)
+        os.makedirs(self.path(directory), exist_ok=True)
+        digest = hashlib.sha256()
+        descriptor, temp_path = tempfile.mkstemp(
+            prefix=TEMP_PREFIX, dir=self.path(directory)
+        )
+        try:
+            with os.fdopen(descriptor, 'wb') as temp:
+                for chunk in content.chunks(CHUNK_SIZE):
+                    digest.update(chunk)
+                    temp.write(chunk)
+            final = addressed_name(directory, digest.hexdigest(),
+                                   posixpath.splitext(name)[1])
+            final_path = self.path(final)
+            try:
+                # свежий mtime защищает файл от сборщика мусора,
+                # пока пост этой загрузки не закоммичен
+                os.utime(final_path)
+            except FileNotFoundError:
+                os.makedirs(os.path.dirname(final_path), exist_ok=True)
+                os.chmod(temp_path, self.file_permissions_mode or 0o644)
+                # одновременная загрузка того же файла перезапишет его
+                # тем же содержимым
+                os.replace(temp_path, final_path)
+            else:
+                os.remove(temp_path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        return final
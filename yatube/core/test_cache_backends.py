@@ -0,0 +1,78 @@
+import os
+import tempfile
+
+from django.test import SimpleTestCase
+
+from core.cache_backends.fake_redis import FakeRedis
+from core.cache_backends.redis import RedisCache
+from core.cache_backends.sqlite import SQLiteCache
+
+
+class SharedCacheContract:
+    """Общие проверки: два экземпляра бэкенда видят одни данные."""
+
+    def make_cache(self):
+        raise NotImplementedError
+
+    def setUp(self):
+        self.cache = self.make_cache()
+        self.other_worker = self.make_cache()
+        self.cache.clear()
+
+    def test_set_get_is_shared(self):
+        self.cache.set('index_page:first', {'html': 'x'})
+        self.assertEqual(self.other_worker.get('index_page:first'),
+                         {'html': 'x'})
+
+    def test_add_only_once(self):
+        self.assertTrue(self.cache.add('lock', 1))
+        self.assertFalse(self.other_worker.add('lock', 2))
+        self.assertEqual(self.cache.get('lock'), 1)
+
+    def test_incr_and_missing_key(self):
+        self.cache.set('version', 1, None)
+        self.assertEqual(self.other_worker.incr('version'), 2)
+        self.assertEqual(self.cache.get('version'), 2)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+
+    def test_delete_and_expired(self):
+        self.cache.set('gone', 1)
+        self.assertTrue(self.other_worker.delete('gone'))
+        self.cache.set('expired', 1, 0)
+        self.assertIsNone(self.cache.get('expired'))
+        self.assertTrue(self.cache.add('expired', 2))
+
+    def test_metrics_by_prefix(self):
+        self.cache.set('index_page:first', 'html')
+        self.cache.get('index_page:first')
+        self.cache.get('index_page:missing')
+        self.cache.get('sorl-thumbnail||image')
+        self.cache.flush_metrics()
+        metrics = self.other_worker.get_metrics()
+        self.assertEqual(metrics['index_page'], {'hits': 1, 'misses': 1})
+        self.assertEqual(metrics['sorl-thumbnail'], {'hits': 0, 'misses': 1})
+
+
+class SQLiteCacheTest(SharedCacheContract, SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.directory = tempfile.TemporaryDirectory()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.directory.cleanup()
+        super().tearDownClass()
+
+    def make_cache(self):
+        return SQLiteCache(os.path.join(self.directory.name, 'cache.db'), {})
+
+
+class RedisCacheTest(SharedCacheContract, SimpleTestCase):
+    def make_cache(self):
+        return RedisCache('redis://fake/0', {
+            'OPTIONS': {
+                'CLIENT_CLASS': f'{FakeRedis.__module__}.FakeRedis'
+            }
+        })
@@ -0,0 +1,55 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core import perf
+
+User = get_user_model()
+
+
+@override_settings(PERF_INSTRUMENTATION=True, PERF_FLUSH_EVERY=1)
+class PerfMiddlewareTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        perf.histograms.reset()
+
+    def test_request_is_logged_as_json(self):
+        with self.assertLogs('yatube.perf', 'INFO') as logs:
+            self.client.get(reverse('posts:index'))
+        record = json.loads(logs.records[-1].getMessage())
+        self.assertEqual(record['view'], 'posts:index')
+        self.assertEqual(record['status'], 200)
+        self.assertGreater(record['sql_queries'], 0)
+        self.assertGreater(record['template_ms'], 0)
+        self.assertGreater(record['cache_misses'], 0)
+        for field in ('wall_ms', 'sql_ms', 'cache_hits'):
+            self.assertIn(field, record)
+
+    def test_histograms_are_aggregated_per_url_name(self):
+        with self.assertLogs('yatube.perf', 'INFO'):
+            for _ in range(3):
+                self.client.get(reverse('posts:index'))
+            self.client.get(reverse('users:login'))
+            self.client.get(reverse('about:about_author'))
+        report = perf.histograms.report()
+        self.assertEqual(set(report), {'posts:index', 'users:login'})
+        self.assertEqual(report['posts:index']['count'], 3)
+        self.assertEqual(
+            sum(report['posts:index']['buckets'].values()), 3
+        )
+
+    def test_endpoint_is_admin_only(self):
+        url = reverse('perf_stats')
+        user = User.objects.create_user(username='perf_user')
+        self.client.force_login(user)
+        self.assertEqual(self.client.get(url).status_code, 302)
+        admin = User.objects.create_superuser('perf_admin', 'a@a.ru', 'x')
+        self.client.force_login(admin)
+        with self.assertLogs('yatube.perf', 'INFO'):
+            self.client.get(reverse('posts:index'))
+            data = self.client.get(url).json()
+        self.assertIn('posts:index', data['views'])
+        self.assertEqual(data['buckets_ms'], list(perf.BUCKETS))
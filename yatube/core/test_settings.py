@@ -0,0 +1,37 @@
+import importlib
+
+from django.conf import settings
+from django.test import SimpleTestCase
+
+from core import overhead
+
+
+class SettingsSplitTest(SimpleTestCase):
+    def test_debug_tooling_only_in_dev(self):
+        dev = importlib.import_module('yatube.settings.dev')
+        prod = importlib.import_module('yatube.settings.prod')
+        self.assertTrue(dev.DEBUG)
+        self.assertIn('debug_toolbar', dev.INSTALLED_APPS)
+        self.assertIn('debug_toolbar.middleware.DebugToolbarMiddleware',
+                      dev.MIDDLEWARE)
+        self.assertFalse(prod.DEBUG)
+        self.assertNotIn('debug_toolbar', prod.INSTALLED_APPS)
+        self.assertFalse(
+            any('debug_toolbar' in name for name in prod.MIDDLEWARE)
+        )
+
+    def test_tests_do_not_share_site_cache(self):
+        self.assertEqual(settings.CACHES['default']['BACKEND'],
+                         'core.cache_backends.locmem.LocMemMetricsCache')
+
+    def test_perf_instrumentation_off_in_tests(self):
+        self.assertFalse(settings.PERF_INSTRUMENTATION)
+
+    def test_overhead_probe_runs_in_fresh_process(self):
+        result = overhead.measure('prod', rounds=2)
+        self.assertEqual(
+            set(result),
+            {'import_ms', 'request_ms', 'bare_request_ms',
+             'middleware_overhead_ms', 'middleware', 'installed_apps'}
+        )
+        self.assertGreater(result['import_ms'], 0)
@@ -0,0 +1,48 @@
+import hashlib
+import os
+import tempfile
+
+from django.core.files.base import ContentFile
+from django.test import SimpleTestCase, override_settings
+
+from core.storage import ContentAddressedStorage, iter_files
+
+
+@override_settings(CONTENT_ADDRESSED_PREFIXES=('posts/',))
+class ContentAddressedStorageTest(SimpleTestCase):
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.storage = ContentAddressedStorage(location=tmp_dir.name)
+
+    def test_identical_uploads_share_one_file(self):
+        digest = hashlib.sha256(b'picture').hexdigest()
+        first = self.storage.save('posts/cat.PNG', ContentFile(b'picture'))
+        second = self.storage.save('posts/other.png',
+                                   ContentFile(b'picture'))
+        self.assertEqual(first, f'posts/{digest[:2]}/{digest}.png')
+        self.assertEqual(second, first)
+        third = self.storage.save('posts/cat.png', ContentFile(b'another'))
+        self.assertNotEqual(third, first)
+        files = sorted(name for name, _ in
+                       iter_files(self.storage.location, 'posts'))
+        self.assertEqual(files, sorted([first, third]))
+
+    def test_duplicate_upload_refreshes_mtime(self):
+        name = self.storage.save('posts/cat.png', ContentFile(b'picture'))
+        path = self.storage.path(name)
+        os.utime(path, (0, 0))
+        self.storage.save('posts/again.png', ContentFile(b'picture'))
+        self.assertGreater(os.path.getmtime(path), 0)
+
+    def test_derived_names_stay_flat(self):
+        original = self.storage.save('posts/cat.png', ContentFile(b'png'))
+        stem = os.path.splitext(original)[0]
+        converted = self.storage.save(stem + '.webp', ContentFile(b'webp'))
+        self.assertEqual(converted.count('/'), 2)
+
+    def test_other_paths_keep_their_names(self):
+        self.storage.save('cache/ab/thumb.jpg', ContentFile(b'thumb'))
+        name = self.storage.save('cache/ab/thumb.jpg', ContentFile(b'x'))
+        self.assertNotEqual(name, 'cache/ab/thumb.jpg')
+        self.assertTrue(name.startswith('cache/ab/thumb_'))
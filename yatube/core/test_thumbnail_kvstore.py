@@ -0,0 +1,85 @@
+import os
+import sqlite3
+import tempfile
+
+from django.test import SimpleTestCase, override_settings
+
+from core.thumbnail_kvstore import LRU, SQLiteKVStore
+
+
+class LRUTest(SimpleTestCase):
+    def test_evicts_least_recently_used(self):
+        lru = LRU(2)
+        lru.set('a', '1')
+        lru.set('b', '2')
+        lru.get('a')
+        lru.set('c', '3')
+        self.assertEqual((lru.get('a'), lru.get('b'), lru.get('c')),
+                         ('1', None, '3'))
+
+
+class SQLiteKVStoreTest(SimpleTestCase):
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.path = os.path.join(tmp_dir.name, 'thumbnails.sqlite3')
+        settings = override_settings(THUMBNAIL_KVSTORE_PATH=self.path,
+                                     THUMBNAIL_KVSTORE_LRU_SIZE=100,
+                                     THUMBNAIL_KVSTORE_PRELOAD=2)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.store = SQLiteKVStore()
+
+    def raw_delete(self, key):
+        with sqlite3.connect(self.path) as connection:
+            connection.execute('DELETE FROM kvstore WHERE key = ?', (key,))
+
+    def test_shared_between_workers(self):
+        self.store._set_raw('sorl-thumbnail||image||a', '{"size": [1, 1]}')
+        other_worker = SQLiteKVStore()
+        self.assertEqual(other_worker._get_raw('sorl-thumbnail||image||a'),
+                         '{"size": [1, 1]}')
+        self.assertIsNone(other_worker._get_raw('sorl-thumbnail||image||b'))
+
+    def test_repeated_reads_served_from_lru(self):
+        self.store._set_raw('sorl-thumbnail||image||a', 'value')
+        self.raw_delete('sorl-thumbnail||image||a')
+        self.assertEqual(self.store._get_raw('sorl-thumbnail||image||a'),
+                         'value')
+
+    def test_thumbnail_lists_always_read_from_file(self):
+        key = 'sorl-thumbnail||thumbnails||a'
+        self.store._set_raw(key, '["x"]')
+        SQLiteKVStore()._set_raw(key, '["x", "y"]')
+        self.assertEqual(self.store._get_raw(key), '["x", "y"]')
+
+    def test_preload_latest_keys_on_start(self):
+        for name in 'abc':
+            self.store._set_raw(f'sorl-thumbnail||image||{name}', name)
+        restarted = SQLiteKVStore()
+        self.assertIsNone(restarted._get_raw('sorl-thumbnail||image||x'))
+        self.assertEqual(len(restarted.lru), 2)
+        self.raw_delete('sorl-thumbnail||image||c')
+        self.assertEqual(restarted._get_raw('sorl-thumbnail||image||c'), 'c')
+
+    def test_find_delete_and_clear(self):
+        self.store._set_raw('sorl-thumbnail||image||a', 'a')
+        self.store._set_raw('sorl-thumbnail||image||b', 'b')
+        self.store._set_raw('other||image||c', 'c')
+        self.assertEqual(
+            sorted(self.store._find_keys_raw('sorl-thumbnail||image||')),
+            ['sorl-thumbnail||image||a', 'sorl-thumbnail||image||b']
+        )
+        self.store._delete_raw('sorl-thumbnail||image||a')
+        self.assertIsNone(self.store._get_raw('sorl-thumbnail||image||a'))
+        self.store.clear()
+        self.assertIsNone(self.store._get_raw('other||image||c'))
+
+    def test_follows_path_setting(self):
+        self.store._set_raw('sorl-thumbnail||image||a', 'a')
+        other_path = os.path.join(os.path.dirname(self.path), 'other.sqlite3')
+        with override_settings(THUMBNAIL_KVSTORE_PATH=other_path):
+            self.assertIsNone(self.store._get_raw('sorl-thumbnail||image||a'))
+            self.store.clear()
+        self.assertEqual(self.store._get_raw('sorl-thumbnail||image||a'),
+                         'a')
@@ -0,0 +1,158 @@
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from sorl.thumbnail.kvstores.base import KVStoreBase
+
+# списки миниатюр источника дописываются разными воркерами: из LRU
+# устаревший список перезаписал бы чужие ключи, их читаем из файла
+THUMBNAIL_LISTS = '||thumbnails||'
+
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS kvstore ('
+    'key TEXT PRIMARY KEY, value TEXT NOT NULL)'
+)
+
+
+class LRU:
+    """Ограниченный по числу записей словарь, потокобезопасный."""
+
+    def __init__(self, size):
+        self.size = size
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        if not self.size:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.size:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SQLiteKVStore(KVStoreBase):
+    """
+    Хранилище метаданных sorl-thumbnail в отдельном файле SQLite,
+    общем для всех воркеров на хосте и переживающем перезапуск.
+    Перед файлом стоит LRU в памяти процесса: записи sorl почти
+    не меняются, и повторные чтения обходятся без SQL.
+    При первом обращении LRU заполняется последними записанными
+    ключами (THUMBNAIL_KVSTORE_PRELOAD) одним запросом.
+    Удаление в одном процессе не чистит LRU других, поэтому удалять
+    стоит только записи файлов, на которые уже никто не ссылается.
+    Путь к файлу читается из настроек при каждом подключении:
+    override_settings в тестах уводит хранилище с рабочего файла.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._path = settings.THUMBNAIL_KVSTORE_PATH
+        self._local = threading.local()
+        self.lru = LRU(settings.THUMBNAIL_KVSTORE_LRU_SIZE)
+        self._preloaded = False
+
+    def _connection(self):
+        local = self._local
+        path = settings.THUMBNAIL_KVSTORE_PATH
+        if path != self._path:
+            # в LRU записи другого файла
+            self._path = path
+            self.lru.clear()
+            self._preloaded = False
+        if (getattr(local, 'pid', None), getattr(local, 'path', None)) != (
+                os.getpid(), path):
+            connection = sqlite3.connect(
+                path, timeout=5, isolation_level=None
+            )
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.execute(SCHEMA)
+            local.connection = connection
+            local.pid = os.getpid()
+            local.path = path
+        if not self._preloaded:
+            self._preloaded = True
+            self.preload(local.connection)
+        return local.connection
+
+    def preload(self, connection=None):
+        """
+        Поднимает в LRU последние записи: INSERT OR REPLACE выдаёт
+        строке новый rowid, так что свежие ключи - с конца таблицы.
+        """
+        limit = min(settings.THUMBNAIL_KVSTORE_PRELOAD, self.lru.size)
+        if not limit:
+            return 0
+        rows = (connection or self._connection()).execute(
+            'SELECT key, value FROM kvstore ORDER BY rowid DESC LIMIT ?',
+            (limit,)
+        ).fetchall()
+        for key, value in reversed(rows):
+            self._remember(key, value)
+        return len(rows)
+
+    def _remember(self, key, value):
+        if THUMBNAIL_LISTS not in key:
+            self.lru.set(key, value)
+
+    def _get_raw(self, key):
+        # подключение раньше LRU: оно же сбрасывает LRU при смене файла
+        connection = self._connection()
+        value = self.lru.get(key)
+        if value is not None:
+            return value
+        row = connection.execute(
+            'SELECT value FROM kvstore WHERE key = ?', (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        self._remember(key, row[0])
+        return row[0]
+
+    def _set_raw(self, key, value):
+        self._connection().execute(
+            'INSERT OR REPLACE INTO kvstore (key, value) VALUES (?, ?)',
+            (key, value)
+        )
+        self._remember(key, value)
+
+    def _delete_raw(self, *keys):
+        connection = self._connection()
+        connection.executemany('DELETE FROM kvstore WHERE key = ?',
+                               ((key,) for key in keys))
+        for key in keys:
+            self.lru.delete(key)
+
+    def _find_keys_raw(self, prefix):
+        return [key for key, in self._connection().execute(
+            'SELECT key FROM kvstore WHERE substr(key, 1, ?) = ?',
+            (len(prefix), prefix)
+        )]
+
+    def clear(self, delete_thumbnails=False):
+        if delete_thumbnails:
+            self.delete_all_thumbnail_files()
+        self._connection().execute('DELETE FROM kvstore')
+        self.lru.clear()
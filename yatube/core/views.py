@@ -1,5 +1,9 @@
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import JsonResponse
 from django.shortcuts import render
 
+from . import perf
+
 
 def page_not_found(request, exception):
     return render(request, 'core/404.html', {'path': request.path}, status=404)
@@ -15,3 +19,12 @@ def server_error(request):
 
 def permission_denied(request, exception):
     return render(request, 'core/403.html', status=403)
+
+
+@staff_member_required
+def perf_stats(request):
+    """Гистограммы времени ответа по именам url, только для админов."""
+    return JsonResponse({
+        'buckets_ms': list(perf.BUCKETS),
+        'views': perf.histograms.report(),
+    })
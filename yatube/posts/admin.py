@@ -1,5 +1,8 @@
+from django.conf import settings
 from django.contrib import admin
-from .models import Post, Group, Comment, Follow
+from .models import (Post, Group, Comment, Follow, Profile, Recommendation,
+                     ThumbnailJob, TimelineEntry)
+from .search import search_post_ids
 
 
 class PostAdmin(admin.ModelAdmin):
@@ -15,6 +18,13 @@ class PostAdmin(admin.ModelAdmin):
     empty_value_display = '-пусто-'
     list_editable = ('group',)
 
+    def get_search_results(self, request, queryset, search_term):
+        """Ищет через полнотекстовый индекс, а не LIKE по text."""
+        if not search_term:
+            return queryset, False
+        ids = search_post_ids(search_term, settings.SEARCH_ADMIN_LIMIT)
+        return queryset.filter(pk__in=ids), False
+
 
 class GroupAdmin(admin.ModelAdmin):
     list_display = (
@@ -50,7 +60,50 @@ class FollowAdmin(admin.ModelAdmin):
     )
 
 
+class ProfileAdmin(admin.ModelAdmin):
+    list_display = (
+        'user',
+        'post_count',
+        'follower_count',
+        'following_count'
+    )
+
+
+class ThumbnailJobAdmin(admin.ModelAdmin):
+    list_display = (
+        'post',
+        'image',
+        'status',
+        'attempts',
+        'created',
+        'claimed'
+    )
+    list_filter = ('status',)
+
+
+class TimelineEntryAdmin(admin.ModelAdmin):
+    list_display = (
+        'user',
+        'post',
+        'pub_date'
+    )
+
+
+class RecommendationAdmin(admin.ModelAdmin):
+    list_display = (
+        'user',
+        'rank',
+        'author',
+        'score'
+    )
+    raw_id_fields = ('user', 'author')
+
+
 admin.site.register(Post, PostAdmin)
 admin.site.register(Group, GroupAdmin)
 admin.site.register(Comment, CommentAdmin)
 admin.site.register(Follow, FollowAdmin)
+admin.site.register(Profile, ProfileAdmin)
+admin.site.register(ThumbnailJob, ThumbnailJobAdmin)
+admin.site.register(TimelineEntry, TimelineEntryAdmin)
+admin.site.register(Recommendation, RecommendationAdmin)
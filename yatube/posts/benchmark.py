@@ -0,0 +1,160 @@
+import random
+from contextlib import contextmanager
+from datetime import timedelta
+from itertools import accumulate, islice
+
+from django.contrib.auth.hashers import make_password
+from django.db.models import Count
+from django.urls import reverse
+from django.utils import timezone
+from faker import Faker
+
+from . import transfer
+from .models import Comment, Follow, Group, Post, User
+
+USERNAME_PREFIX = 'bench'
+DEFAULT_VOLUMES = {
+    'users': 200,
+    'groups': 10,
+    'posts': 5000,
+    'comments': 20000,
+    'follows': 20,
+}
+
+
+@contextmanager
+def keep_dates(model):
+    """
+    bulk_create вызывает pre_save, и auto_now/auto_now_add затёрли бы
+    сгенерированные даты; на время наполнения эти флаги снимаются.
+    Флаги общие для процесса: только для команды наполнения,
+    не для кода, который работает рядом с запросами.
+    """
+    fields = [field for field in model._meta.concrete_fields
+              if getattr(field, 'auto_now', False)
+              or getattr(field, 'auto_now_add', False)]
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def _insert(model, objects, batch_size):
+    objects = iter(objects)
+    batch = list(islice(objects, batch_size))
+    with keep_dates(model):
+        while batch:
+            model.objects.bulk_create(batch)
+            batch = list(islice(objects, batch_size))
+
+
+def seed(users, groups, posts, comments, follows, random_seed=0,
+         batch_size=1000):
+    """
+    Наполняет базу синтетикой через bulk_create, без сигналов и save().
+    Авторы выбираются по закону Ципфа: у немногих пишущих много постов,
+    как в живой ленте. Производные данные строятся в конце одним проходом.
+    """
+    fake = Faker('ru_RU')
+    fake.seed_instance(random_seed)
+    rnd = random.Random(random_seed)
+    now = timezone.now()
+
+    def moment():
+        return now - timedelta(seconds=rnd.uniform(0, 365 * 24 * 3600))
+
+    password = make_password(None)
+    _insert(User, (
+        User(username=f'{USERNAME_PREFIX}{number}', password=password,
+             first_name=fake.first_name(), last_name=fake.last_name())
+        for number in range(users)
+    ), batch_size)
+    user_ids = list(User.objects.filter(
+        username__startswith=USERNAME_PREFIX
+    ).values_list('pk', flat=True))
+    author_weights = list(accumulate(
+        1 / rank for rank in range(1, len(user_ids) + 1)
+    ))
+
+    _insert(Group, (
+        Group(title=fake.sentence(nb_words=2)[:200],
+              slug=f'{USERNAME_PREFIX}-{number}',
+              description=fake.paragraph())
+        for number in range(groups)
+    ), batch_size)
+    group_ids = list(Group.objects.filter(
+        slug__startswith=f'{USERNAME_PREFIX}-'
+    ).values_list('pk', flat=True)) + [None]
+
+    def make_post():
+        pub_date = moment()
+        return Post(text=fake.text(max_nb_chars=400), pub_date=pub_date,
+                    updated=pub_date, thumbnails_ready=True,
+                    author_id=rnd.choices(user_ids,
+                                          cum_weights=author_weights)[0],
+                    group_id=rnd.choice(group_ids))
+
+    _insert(Post, (make_post() for _ in range(posts)), batch_size)
+    post_ids = list(Post.objects.filter(
+        author_id__in=user_ids
+    ).values_list('pk', flat=True))
+
+    _insert(Comment, (
+        Comment(post_id=rnd.choice(post_ids), author_id=rnd.choice(user_ids),
+                text=fake.sentence(), created=moment())
+        for _ in range(comments if post_ids else 0)
+    ), batch_size)
+
+    _insert(Follow, (
+        Follow(user_id=user_id, author_id=author_id)
+        for user_id in user_ids
+        for author_id in rnd.sample(
+            [other for other in user_ids if other != user_id],
+            min(follows, len(user_ids) - 1)
+        )
+    ), batch_size)
+
+    transfer.rebuild_derived()
+    return {
+        'users': len(user_ids),
+        'groups': len(group_ids) - 1,
+        'posts': len(post_ids),
+        'comments': Comment.objects.filter(post_id__in=post_ids).count(),
+        'follows': Follow.objects.filter(user_id__in=user_ids).count(),
+    }
+
+
+def scenarios():
+    """
+    Замеряемые запросы: (имя, url, пользователь или None).
+    Для каждой вьюшки берётся самый тяжёлый случай из базы.
+    """
+    cases = [
+        ('index', reverse('posts:index'), None),
+        ('index_deep', reverse('posts:index') + '?page=50', None),
+        ('api_index', reverse('posts:api_index'), None),
+    ]
+    group = Group.objects.annotate(
+        total=Count('posts')
+    ).order_by('-total').first()
+    if group:
+        cases.append(('group_list', reverse('posts:group_list',
+                                            args=[group.slug]), None))
+    author = User.objects.order_by('-profile__post_count').first()
+    if author:
+        cases.append(('profile', reverse('posts:profile',
+                                         args=[author.username]), None))
+    post = Post.objects.order_by('-comment_count').first()
+    if post:
+        cases.append(('post_detail', reverse('posts:post_detail',
+                                             args=[post.pk]), None))
+    reader = User.objects.annotate(
+        total=Count('follower')
+    ).order_by('-total').first()
+    if reader:
+        cases.append(('follow_index', reverse('posts:follow_index'), reader))
+    return cases
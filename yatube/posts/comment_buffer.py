@@ -0,0 +1,238 @@
+import atexit
+import logging
+import queue
+import threading
+import time
+import uuid
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import (DatabaseError, close_old_connections, connection,
+                       transaction)
+from django.utils import timezone
+
+from . import counters, feed_cache, search
+from .models import Comment, Post
+
+logger = logging.getLogger('yatube.comment_buffer')
+
+PENDING_PREFIX = 'comment_buffer'
+PENDING_TIMEOUT = 60 * 10
+
+_queue = queue.Queue()
+_worker = None
+_worker_lock = threading.Lock()
+
+
+# у каждого ожидающего комментария свой ключ {префикс}:{номер},
+# номера выдаёт атомарный incr по ключу-счётчику {префикс}:seq: общий
+# список в одном ключе теряли бы одновременные запросы и поток записи.
+# {префикс}:low - номер, ниже которого в кэше записей уже нет
+def _pending_prefix(post_id, user_id):
+    return f'{PENDING_PREFIX}:{post_id}:{user_id}'
+
+
+def _seed(prefix):
+    # как у поколений feed_cache: старт от текущего времени, чтобы
+    # номера после вытеснения счётчика не совпали со старыми записями.
+    # Старые записи из кэша больше не читаются, но в очереди остаются
+    start = int(time.time() * 1000)
+    if cache.add(f'{prefix}:seq', start, PENDING_TIMEOUT):
+        cache.set(f'{prefix}:low', start + 1, PENDING_TIMEOUT)
+
+
+def _next_seq(prefix):
+    try:
+        return cache.incr(f'{prefix}:seq')
+    except ValueError:
+        # счётчика нет: первый комментарий или ключ истёк
+        _seed(prefix)
+        return cache.incr(f'{prefix}:seq')
+
+
+def _entry_key(entry):
+    prefix = _pending_prefix(entry['post_id'], entry['author_id'])
+    return f'{prefix}:{entry["seq"]}'
+
+
+def enabled():
+    return settings.COMMENT_WRITE_BUFFER
+
+
+def enqueue(post_id, author, text):
+    """
+    Ставит комментарий в очередь на запись вместо INSERT в запросе.
+    Пока он не записан, автор видит его из общего кэша,
+    так что после редиректа комментарий на месте на любом воркере.
+    Очередь живёт в памяти процесса: atexit дописывает её при обычной
+    остановке, но после SIGKILL или падения процесса всё, что ещё
+    не записано, теряется.
+    """
+    prefix = _pending_prefix(post_id, author.pk)
+    entry = {
+        'token': uuid.uuid4().hex,
+        'seq': _next_seq(prefix),
+        'post_id': post_id,
+        'author_id': author.pk,
+        'text': text,
+        'created': timezone.now(),
+    }
+    # счётчики должны пережить свои записи
+    cache.touch(f'{prefix}:seq', PENDING_TIMEOUT)
+    cache.touch(f'{prefix}:low', PENDING_TIMEOUT)
+    cache.set(_entry_key(entry), entry, PENDING_TIMEOUT)
+    _queue.put(entry)
+    if settings.COMMENT_BUFFER_THREAD:
+        _ensure_worker()
+    return entry
+
+
+def pending_entries(post_id, user):
+    """Ещё не записанные комментарии пользователя к посту, по порядку."""
+    if not user.is_authenticated:
+        return []
+    prefix = _pending_prefix(post_id, user.pk)
+    bounds = cache.get_many([f'{prefix}:low', f'{prefix}:seq'])
+    last = bounds.get(f'{prefix}:seq')
+    if not last:
+        return []
+    low = bounds.get(f'{prefix}:low', last)
+    found = cache.get_many([f'{prefix}:{seq}' for seq in
+                            range(low, last + 1)])
+    entries = sorted(found.values(), key=lambda entry: entry['seq'])
+    # записанные и забытые номера больше не читаем; последний номер
+    # оставляем: его запись может быть ещё на пути в кэш
+    first = entries[0]['seq'] if entries else last
+    if first > low:
+        cache.set(f'{prefix}:low', first, PENDING_TIMEOUT)
+    return entries
+
+
+def pending_token(entries):
+    """Отпечаток очереди пользователя для ETag страницы поста."""
+    return ','.join(entry['token'] for entry in entries)
+
+
+def pending_comments(entries, user, shown):
+    """
+    Comment из записей буфера, кроме тех, что уже есть среди shown.
+    Записанный комментарий остаётся в кэше, пока поток записи его
+    не забудет. Узнаём его по автору и тексту: created у строки
+    ставит auto_now_add при записи, так что оно не раньше, чем
+    у записи буфера; одна строка закрывает одну запись. Записи
+    надо прочитать раньше, чем shown из базы, иначе комментарий,
+    записанный между чтениями, не попадёт ни туда, ни сюда.
+    """
+    rows = list(shown)
+    comments = []
+    for entry in entries:
+        row = next((row for row in rows
+                    if row.author_id == entry['author_id']
+                    and row.text == entry['text']
+                    and row.created >= entry['created']), None)
+        if row is not None:
+            rows.remove(row)
+            continue
+        comments.append(Comment(post_id=entry['post_id'], author=user,
+                                text=entry['text'],
+                                created=entry['created']))
+    return comments
+
+
+def _drain(limit):
+    entries = []
+    while len(entries) < limit:
+        try:
+            entries.append(_queue.get_nowait())
+        except queue.Empty:
+            break
+    return entries
+
+
+def _after_insert(comments):
+    """То, что для одного комментария делают сигналы post_save."""
+    for post_id, added in Counter(
+            comment.post_id for comment in comments).items():
+        counters.change_comment_count(post_id, added)
+    for comment in comments:
+        search.index_comment(comment, created=True)
+
+
+def write(entries):
+    """
+    Пишет пачку одной короткой транзакцией и делает то же,
+    что сигналы при save(): счётчики, поисковый индекс, кэш ленты.
+    """
+    live_posts = set(Post.objects.filter(
+        pk__in={entry['post_id'] for entry in entries}
+    ).values_list('pk', flat=True))
+    comments = [
+        Comment(post_id=entry['post_id'], author_id=entry['author_id'],
+                text=entry['text'], created=entry['created'])
+        for entry in entries if entry['post_id'] in live_posts
+    ]
+    if comments:
+        with transaction.atomic():
+            if connection.features.can_return_ids_from_bulk_insert:
+                Comment.objects.bulk_create(comments)
+                _after_insert(comments)
+            else:
+                # SQLite не возвращает id из bulk_create, а они нужны
+                # поисковому индексу: по одной строке через save(),
+                # счётчики и индекс обновят сигналы
+                for comment in comments:
+                    comment.save()
+        feed_cache.bump_version('index_page')
+    _forget(entries)
+    return len(comments)
+
+
+def _forget(entries):
+    cache.delete_many([_entry_key(entry) for entry in entries])
+
+
+def flush(first=()):
+    """Записывает всё, что накопилось; возвращает число комментариев."""
+    written = 0
+    entries = list(first) + _drain(
+        settings.COMMENT_BUFFER_BATCH - len(first)
+    )
+    while entries:
+        for attempt in range(1, settings.COMMENT_BUFFER_RETRIES + 1):
+            try:
+                written += write(entries)
+                break
+            except DatabaseError:
+                if attempt == settings.COMMENT_BUFFER_RETRIES:
+                    logger.exception('Пачка из %s комментариев потеряна',
+                                     len(entries))
+                    _forget(entries)
+                    break
+                time.sleep(settings.COMMENT_BUFFER_INTERVAL * attempt)
+        entries = _drain(settings.COMMENT_BUFFER_BATCH)
+    return written
+
+
+def _run():
+    while True:
+        first = _queue.get()
+        # ждём, пока набежит пачка: одна транзакция вместо многих
+        time.sleep(settings.COMMENT_BUFFER_INTERVAL)
+        close_old_connections()
+        try:
+            flush([first])
+        except Exception:
+            logger.exception('Сбой записи комментариев')
+        finally:
+            close_old_connections()
+
+
+def _ensure_worker():
+    global _worker
+    with _worker_lock:
+        if _worker is None:
+            _worker = threading.Thread(target=_run, name='comment-buffer',
+                                       daemon=True)
+            _worker.start()
+            atexit.register(flush)
@@ -0,0 +1,68 @@
+from hashlib import md5
+
+from django.conf import settings
+from django.core.cache import cache
+from django.shortcuts import render
+from django.utils import timezone
+from django.utils.cache import (get_conditional_response,
+                                patch_cache_control, quote_etag)
+from django.utils.http import http_date
+
+from . import feed_cache
+
+FEED_PREFIX = 'index_page'
+
+
+def make_validators(last_modified, *extra):
+    """ETag из даты изменения и всего, от чего ещё зависит ответ."""
+    fingerprint = ':'.join([str(last_modified)] + [str(x) for x in extra])
+    return quote_etag(md5(fingerprint.encode()).hexdigest()), last_modified
+
+
+def feed_validators(*extra):
+    """
+    ETag и Last-Modified лент без запроса к базе: по поколению кэша
+    лент, которое сигналы сдвигают на любое изменение постов,
+    комментариев и групп. Last-Modified - момент, когда поколение
+    увидели впервые: он не раньше самого изменения, поэтому
+    If-Modified-Since не получит 304 на устаревшую копию.
+    """
+    version = feed_cache.get_version(FEED_PREFIX)
+    last_modified = cache.get_or_set(
+        f'{FEED_PREFIX}:modified:{version}', timezone.now,
+        settings.FEED_CACHE_TIMEOUT
+    )
+    return make_validators(last_modified, version, *extra)
+
+
+def not_modified(request, etag, last_modified):
+    """Ответ 304, если у клиента актуальная версия, иначе None."""
+    return get_conditional_response(
+        request,
+        etag=etag,
+        last_modified=last_modified and int(last_modified.timestamp())
+    )
+
+
+def set_validators(response, etag, last_modified):
+    """
+    Проставляет валидаторы. no-cache заставляет браузер
+    каждый раз переспрашивать, а не угадывать свежесть по дате.
+    """
+    response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def render_conditional(request, validators, template, get_context):
+    """
+    render() с условным GET: контекст собирается
+    и шаблон рендерится только если у клиента устаревшая версия.
+    """
+    etag, last_modified = validators
+    response = not_modified(request, etag, last_modified)
+    if response is None:
+        response = render(request, template, get_context())
+    return set_validators(response, etag, last_modified)
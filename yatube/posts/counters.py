@@ -0,0 +1,91 @@
+from django.db.models import Case, Count, F, OuterRef, Subquery, When
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+from .models import Comment, Follow, Post, Profile, User
+
+
+def _shift(queryset, field, delta, **extra):
+    return queryset.update(**{field: Greatest(F(field) + delta, 0)}, **extra)
+
+
+def change_post_count(author_id, delta):
+    """Сдвигает счётчик постов автора, создавая профиль при нужде."""
+    updated = _shift(Profile.objects.filter(user_id=author_id),
+                     'post_count', delta)
+    if not updated and delta > 0:
+        Profile.objects.get_or_create(
+            user_id=author_id,
+            defaults={
+                'post_count': Post.objects.filter(author_id=author_id).count()
+            }
+        )
+
+
+def profile_of(user):
+    """
+    Профиль со счётчиками. Пользователям, заведённым в обход
+    сигналов, создаёт его, посчитав счётчики по данным.
+    """
+    try:
+        return user.profile
+    except Profile.DoesNotExist:
+        pass
+    user.profile, _ = Profile.objects.get_or_create(user=user, defaults={
+        'post_count': Post.objects.filter(author=user).count(),
+        'follower_count': Follow.objects.filter(author=user).count(),
+        'following_count': Follow.objects.filter(user=user).count(),
+    })
+    return user.profile
+
+
+def change_comment_count(post_id, delta):
+    """
+    Сдвигает счётчик комментариев поста и его updated,
+    чтобы закэшированная карточка поста перестроилась.
+    """
+    # не Now(): в SQLite это CURRENT_TIMESTAMP с точностью до секунды
+    _shift(Post.objects.filter(pk=post_id), 'comment_count', delta,
+           updated=timezone.now())
+
+
+def change_follow_counts(user_id, author_id, delta):
+    """
+    Сдвигает число подписок читателя и подписчиков автора
+    одним UPDATE по двум профилям.
+    """
+    def shifted(field, owner_id):
+        return Case(
+            When(user_id=owner_id, then=Greatest(F(field) + delta, 0)),
+            default=F(field)
+        )
+    Profile.objects.filter(user_id__in=[user_id, author_id]).update(
+        following_count=shifted('following_count', user_id),
+        follower_count=shifted('follower_count', author_id)
+    )
+
+
+def _count_of(queryset, field):
+    return Coalesce(Subquery(
+        queryset.filter(**{field: OuterRef('pk')}).order_by()
+        .values(field).annotate(total=Count('pk')).values('total')
+    ), 0)
+
+
+def recount():
+    """
+    Пересчитывает все счётчики по данным. Нужен после записи
+    в обход сигналов, например после массового импорта.
+    """
+    Profile.objects.bulk_create(
+        [Profile(user_id=user_id) for user_id in User.objects.filter(
+            profile__isnull=True
+        ).values_list('pk', flat=True)],
+        ignore_conflicts=True
+    )
+    Profile.objects.update(
+        post_count=_count_of(Post.objects, 'author_id'),
+        follower_count=_count_of(Follow.objects, 'author_id'),
+        following_count=_count_of(Follow.objects, 'user_id')
+    )
+    Post.objects.update(comment_count=_count_of(Comment.objects, 'post_id'))
@@ -0,0 +1,60 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.safestring import mark_safe
+
+LOCK_TIMEOUT = 10
+
+
+def _version_key(prefix):
+    return f'{prefix}:version'
+
+
+def _initial_version():
+    # счётчик может вытесниться из кэша; старт от текущего времени
+    # не даёт ему совпасть с поколением уже лежащих фрагментов
+    return int(time.time() * 1000)
+
+
+def get_version(prefix):
+    """Текущее поколение кэша."""
+    version = cache.get(_version_key(prefix))
+    if version is None:
+        cache.add(_version_key(prefix), _initial_version(), None)
+        version = cache.get(_version_key(prefix), 0)
+    return version
+
+
+def bump_version(prefix):
+    """Делает все фрагменты с этим префиксом устаревшими."""
+    try:
+        cache.incr(_version_key(prefix))
+    except ValueError:
+        cache.add(_version_key(prefix), _initial_version(), None)
+
+
+def get_or_render(prefix, page_key, render):
+    """
+    Возвращает HTML фрагмента для страницы page_key.
+    Фрагмент хранится вместе с поколением, в котором он построен.
+    Если поколение устарело, пересчитывает только тот, кто взял
+    блокировку, остальные в это время отдают старый HTML.
+    """
+    version = get_version(prefix)
+    key = f'{prefix}:{page_key}'
+    entry = cache.get(key)
+    if entry is not None and entry[0] == version:
+        return mark_safe(entry[1])
+    lock_key = f'{key}:lock'
+    if not cache.add(lock_key, version, LOCK_TIMEOUT):
+        if entry is not None:
+            return mark_safe(entry[1])
+        return render()
+    try:
+        html = render()
+        cache.set(key, (version, str(html)),
+                  settings.FEED_CACHE_TIMEOUT)
+    finally:
+        cache.delete(lock_key)
+    return html
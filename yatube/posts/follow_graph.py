@@ -0,0 +1,74 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from . import feed_cache
+from .models import Follow, Profile
+
+PREFIX = 'follow_graph'
+
+
+def _key(user_id):
+    # поколение сбрасывается после записи в обход сигналов (импорт)
+    return f'{PREFIX}:{feed_cache.get_version(PREFIX)}:{user_id}'
+
+
+def following_ids(user_id):
+    """Множество id авторов, на которых подписан пользователь."""
+    key = _key(user_id)
+    ids = cache.get(key)
+    if ids is None:
+        ids = frozenset(Follow.objects.filter(
+            user_id=user_id
+        ).values_list('author_id', flat=True))
+        cache.set(key, ids, settings.FOLLOW_GRAPH_TIMEOUT)
+    return ids
+
+
+def is_following(user, authors):
+    """
+    Пакетная проверка подписки: id тех из authors (пользователей
+    или id), на кого подписан user. Одно обращение к кэшу на весь список.
+    """
+    if not user.is_authenticated:
+        return frozenset()
+    author_ids = {getattr(author, 'pk', author) for author in authors}
+    return following_ids(user.pk) & author_ids
+
+
+def follows(user, author):
+    """Подписан ли user на одного автора."""
+    return bool(is_following(user, [author]))
+
+
+def counts(user_ids):
+    """
+    {id: (подписчиков, подписок)} одним запросом по счётчикам профиля.
+    Там, где профиль уже подгружен через select_related, проще брать
+    profile.follower_count и profile.following_count напрямую.
+    """
+    found = {
+        user_id: (followers, following)
+        for user_id, followers, following in Profile.objects.filter(
+            user_id__in=user_ids
+        ).values_list('user_id', 'follower_count', 'following_count')
+    }
+    return {user_id: found.get(user_id, (0, 0)) for user_id in user_ids}
+
+
+def forget(user_id):
+    """
+    Сбрасывает множество после подписки или отписки. Не правим его
+    на месте: две одновременные подписки затёрли бы друг друга.
+    Второй сброс после коммита убирает то, что соседний запрос успел
+    закэшировать по ещё не закоммиченным данным; на совсем неудачный
+    случай множество живёт не дольше FOLLOW_GRAPH_TIMEOUT.
+    """
+    key = _key(user_id)
+    cache.delete(key)
+    transaction.on_commit(lambda: cache.delete(key))
+
+
+def reset():
+    """Забывает все закэшированные множества разом."""
+    feed_cache.bump_version(PREFIX)
@@ -1,4 +1,7 @@
 from django import forms
+from django.core.files.uploadedfile import UploadedFile
+
+from . import images
 from .models import Post, Comment
 
 
@@ -17,6 +20,15 @@ class PostForm(forms.ModelForm):
             'group': 'Без группы'
         }
 
+    def clean_image(self):
+        image = self.cleaned_data['image']
+        if isinstance(image, UploadedFile):
+            (self.instance.image_width,
+             self.instance.image_height) = images.validate_upload(image)
+        elif not image:
+            self.instance.image_width = self.instance.image_height = None
+        return image
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
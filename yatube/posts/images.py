@@ -0,0 +1,138 @@
+import json
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps, features
+from sorl.thumbnail import get_thumbnail
+
+EXTENSIONS = {'WEBP': '.webp', 'JPEG': '.jpg'}
+# то, что браузеры показывают и без перекодирования
+KEPT_FORMATS = ('JPEG', 'WEBP')
+MIME_TYPES = {'WEBP': 'image/webp', 'JPEG': 'image/jpeg'}
+
+
+def target_format():
+    """IMAGE_FORMAT, если Pillow собран с его поддержкой, иначе JPEG."""
+    if settings.IMAGE_FORMAT == 'WEBP' and not features.check('webp'):
+        return 'JPEG'
+    return settings.IMAGE_FORMAT
+
+
+def validate_upload(upload):
+    """
+    Дешёвые проверки загрузки до сохранения: вес файла и размеры
+    из заголовка картинки, пиксели не декодируются.
+    Возвращает (ширина, высота).
+    """
+    if upload.size > settings.IMAGE_MAX_UPLOAD_SIZE:
+        raise ValidationError(
+            'Файл больше %(limit)s МБ',
+            code='file_too_big',
+            params={'limit': settings.IMAGE_MAX_UPLOAD_SIZE // 2 ** 20}
+        )
+    # ImageField формы уже открыл картинку и оставил её в upload.image
+    image = getattr(upload, 'image', None)
+    if image is None:
+        upload.seek(0)
+        with Image.open(upload) as image:
+            size = image.size
+    else:
+        size = image.size
+    width, height = size
+    if width * height > settings.IMAGE_MAX_PIXELS:
+        raise ValidationError(
+            'Картинка %(width)sx%(height)s слишком большая',
+            code='too_many_pixels',
+            params={'width': width, 'height': height}
+        )
+    return width, height
+
+
+def _flatten(image, image_format):
+    if image.mode == 'P' and 'transparency' in image.info:
+        image = image.convert('RGBA')
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'A' in image.mode else 'RGB')
+    if image.mode == 'RGBA' and image_format == 'JPEG':
+        background = Image.new('RGB', image.size, 'white')
+        background.paste(image, mask=image.getchannel('A'))
+        image = background
+    return image
+
+
+def normalize(name, storage=default_storage):
+    """
+    Приводит оригинал к виду для раздачи: не больше IMAGE_MAX_SIDE
+    по длинной стороне и в формате target_format(). Подходящий файл
+    и анимация не трогаются. Возвращает (имя, ширина, высота);
+    старый файл остаётся сборщику мусора.
+    """
+    side = settings.IMAGE_MAX_SIDE
+    image_format = target_format()
+    with storage.open(name) as source, Image.open(source) as image:
+        too_big = max(image.size) > side
+        if getattr(image, 'is_animated', False) or (
+                not too_big and image.format in KEPT_FORMATS):
+            return (name,) + image.size
+        # JPEG умеет уменьшать при декодировании, это в разы быстрее
+        image.draft('RGB', (side, side))
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((side, side), Image.LANCZOS)
+        image = _flatten(image, image_format)
+        buffer = BytesIO()
+        image.save(buffer, image_format, quality=settings.IMAGE_QUALITY,
+                   optimize=True)
+    stem = os.path.splitext(name)[0]
+    new_name = storage.save(stem + EXTENSIONS[image_format],
+                            ContentFile(buffer.getvalue()))
+    return (new_name,) + image.size
+
+
+def variant_formats():
+    return [image_format for image_format in settings.IMAGE_VARIANT_FORMATS
+            if image_format != 'WEBP' or features.check('webp')]
+
+
+def build_variants(image, width=None):
+    """
+    Режет все варианты из IMAGE_VARIANTS во всех форматах и возвращает
+    манифест {набор: {формат: [[имя, ширина, высота], ...]}} по
+    возрастанию ширины. Ширины больше оригинала (width) пропускаются:
+    растянутая картинка тяжелее и не чётче.
+    """
+    manifest = {}
+    for name, variant in settings.IMAGE_VARIANTS.items():
+        frame_width, frame_height = variant['geometry']
+        widths = [w for w in variant['widths'] if not width or w <= width]
+        widths = widths or variant['widths'][:1]
+        manifest[name] = {}
+        for image_format in variant_formats():
+            entries = {}
+            for w in widths:
+                thumbnail = get_thumbnail(
+                    image, f'{w}x{round(w * frame_height / frame_width)}',
+                    crop='center', upscale=False, format=image_format,
+                    quality=settings.IMAGE_QUALITY
+                )
+                entries.setdefault(thumbnail.width, [
+                    thumbnail.name, thumbnail.width, thumbnail.height
+                ])
+            manifest[name][image_format] = [entries[w] for w in
+                                            sorted(entries)]
+    return manifest
+
+
+def dump_variants(manifest):
+    return json.dumps(manifest, separators=(',', ':'))
+
+
+def parse_variants(raw):
+    return json.loads(raw) if raw else {}
+
+
+def load_variants(post):
+    return parse_variants(post.image_variants)
@@ -0,0 +1,130 @@
+import json
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import override_settings
+
+from core import benchmark
+from posts import benchmark as scenarios
+
+
+def isolated_caches(tmp_dir):
+    """
+    Кэш отдельно от рабочего: фрагменты синтетической базы не должны
+    пережить замер и попасть на настоящие страницы, а --cold
+    не должен чистить кэш работающего сайта. SQLite-кэш переезжает
+    во временный файл, redis и locmem - отдельной памятью процесса.
+    """
+    default = dict(settings.CACHES['default'])
+    if default['BACKEND'].endswith('SQLiteCache'):
+        default['LOCATION'] = os.path.join(tmp_dir, 'cache.sqlite3')
+    else:
+        # у locmem хранилище общее для одного LOCATION
+        default = dict(settings.CACHE_PRESETS['locmem'], LOCATION=tmp_dir)
+    return {'default': default}
+
+
+class Command(BaseCommand):
+    help = ('Наполняет отдельную тестовую базу синтетикой и замеряет '
+            'время, запросы и память списочных вьюшек')
+
+    def add_arguments(self, parser):
+        for name, default in scenarios.DEFAULT_VOLUMES.items():
+            parser.add_argument(f'--{name}', type=int, default=default)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--rounds', type=int, default=50)
+        parser.add_argument('--warmup', type=int, default=5)
+        parser.add_argument('--cold', action='store_true',
+                            help='чистить кэш перед каждым запросом')
+        parser.add_argument('--only', nargs='+', metavar='NAME',
+                            help='замерять только эти сценарии')
+        parser.add_argument('--existing', action='store_true',
+                            help='замерять текущую базу, ничего не создавая')
+        parser.add_argument('--output', help='куда сохранить отчёт JSON')
+        parser.add_argument('--compare', metavar='REPORT',
+                            help='отчёт прошлого запуска для сравнения p50')
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['compare']:
+            try:
+                with open(options['compare'], encoding='utf-8') as stream:
+                    baseline = json.load(stream)['results']
+            except (OSError, ValueError, KeyError) as error:
+                raise CommandError(f'Не прочитать отчёт: {error!r}')
+
+        old_name = None
+        tmp_dir = tempfile.mkdtemp(prefix='yatube-benchmark-')
+        # инструментовка добавила бы к замерам свою обёртку над SQL
+        harness = override_settings(
+            ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'],
+            PERF_INSTRUMENTATION=False
+        )
+        caches = override_settings(CACHES=isolated_caches(tmp_dir))
+        try:
+            if not options['existing']:
+                old_name = connection.settings_dict['NAME']
+                connection.creation.create_test_db(
+                    verbosity=0, autoclobber=True, serialize=False
+                )
+            with harness, caches:
+                report = self.run(options)
+        finally:
+            if old_name is not None:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+        for name, result in report['results'].items():
+            latency = result['latency_ms']
+            self.stdout.write(
+                f'{name:<14} p50={latency["p50"]:>8.2f} ms '
+                f'p95={latency["p95"]:>8.2f} ms '
+                f'p99={latency["p99"]:>8.2f} ms '
+                f'queries={result["queries"]:<3} '
+                f'memory={result["peak_memory_kb"]:.0f} KB'
+            )
+        if baseline is not None:
+            self.write_comparison(report['results'], baseline)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as stream:
+                json.dump(report, stream, indent=2, ensure_ascii=False)
+
+    def write_comparison(self, results, baseline):
+        for name, change in benchmark.compare(results, baseline).items():
+            if change is None:
+                # в базе p50 = 0, процент не посчитать
+                self.stdout.write(f'{name:<14} p50 n/a')
+                continue
+            style = self.style.ERROR if change > 0 else self.style.SUCCESS
+            self.stdout.write(style(f'{name:<14} p50 {change:+.1f}%'))
+
+    def run(self, options):
+        volumes = None
+        if not options['existing']:
+            volumes = scenarios.seed(
+                random_seed=options['seed'],
+                **{name: options[name] for name in scenarios.DEFAULT_VOLUMES}
+            )
+        before_round = cache.clear if options['cold'] else None
+        bench = benchmark.Benchmark(options['rounds'], options['warmup'],
+                                    before_round=before_round)
+        for name, url, user in scenarios.scenarios():
+            if options['only'] and name not in options['only']:
+                continue
+            client = Client()
+            if user is not None:
+                client.force_login(user)
+            bench(name, client.get, url)
+        return {
+            'environment': benchmark.environment(),
+            'volumes': volumes,
+            'options': {key: options[key]
+                        for key in ('seed', 'rounds', 'warmup', 'cold')},
+            'results': bench.results,
+        }
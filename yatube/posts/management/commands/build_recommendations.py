@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts import recommendations
+from posts.models import User
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает рекомендации авторов по совместным подпискам '
+            '(запускать по расписанию)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int)
+        parser.add_argument('--workers', type=int, default=1,
+                            help='процессов для расчёта оценок')
+        parser.add_argument('--chunk-size', type=int, default=500)
+        parser.add_argument('--max-neighbours', type=int)
+        parser.add_argument('--users', nargs='+', type=int, metavar='ID',
+                            help='только эти пользователи')
+
+    def handle(self, *args, **options):
+        user_ids = options['users'] or User.objects.filter(
+            is_active=True
+        ).order_by('pk').values_list('pk', flat=True).iterator()
+        started = time.monotonic()
+        done = recommendations.build(
+            user_ids, top=options['top'], workers=options['workers'],
+            chunk_size=options['chunk_size'],
+            max_neighbours=options['max_neighbours']
+        )
+        self.stdout.write(
+            f'Рекомендации пересчитаны для {done} пользователей '
+            f'за {time.monotonic() - started:.1f} с'
+        )
@@ -0,0 +1,30 @@
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from posts import media_dedup
+
+
+class Command(BaseCommand):
+    help = ('Находит одинаковые картинки постов, оставляет по одному '
+            'файлу под хэшем содержимого и считает освобождённое место')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--directory',
+            default=settings.CONTENT_ADDRESSED_PREFIXES[0].rstrip('/'),
+            help='каталог внутри MEDIA_ROOT'
+        )
+        parser.add_argument('--dry-run', action='store_true',
+                            help='только отчёт, ничего не менять')
+
+    def handle(self, *args, **options):
+        report = media_dedup.collapse(default_storage, options['directory'],
+                                      options['dry_run'])
+        prefix = 'Можно освободить' if options['dry_run'] else 'Освобождено'
+        self.stdout.write(
+            f'Групп копий: {report["groups"]}, лишних файлов: '
+            f'{report["files"]}, постов переключено: {report["posts"]}. '
+            f'{prefix}: {report["bytes"] / 2 ** 20:.2f} МБ '
+            f'({report["bytes"]} байт)'
+        )
@@ -0,0 +1,44 @@
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from posts.media_gc import Collector
+
+
+class Command(BaseCommand):
+    help = ('Удаляет оригиналы и миниатюры, на которые не ссылается '
+            'ни один пост; запускается по расписанию, за раз - '
+            'ограниченное время')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true',
+                            help='только показать, что было бы удалено')
+        parser.add_argument('--max-seconds', type=float,
+                            help='бюджет времени на запуск')
+        parser.add_argument('--batch-size', type=int)
+        parser.add_argument('--min-age', type=int,
+                            help='не трогать файлы моложе, секунд')
+        parser.add_argument('--restart', action='store_true',
+                            help='начать обход с начала')
+
+    def handle(self, *args, **options):
+        if options['restart']:
+            Collector.reset()
+
+        def report(name, size):
+            if options['verbosity'] > 1:
+                self.stdout.write(f'{name} ({size} байт)')
+
+        stats = Collector(
+            default_storage, dry_run=options['dry_run'],
+            max_seconds=options['max_seconds'],
+            batch_size=options['batch_size'], min_age=options['min_age'],
+            report=report
+        ).run()
+        verb = 'Можно удалить' if options['dry_run'] else 'Удалено'
+        state = ('обход завершён' if stats['done']
+                 else 'продолжится со следующего запуска')
+        self.stdout.write(
+            f'Просмотрено файлов: {stats["scanned"]}. {verb}: '
+            f'{stats["orphans"]} ({stats["bytes"] / 2 ** 20:.2f} МБ), '
+            f'{state}'
+        )
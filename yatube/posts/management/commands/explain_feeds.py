@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from posts.query_plans import (explain, feed_querysets, time_queryset,
+                               uses_full_scan)
+
+
+class Command(BaseCommand):
+    help = ('Печатает EXPLAIN QUERY PLAN и среднее время запросов '
+            'списочных вьюшек')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, default=1)
+        parser.add_argument('--group', type=int, default=1)
+        parser.add_argument('--post', type=int, default=1)
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('Команда рассчитана на SQLite')
+        querysets = feed_querysets(
+            options['user'], options['group'], options['post']
+        )
+        for view_name, queryset in querysets.items():
+            plan = explain(queryset)
+            elapsed = time_queryset(queryset, options['repeat'])
+            style = (self.style.ERROR if uses_full_scan(plan)
+                     else self.style.SUCCESS)
+            self.stdout.write(style(f'{view_name}: {elapsed:.2f} ms'))
+            for line in plan:
+                self.stdout.write(f'    {line}')
@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts import transfer
+
+
+class Command(BaseCommand):
+    help = ('Потоково выгружает группы, посты, комментарии и подписки '
+            'в NDJSON (*.gz - со сжатием)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--models', nargs='+',
+                            choices=list(transfer.MODELS),
+                            default=list(transfer.MODELS))
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        with transfer.open_dump(options['path'], 'w') as stream:
+            for name in transfer.MODELS:
+                if name not in options['models']:
+                    continue
+                started = time.monotonic()
+                written = transfer.export_model(
+                    stream, transfer.MODELS[name], options['chunk_size']
+                )
+                elapsed = time.monotonic() - started
+                self.stdout.write(
+                    f'{name}: {written} записей за {elapsed:.2f} с '
+                    f'({written / max(elapsed, 1e-6):.0f} зап/с)'
+                )
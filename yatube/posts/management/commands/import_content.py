@@ -0,0 +1,56 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError
+
+from posts import transfer
+
+
+class Command(BaseCommand):
+    help = ('Загружает NDJSON-дамп из export_content пачками; '
+            'после сбоя продолжает с последней загруженной пачки')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--models', nargs='+',
+                            choices=list(transfer.MODELS),
+                            default=list(transfer.MODELS))
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--checkpoint',
+                            help='файл контрольной точки '
+                                 '(по умолчанию <path>.checkpoint)')
+        parser.add_argument('--restart', action='store_true',
+                            help='игнорировать сохранённую контрольную точку')
+        parser.add_argument('--skip-rebuild', action='store_true',
+                            help='не пересчитывать счётчики, ленты и индекс')
+
+    def handle(self, *args, **options):
+        checkpoint = transfer.Checkpoint(
+            options['checkpoint'] or f'{options["path"]}.checkpoint'
+        )
+        if options['restart']:
+            checkpoint.remove()
+            checkpoint.last_ids = {}
+        importer = transfer.Importer(
+            options['batch_size'], checkpoint,
+            models=[transfer.MODELS[name] for name in options['models']],
+            report=self.report
+        )
+        try:
+            with transfer.open_dump(options['path'], 'r') as stream:
+                loaded = importer.run(transfer.read_records(stream))
+        except (OSError, ValueError, KeyError, DatabaseError) as error:
+            raise CommandError(
+                f'Импорт прерван: {error!r}. Повторный запуск продолжит '
+                f'с {checkpoint.last_ids or "начала"}'
+            )
+        if not options['skip_rebuild']:
+            transfer.rebuild_derived()
+        checkpoint.remove()
+        self.stdout.write(self.style.SUCCESS(
+            f'Загружено: {loaded}, пропущено: {importer.skipped}'
+        ))
+
+    def report(self, label, loaded, elapsed):
+        self.stdout.write(
+            f'{label}: {loaded} записей, {loaded / max(elapsed, 1e-6):.0f} '
+            'зап/с'
+        )
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from posts import search
+
+
+class Command(BaseCommand):
+    help = 'Перестраивает поисковый индекс постов и комментариев'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        backend = search.get_backend()
+        indexed = search.rebuild(options['chunk_size'])
+        self.stdout.write(
+            f'{type(backend).__name__}: проиндексировано {indexed} текстов'
+        )
@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts import thumbnails
+
+
+class Command(BaseCommand):
+    help = 'Обрабатывает очередь заданий на миниатюры'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true',
+                            help='разобрать очередь и выйти')
+        parser.add_argument('--batch', type=int, default=50)
+        parser.add_argument('--sleep', type=float, default=2.0)
+        parser.add_argument('--backfill', action='store_true',
+                            help='поставить в очередь старые картинки '
+                                 'без записанных размеров')
+
+    def handle(self, *args, **options):
+        if options['backfill']:
+            queued = thumbnails.backfill()
+            self.stdout.write(f'В очереди старых картинок: {queued}')
+        while True:
+            batch = list(thumbnails.pending_jobs()[:options['batch']])
+            for job_pk in batch:
+                try:
+                    if thumbnails.process(job_pk):
+                        self.stdout.write(f'Задание {job_pk}: готово')
+                except Exception as error:
+                    self.stderr.write(f'Задание {job_pk}: {error!r}')
+            if options['once'] and not batch:
+                return
+            if not batch:
+                time.sleep(options['sleep'])
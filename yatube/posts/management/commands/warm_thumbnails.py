@@ -0,0 +1,29 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts import thumbnails
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = ('Заполняет хранилище ключей sorl-thumbnail метаданными '
+            'картинок свежих постов')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int,
+                            default=settings.THUMBNAIL_WARM_POSTS,
+                            help='сколько свежих постов с картинками')
+
+    def handle(self, *args, **options):
+        posts = Post.objects.exclude(image='').order_by(
+            '-pub_date'
+        )[:options['posts']]
+        warmed = written = 0
+        for post in posts.iterator():
+            try:
+                written += thumbnails.warm(post)
+            except Exception as error:
+                self.stderr.write(f'Пост {post.pk}: {error!r}')
+                continue
+            warmed += 1
+        self.stdout.write(f'Постов: {warmed}, записано ключей: {written}')
@@ -0,0 +1,136 @@
+import os
+import posixpath
+import shutil
+from collections import defaultdict
+
+from django.db import transaction
+from django.utils import timezone
+from sorl.thumbnail import default
+from sorl.thumbnail.images import ImageFile
+
+from core.storage import addressed_name, file_digest, iter_files
+
+from . import feed_cache, images
+from .models import Post, ThumbnailJob
+
+
+def find_duplicates(storage, directory):
+    """
+    Группы одинаковых файлов под directory: {sha256: [имена]}.
+    Хэшируются только файлы совпадающего размера, остальные
+    копиями быть не могут.
+    """
+    by_size = defaultdict(list)
+    for name, entry in iter_files(storage.location, directory):
+        by_size[entry.stat().st_size].append(name)
+    groups = {}
+    for names in by_size.values():
+        if len(names) < 2:
+            continue
+        by_digest = defaultdict(list)
+        for name in names:
+            by_digest[file_digest(storage.path(name))].append(name)
+        groups.update((digest, sorted(same))
+                      for digest, same in by_digest.items() if len(same) > 1)
+    return groups
+
+
+def _variant_names(raw):
+    manifest = images.parse_variants(raw)
+    return {name for formats in manifest.values()
+            for entries in formats.values() for name, _, _ in entries}
+
+
+def _size(storage, name):
+    try:
+        return os.path.getsize(storage.path(name))
+    except OSError:
+        return 0
+
+
+def _place(storage, source, target):
+    """
+    Жёсткая ссылка (или копия) source под именем target.
+    True, если target создан здесь, а не существовал раньше.
+    """
+    target_path = storage.path(target)
+    os.makedirs(os.path.dirname(target_path), exist_ok=True)
+    try:
+        os.link(storage.path(source), target_path)
+    except FileExistsError:
+        return False
+    except OSError:
+        shutil.copy2(storage.path(source), target_path)
+    return True
+
+
+def collapse_group(storage, directory, digest, names, dry_run=False):
+    """
+    Оставляет от группы один файл под именем из хэша и переключает
+    на него посты. Манифест вариантов берётся у одного из постов,
+    миниатюры остальных удаляются. Возвращает (файлов, постов, байт).
+    """
+    canonical = addressed_name(directory, digest,
+                               posixpath.splitext(names[0])[1])
+    keeper = canonical if canonical in names else names[0]
+    extras = [name for name in names if name != keeper]
+    reclaimed = _size(storage, keeper) * len(extras)
+    # манифест берётся у поста с оставляемым файлом, если он есть
+    posts = sorted(
+        Post.objects.filter(image__in=names).values_list(
+            'pk', 'image', 'image_variants'
+        ),
+        key=lambda row: (row[1] != keeper, row[0])
+    )
+    kept = next((variants for _, _, variants in posts if variants), None)
+    kept_names = _variant_names(kept)
+    stale = set()
+    for _, _, variants in posts:
+        if variants and variants != kept:
+            stale |= _variant_names(variants) - kept_names
+    reclaimed += sum(_size(default.storage, name) for name in stale)
+    moved = sum(image != canonical for _, image, _ in posts)
+    if dry_run:
+        return len(extras), moved, reclaimed
+
+    # старые имена удаляются только после коммита: пока UPDATE
+    # не прошёл, посты ссылаются на них
+    created = keeper != canonical and _place(storage, keeper, canonical)
+    try:
+        with transaction.atomic():
+            Post.objects.filter(image__in=names).update(
+                image=canonical, image_variants=kept,
+                updated=timezone.now()
+            )
+            ThumbnailJob.objects.filter(
+                image__in=names, status=ThumbnailJob.PENDING
+            ).update(image=canonical)
+    except Exception:
+        if created:
+            storage.delete(canonical)
+        raise
+    for name in set(names) - {canonical}:
+        storage.delete(name)
+    for name in set(names) - {canonical}:
+        default.kvstore.delete(ImageFile(name, storage),
+                               delete_thumbnails=False)
+    for name in stale:
+        default.storage.delete(name)
+        default.kvstore.delete(ImageFile(name, default.storage),
+                               delete_thumbnails=False)
+    return len(extras), moved, reclaimed
+
+
+def collapse(storage, directory, dry_run=False):
+    """Ищет и схлопывает копии; сводка для отчёта команды."""
+    report = {'groups': 0, 'files': 0, 'posts': 0, 'bytes': 0}
+    for digest, names in find_duplicates(storage, directory).items():
+        files, posts, reclaimed = collapse_group(storage, directory,
+                                                 digest, names, dry_run)
+        report['groups'] += 1
+        report['files'] += files
+        report['posts'] += posts
+        report['bytes'] += reclaimed
+    if report['posts'] and not dry_run:
+        feed_cache.bump_version('index_page')
+    return report
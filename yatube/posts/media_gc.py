@@ -0,0 +1,220 @@
+import os
+import posixpath
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from sorl.thumbnail import default
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import ImageFile
+
+from core.storage import TEMP_PREFIX
+
+from . import images
+from .models import Post, ThumbnailJob
+
+CURSOR_KEY = 'media_gc:cursor'
+LIVE_KEY = 'media_gc:live'
+ACTIVE_JOBS = (ThumbnailJob.PENDING, ThumbnailJob.RUNNING)
+
+
+def directories():
+    """Что обходит сборщик: оригиналы постов и миниатюры sorl."""
+    prefixes = settings.CONTENT_ADDRESSED_PREFIXES + (
+        sorl_settings.THUMBNAIL_PREFIX,
+    )
+    return sorted({prefix.rstrip('/') for prefix in prefixes})
+
+
+def _legacy_thumbnails(name, storage):
+    """Имена миниатюр, которые sorl записал для оригинала name."""
+    kvstore = default.kvstore
+    keys = kvstore._get(ImageFile(name, storage).key,
+                        identity='thumbnails') or ()
+    thumbnails = (kvstore._get(key) for key in keys)
+    return {thumbnail.name for thumbnail in thumbnails if thumbnail}
+
+
+def live_thumbnails(storage, after=0, limit=None):
+    """
+    Миниатюры, которые ещё могут понадобиться: файлы из манифестов
+    вариантов, а у постов без манифеста или с заданием в работе -
+    всё, что sorl нарезал для их картинки. Смотрит не больше limit
+    постов с pk после after; возвращает (имена, pk последнего
+    просмотренного поста или None, если посты кончились).
+    """
+    posts = list(Post.objects.exclude(image='').filter(
+        pk__gt=after
+    ).order_by('pk').values_list('pk', 'image', 'image_variants')[:limit])
+    busy = set(ThumbnailJob.objects.filter(
+        status__in=ACTIVE_JOBS, post_id__in=[pk for pk, _, _ in posts]
+    ).values_list('post_id', flat=True))
+    names = set()
+    for pk, image, variants in posts:
+        for formats in images.parse_variants(variants).values():
+            names.update(name for entries in formats.values()
+                         for name, _, _ in entries)
+        if not variants or pk in busy:
+            names |= _legacy_thumbnails(image, storage)
+    if limit is None or len(posts) < limit:
+        return names, None
+    return names, posts[-1][0]
+
+
+def _walk(root, directory, cursor):
+    """
+    Файлы по порядку ключей (каталог..., '', имя): сначала файлы
+    каталога, потом подкаталоги, всё по алфавиту. В памяти - список
+    одного каталога, дерево читается потоком через os.scandir.
+    Всё, что не дальше cursor, пропускается, а уже пройденные
+    поддеревья даже не читаются.
+    """
+    prefix = tuple(directory.split('/'))
+    if prefix < cursor[:len(prefix)]:
+        return
+    files, subdirectories = [], []
+    try:
+        entries = os.scandir(os.path.join(root, directory))
+    except FileNotFoundError:
+        return
+    with entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                subdirectories.append(entry.name)
+            elif entry.is_file(follow_symlinks=False):
+                files.append(entry)
+    for entry in sorted(files, key=lambda entry: entry.name):
+        key = prefix + ('', entry.name)
+        if key > cursor:
+            yield key, posixpath.join(directory, entry.name), entry
+    for name in sorted(subdirectories):
+        yield from _walk(root, posixpath.join(directory, name), cursor)
+
+
+class Collector:
+    """
+    Сборщик файлов, на которые никто не ссылается. Работает пачками
+    и не дольше max_seconds за запуск (хотя бы одна пачка); место
+    остановки - ключ последнего проверенного файла - хранится в общем
+    кэше, следующий запуск продолжает с него. Файлы моложе min_age
+    не трогаются: загрузка пишет файл раньше, чем коммитится пост.
+    """
+
+    def __init__(self, storage, dry_run=False, max_seconds=None,
+                 batch_size=None, min_age=None, report=None):
+        self.storage = storage
+        self.dry_run = dry_run
+        self.max_seconds = (settings.MEDIA_GC_MAX_SECONDS
+                            if max_seconds is None else max_seconds)
+        self.batch_size = batch_size or settings.MEDIA_GC_BATCH
+        self.min_age = (settings.MEDIA_GC_MIN_AGE
+                        if min_age is None else min_age)
+        self.report = report or (lambda name, size: None)
+        self.stats = {'scanned': 0, 'orphans': 0, 'bytes': 0,
+                      'done': False}
+        self._thumbnails = None
+        self._originals = tuple(settings.CONTENT_ADDRESSED_PREFIXES)
+
+    @staticmethod
+    def reset():
+        cache.delete_many([CURSOR_KEY, LIVE_KEY])
+
+    def _live(self, deadline):
+        """
+        Живые миниатюры, собранные пачками постов под тем же лимитом
+        времени. Недостроенное множество ждёт следующего запуска
+        в кэше; None - время вышло раньше, чем оно готово.
+        Множество годно, пока с начала сборки не прошло min_age:
+        миниатюры, нарезанные после начала, моложе порога и так
+        не удаляются.
+        """
+        if self._thumbnails is not None:
+            return self._thumbnails
+        state = None if self.dry_run else cache.get(LIVE_KEY)
+        if state is None or time.time() - state['started'] >= self.min_age:
+            state = {'started': time.time(), 'after': 0, 'names': set()}
+        while state['after'] is not None:
+            names, state['after'] = live_thumbnails(
+                self.storage, state['after'], self.batch_size
+            )
+            state['names'] |= names
+            if state['after'] is not None and time.monotonic() >= deadline:
+                if not self.dry_run:
+                    cache.set(LIVE_KEY, state, None)
+                return None
+        if not self.dry_run:
+            cache.set(LIVE_KEY, state, None)
+        self._thumbnails = state['names']
+        return self._thumbnails
+
+    def _referenced(self, names, deadline):
+        """Имена из names, на которые ссылаются; None - не успели."""
+        originals = [name for name in names
+                     if name.startswith(self._originals)]
+        found = set(Post.objects.filter(
+            image__in=originals
+        ).values_list('image', flat=True))
+        found.update(ThumbnailJob.objects.filter(
+            image__in=originals, status__in=ACTIVE_JOBS
+        ).values_list('image', flat=True))
+        if len(originals) < len(names):
+            live = self._live(deadline)
+            if live is None:
+                return None
+            found.update(name for name in names if name in live)
+        return found
+
+    def _sweep(self, batch, deadline):
+        """Удаляет сирот пачки; False, если ссылки не успели собрать."""
+        referenced = self._referenced([name for name, _ in batch], deadline)
+        if referenced is None:
+            return False
+        expired = time.time() - self.min_age
+        for name, entry in batch:
+            if name in referenced:
+                continue
+            try:
+                stat = entry.stat(follow_symlinks=False)
+            except FileNotFoundError:
+                continue
+            if stat.st_mtime > expired:
+                continue
+            self.stats['orphans'] += 1
+            self.stats['bytes'] += stat.st_size
+            self.report(name, stat.st_size)
+            if not self.dry_run:
+                self._remove(name)
+        return True
+
+    def _remove(self, name):
+        self.storage.delete(name)
+        if posixpath.basename(name).startswith(TEMP_PREFIX):
+            return
+        image = ImageFile(name, self.storage)
+        default.kvstore.delete(image, delete_thumbnails=False)
+        default.kvstore._delete(image.key, identity='thumbnails')
+
+    def run(self):
+        deadline = time.monotonic() + self.max_seconds
+        resume = () if self.dry_run else cache.get(CURSOR_KEY, ())
+        batch = []
+        for directory in directories():
+            for key, name, entry in _walk(self.storage.location, directory,
+                                          resume):
+                batch.append((name, entry))
+                self.stats['scanned'] += 1
+                if len(batch) < self.batch_size:
+                    continue
+                if not self._sweep(batch, deadline):
+                    return self.stats
+                batch = []
+                if not self.dry_run:
+                    cache.set(CURSOR_KEY, key, None)
+                if time.monotonic() >= deadline:
+                    return self.stats
+        if batch and not self._sweep(batch, deadline):
+            return self.stats
+        self.stats['done'] = True
+        if not self.dry_run:
+            self.reset()
+        return self.stats
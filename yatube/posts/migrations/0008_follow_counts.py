@@ -0,0 +1,36 @@
+# Generated by Django 2.2.16 on 2026-10-18 19:58
+
+from django.db import migrations, models
+
+
+def fill_follow_counts(apps, schema_editor):
+    """Считает подписчиков и подписки по уже существующим Follow."""
+    Follow = apps.get_model('posts', 'Follow')
+    Profile = apps.get_model('posts', 'Profile')
+    for field, column in (('author_id', 'follower_count'),
+                          ('user_id', 'following_count')):
+        for user_id, total in Follow.objects.order_by().values(
+            field
+        ).annotate(total=models.Count('pk')).values_list(field, 'total'):
+            Profile.objects.filter(user_id=user_id).update(**{column: total})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0007_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='follower_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Подписчиков'),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='following_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Подписок'),
+        ),
+        migrations.RunPython(fill_follow_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,60 @@
+import re
+from collections import Counter
+
+from django.db import migrations
+
+FTS_TABLE = 'posts_search_fts'
+TERM_MAX_LENGTH = 100
+CHUNK_SIZE = 500
+
+
+def tokenize(text):
+    # копия posts.search.tokenize: миграция не зависит от кода приложения
+    return [word[:TERM_MAX_LENGTH]
+            for word in re.findall(r'\w+', text.lower())]
+
+
+def backfill_search_terms(apps, schema_editor):
+    """
+    0007 заполнила только FTS5. Там, где её нет, поиск идёт
+    по SearchTerm, и его надо построить по уже написанному.
+    """
+    connection = schema_editor.connection
+    if (connection.vendor == 'sqlite'
+            and FTS_TABLE in connection.introspection.table_names()):
+        return
+    Post = apps.get_model('posts', 'Post')
+    Comment = apps.get_model('posts', 'Comment')
+    SearchTerm = apps.get_model('posts', 'SearchTerm')
+    if SearchTerm.objects.exists():
+        return
+    sources = (
+        ('post', Post.objects.order_by().values_list('id', 'id', 'text')),
+        ('comment', Comment.objects.order_by().values_list(
+            'id', 'post_id', 'text'
+        )),
+    )
+    rows = []
+    for kind, queryset in sources:
+        for object_id, post_id, text in queryset.iterator(CHUNK_SIZE):
+            rows.extend(
+                SearchTerm(term=term, kind=kind, object_id=object_id,
+                           post_id=post_id, frequency=frequency)
+                for term, frequency in Counter(tokenize(text)).items()
+            )
+            if len(rows) >= CHUNK_SIZE:
+                SearchTerm.objects.bulk_create(rows)
+                rows = []
+    SearchTerm.objects.bulk_create(rows)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0013_keyset_composite_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_search_terms,
+                             migrations.RunPython.noop),
+    ]
@@ -4,6 +4,12 @@ from django.contrib.auth import get_user_model
 User = get_user_model()
 
 
+class PostQuerySet(models.QuerySet):
+    def for_list(self):
+        """Посты со всем, что нужно карточке в ленте, одним запросом."""
+        return self.select_related('author', 'author__profile', 'group')
+
+
 class Post(models.Model):
     text = models.TextField(
         verbose_name='Текст',
@@ -13,6 +19,10 @@ class Post(models.Model):
         auto_now_add=True,
         verbose_name='Дата публикации'
     )
+    updated = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Дата изменения'
+    )
     author = models.ForeignKey(
         User,
         verbose_name='Автор',
@@ -33,11 +43,58 @@ class Post(models.Model):
         upload_to='posts/',
         blank=True
     )
+    # размеры пишутся при загрузке и после обработки воркером,
+    # чтобы шаблоны не открывали файл ради width/height
+    image_width = models.PositiveIntegerField(
+        'Ширина картинки',
+        blank=True,
+        null=True,
+        editable=False
+    )
+    image_height = models.PositiveIntegerField(
+        'Высота картинки',
+        blank=True,
+        null=True,
+        editable=False
+    )
+    comment_count = models.PositiveIntegerField(
+        'Комментарии',
+        default=0,
+        editable=False
+    )
+    # манифест адаптивных вариантов для srcset в JSON, см. images.py
+    image_variants = models.TextField(
+        'Варианты картинки',
+        blank=True,
+        null=True,
+        editable=False
+    )
+    thumbnails_ready = models.BooleanField(
+        'Миниатюры готовы',
+        default=False,
+        editable=False
+    )
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
         ordering = ['-pub_date']
+        indexes = [
+            models.Index(
+                fields=['-pub_date', '-id'],
+                name='post_pub_date_id_idx'
+            ),
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='post_author_pub_date_id_idx'
+            ),
+            models.Index(
+                fields=['group', '-pub_date', '-id'],
+                name='post_group_pub_date_id_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.text[:15]
@@ -83,6 +140,17 @@ class Comment(models.Model):
         verbose_name='Дата публикации'
     )
 
+    class Meta:
+        verbose_name = 'Комментарий'
+        verbose_name_plural = 'Комментарии'
+        ordering = ['created']
+        indexes = [
+            models.Index(
+                fields=['post', 'created', 'id'],
+                name='comment_post_created_id_idx'
+            ),
+        ]
+
 
 class Follow(models.Model):
     user = models.ForeignKey(
@@ -105,3 +173,190 @@ class Follow(models.Model):
                 name='unique_follow'
             )
         ]
+
+
+class Profile(models.Model):
+    """Профиль автора с денормализованными счётчиками."""
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        verbose_name='Пользователь',
+        related_name='profile'
+    )
+    post_count = models.PositiveIntegerField(
+        'Постов',
+        default=0,
+        editable=False
+    )
+    follower_count = models.PositiveIntegerField(
+        'Подписчиков',
+        default=0,
+        editable=False
+    )
+    following_count = models.PositiveIntegerField(
+        'Подписок',
+        default=0,
+        editable=False
+    )
+
+    class Meta:
+        verbose_name = 'Профиль'
+        verbose_name_plural = 'Профили'
+
+    def __str__(self):
+        return str(self.user)
+
+
+class ThumbnailJob(models.Model):
+    """Задание фоновому воркеру: нарезать миниатюры картинки поста."""
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = (
+        (PENDING, 'В очереди'),
+        (RUNNING, 'В работе'),
+        (DONE, 'Готово'),
+        (FAILED, 'Ошибка'),
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        verbose_name='Пост',
+        related_name='thumbnail_jobs'
+    )
+    image = models.CharField('Картинка', max_length=255)
+    status = models.CharField(
+        'Статус',
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default=PENDING
+    )
+    attempts = models.PositiveSmallIntegerField('Попыток', default=0)
+    error = models.TextField('Ошибка', blank=True)
+    created = models.DateTimeField('Создано', auto_now_add=True)
+    claimed = models.DateTimeField('Взято в работу', null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'Задание на миниатюры'
+        verbose_name_plural = 'Задания на миниатюры'
+        ordering = ['created']
+        indexes = [
+            models.Index(
+                fields=['status', 'created'],
+                name='thumbnail_job_queue_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.image} ({self.status})'
+
+
+class SearchTerm(models.Model):
+    """
+    Запись инвертированного индекса для поиска без FTS5:
+    сколько раз слово встречается в тексте поста или комментария.
+    """
+    POST = 'post'
+    COMMENT = 'comment'
+    KIND_CHOICES = (
+        (POST, 'Пост'),
+        (COMMENT, 'Комментарий'),
+    )
+    term = models.CharField('Слово', max_length=100)
+    kind = models.CharField('Источник', max_length=10, choices=KIND_CHOICES)
+    object_id = models.PositiveIntegerField('Id источника')
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        verbose_name='Пост',
+        related_name='search_terms'
+    )
+    frequency = models.PositiveIntegerField('Вхождений')
+
+    class Meta:
+        verbose_name = 'Слово индекса'
+        verbose_name_plural = 'Поисковый индекс'
+        indexes = [
+            models.Index(fields=['term'], name='search_term_idx'),
+            models.Index(fields=['kind', 'object_id'],
+                         name='search_source_idx'),
+        ]
+
+
+class TimelineEntry(models.Model):
+    """
+    Материализованная лента подписок: строка на пару (читатель, пост).
+    Заполняется при публикации поста (fan-out on write)
+    и при подписке/отписке, так что follow_index читает готовый срез.
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        verbose_name='Читатель',
+        related_name='timeline'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        verbose_name='Пост',
+        related_name='timeline'
+    )
+    pub_date = models.DateTimeField(
+        verbose_name='Дата публикации'
+    )
+
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Лента подписок'
+        ordering = ['-pub_date']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'],
+                name='unique_timeline_entry'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date'],
+                name='timeline_user_pub_date_idx'
+            )
+        ]
+
+
+class Recommendation(models.Model):
+    """
+    Кого почитать: готовый топ авторов для пользователя.
+    Пересчитывается командой build_recommendations, страница
+    читает его одним запросом по индексу (user, rank).
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        verbose_name='Читатель',
+        related_name='recommendations'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        verbose_name='Автор',
+        related_name='recommended_to'
+    )
+    score = models.PositiveIntegerField('Оценка')
+    rank = models.PositiveSmallIntegerField('Место')
+
+    class Meta:
+        verbose_name = 'Рекомендация'
+        verbose_name_plural = 'Рекомендации'
+        ordering = ['user', 'rank']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'author'],
+                name='unique_recommendation'
+            )
+        ]
+        indexes = [
+            models.Index(fields=['user', 'rank'],
+                         name='recommendation_user_rank_idx')
+        ]
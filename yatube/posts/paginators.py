@@ -0,0 +1,133 @@
+import base64
+import binascii
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+def encode_cursor(obj, direction, date_field='pub_date'):
+    """Кодирует позицию объекта (дата, id) в непрозрачную строку."""
+    raw = f'{direction}|{getattr(obj, date_field).isoformat()}|{obj.pk}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Разбирает курсор обратно в (направление, дата, id)."""
+    padding = '=' * (-len(cursor) % 4)
+    try:
+        raw = base64.urlsafe_b64decode(cursor + padding).decode()
+        direction, pub_date, pk = raw.split('|')
+        pub_date = parse_datetime(pub_date)
+        pk = int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise InvalidCursor(cursor)
+    if direction not in ('next', 'prev') or pub_date is None:
+        raise InvalidCursor(cursor)
+    return direction, pub_date, pk
+
+
+class KeysetPage:
+    """Страница курсорной пагинации, похожая по интерфейсу на Page."""
+
+    def __init__(self, object_list, paginator, next_cursor=None,
+                 previous_cursor=None):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return f'<KeysetPage of {len(self)} objects>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_previous() or self.has_next()
+
+
+class KeysetPaginator:
+    """
+    Курсорная пагинация по (дата, id), по умолчанию от новых к старым.
+    Не делает COUNT(*) и OFFSET: каждая страница - один запрос
+    с условием по ключу, время не зависит от глубины страницы.
+    """
+    is_keyset = True
+
+    def __init__(self, object_list, per_page, date_field='pub_date',
+                 descending=True):
+        self.object_list = object_list
+        self.per_page = int(per_page)
+        self.date_field = date_field
+        self.descending = descending
+
+    def _ordered(self, forward):
+        """Порядок показа (forward) или обратный ему."""
+        prefix = '-' if self.descending == forward else ''
+        return self.object_list.order_by(f'{prefix}{self.date_field}',
+                                         f'{prefix}pk')
+
+    def _beyond(self, value, pk, forward):
+        """
+        Всё, что идёт после (value, pk) в порядке показа или до него.
+        Диапазон по одной дате плюс исключение уже показанных строк
+        с той же датой: так SQLite идёт по составному индексу
+        (дата, id), а не склеивает два индекса через OR и сортирует.
+        """
+        before = self.descending == forward
+        date_lookup, pk_lookup = ('lte', 'gte') if before else ('gte', 'lte')
+        return (Q(**{f'{self.date_field}__{date_lookup}': value})
+                & ~Q(**{self.date_field: value, f'pk__{pk_lookup}': pk}))
+
+    def page(self, cursor=None):
+        """Возвращает страницу; бросает InvalidCursor на мусорный курсор."""
+        if not cursor:
+            rows = list(self._ordered(True)[:self.per_page + 1])
+            return self._build(rows[:self.per_page], has_before=False,
+                               has_after=len(rows) > self.per_page)
+        direction, value, pk = decode_cursor(cursor)
+        if direction == 'next':
+            rows = list(
+                self._ordered(True).filter(self._beyond(value, pk, True))
+                [:self.per_page + 1]
+            )
+            return self._build(rows[:self.per_page], has_before=True,
+                               has_after=len(rows) > self.per_page)
+        rows = list(
+            self._ordered(False).filter(self._beyond(value, pk, False))
+            [:self.per_page + 1]
+        )
+        has_before = len(rows) > self.per_page
+        rows = rows[:self.per_page][::-1]
+        return self._build(rows, has_before=has_before, has_after=True)
+
+    def get_page(self, cursor=None):
+        """Как page(), но на испорченный курсор отдаёт первую страницу."""
+        try:
+            return self.page(cursor)
+        except InvalidCursor:
+            return self.page()
+
+    def _build(self, rows, has_before, has_after):
+        next_cursor = previous_cursor = None
+        if rows and has_after:
+            next_cursor = encode_cursor(rows[-1], 'next', self.date_field)
+        if rows and has_before:
+            previous_cursor = encode_cursor(rows[0], 'prev', self.date_field)
+        return KeysetPage(rows, self, next_cursor, previous_cursor)
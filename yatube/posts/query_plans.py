@@ -0,0 +1,48 @@
+import time
+
+from django.conf import settings
+from django.db import connection
+
+from .models import Comment, Post
+
+
+def feed_querysets(user_id=1, group_id=1, post_id=1):
+    """Запросы, которыми списочные вьюшки достают одну страницу."""
+    per_page = settings.POSTS_PER_PAGE
+    posts = Post.objects.for_list()
+    return {
+        'posts:index': posts[:per_page],
+        'posts:group_list': posts.filter(group_id=group_id)[:per_page],
+        'posts:profile': posts.filter(author_id=user_id)[:per_page],
+        'posts:follow_index': posts.filter(
+            timeline__user_id=user_id
+        ).order_by('-timeline__pub_date')[:per_page],
+        'posts:post_detail': Comment.objects.select_related(
+            'author'
+        ).filter(post_id=post_id),
+    }
+
+
+def explain(queryset):
+    """Строки EXPLAIN QUERY PLAN (только SQLite)."""
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def uses_full_scan(plan):
+    """Полный проход таблицы или сортировка во временном B-дереве."""
+    return any(
+        'TEMP B-TREE' in line
+        or (line.startswith('SCAN') and 'INDEX' not in line)
+        for line in plan
+    )
+
+
+def time_queryset(queryset, repeat):
+    """Среднее время выполнения запроса в миллисекундах."""
+    started = time.perf_counter()
+    for _ in range(repeat):
+        list(queryset.all())
+    return (time.perf_counter() - started) / repeat * 1000
@@ -0,0 +1,167 @@
+import heapq
+import multiprocessing
+import random
+from collections import Counter, defaultdict
+from itertools import islice
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from . import follow_graph
+from .models import Follow, Profile, Recommendation
+
+# граф подписок для процессов-воркеров: при fork они получают его
+# от родителя без копирования и сериализации
+_graph = None
+
+
+class FollowGraph:
+    """
+    Граф подписок в памяти в виде двух разреженных списков смежности:
+    читатель -> авторы и автор -> читатели.
+    """
+
+    def __init__(self, pairs, max_neighbours):
+        following = defaultdict(set)
+        followers = defaultdict(list)
+        for user_id, author_id in pairs:
+            following[user_id].add(author_id)
+            followers[author_id].append(user_id)
+        self.following = dict(following)
+        # у популярного автора тысячи читателей: для оценки хватает части,
+        # иначе стоимость растёт квадратично от размера хабов. Часть
+        # случайная, а не первые id, чтобы не смещать оценки к старым
+        # пользователям; зерно - id автора, так пересчёты повторяемы
+        self.followers = {
+            author_id: (
+                random.Random(author_id).sample(sorted(readers),
+                                                max_neighbours)
+                if len(readers) > max_neighbours else readers
+            )
+            for author_id, readers in followers.items()
+        }
+
+    @classmethod
+    def load(cls, max_neighbours):
+        pairs = Follow.objects.order_by().values_list(
+            'user_id', 'author_id'
+        ).iterator(chunk_size=5000)
+        return cls(pairs, max_neighbours)
+
+    def suggest(self, user_id, top):
+        """
+        Топ авторов по числу совместных подписок: сколько раз автор
+        встречается у тех, кто читает тех же авторов, что и user.
+        Это строка произведения разреженных матриц F * F^T * F.
+        """
+        followed = self.following.get(user_id, set())
+        scores = Counter()
+        for author_id in followed:
+            for reader_id in self.followers.get(author_id, ()):
+                if reader_id != user_id:
+                    scores.update(self.following[reader_id])
+        for excluded in followed | {user_id}:
+            scores.pop(excluded, None)
+        return heapq.nlargest(top, scores.items(),
+                              key=lambda item: (item[1], -item[0]))
+
+
+def _init_worker(graph):
+    global _graph
+    _graph = graph
+
+
+def _suggest_chunk(args):
+    user_ids, top = args
+    return [(user_id, _graph.suggest(user_id, top)) for user_id in user_ids]
+
+
+def popular_authors(limit):
+    """Запасной список для тех, кому совместные подписки ничего не дали."""
+    return list(Profile.objects.filter(
+        post_count__gt=0
+    ).order_by('-follower_count', 'user_id').values_list(
+        'user_id', 'follower_count'
+    )[:limit])
+
+
+def _rows(user_id, suggestions, fallback, graph, top):
+    if not suggestions:
+        excluded = graph.following.get(user_id, set()) | {user_id}
+        suggestions = [(author_id, score) for author_id, score in fallback
+                       if author_id not in excluded][:top]
+    return [
+        Recommendation(user_id=user_id, author_id=author_id, score=score,
+                       rank=rank)
+        for rank, (author_id, score) in enumerate(suggestions, 1)
+    ]
+
+
+def _save(results, fallback, graph, top):
+    user_ids = [user_id for user_id, _ in results]
+    with transaction.atomic():
+        Recommendation.objects.filter(user_id__in=user_ids).delete()
+        Recommendation.objects.bulk_create([
+            row for user_id, suggestions in results
+            for row in _rows(user_id, suggestions, fallback, graph, top)
+        ])
+
+
+def _chunks(user_ids, chunk_size, top):
+    user_ids = iter(user_ids)
+    chunk = list(islice(user_ids, chunk_size))
+    while chunk:
+        yield chunk, top
+        chunk = list(islice(user_ids, chunk_size))
+
+
+def build(user_ids, top=None, workers=1, chunk_size=500,
+          max_neighbours=None):
+    """
+    Пересчитывает рекомендации для user_ids. Граф читается один раз,
+    оценки считаются пачками, при workers > 1 - в пуле процессов.
+    Возвращает число обработанных пользователей.
+    """
+    top = top or settings.RECOMMENDATIONS_TOP
+    graph = FollowGraph.load(
+        max_neighbours or settings.RECOMMENDATIONS_MAX_NEIGHBOURS
+    )
+    # с запасом: из общего списка выпадут уже прочитанные авторы
+    fallback = popular_authors(top * 3)
+    # пул раздаёт пачки из своего потока, а соединение с базой
+    # привязано к потоку, поэтому id читаются заранее
+    chunks = _chunks(list(user_ids), chunk_size, top)
+    done = 0
+    if workers > 1 and 'fork' in multiprocessing.get_all_start_methods():
+        # иначе потомки унаследуют открытое соединение с базой
+        # и при выходе могут закрыть его родителю; после пула родитель
+        # откроет новое. Внутри транзакции закрывать нельзя
+        if not connection.in_atomic_block:
+            connection.close()
+        context = multiprocessing.get_context('fork')
+        with context.Pool(workers, _init_worker, (graph,)) as pool:
+            for results in pool.imap_unordered(_suggest_chunk, chunks):
+                _save(results, fallback, graph, top)
+                done += len(results)
+        return done
+    _init_worker(graph)
+    for chunk in chunks:
+        results = _suggest_chunk(chunk)
+        _save(results, fallback, graph, top)
+        done += len(results)
+    return done
+
+
+def for_user(user, limit=None):
+    """
+    Сохранённые рекомендации одним запросом по индексу (user, rank);
+    на кого пользователь уже подписался после расчёта, отсеивается
+    по закэшированному множеству подписок.
+    """
+    limit = limit or settings.RECOMMENDATIONS_SHOWN
+    followed = follow_graph.following_ids(user.pk)
+    # строк у пользователя не больше RECOMMENDATIONS_TOP
+    rows = Recommendation.objects.filter(user=user).select_related(
+        'author', 'author__profile'
+    ).order_by('rank')
+    return [row for row in rows if row.author_id not in followed][:limit]
@@ -0,0 +1,269 @@
+import math
+import re
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+
+from .models import Comment, Post, SearchTerm
+
+FTS_TABLE = 'posts_search_fts'
+KIND_WEIGHTS = {SearchTerm.POST: 2.0, SearchTerm.COMMENT: 1.0}
+KIND_OFFSETS = {SearchTerm.POST: 0, SearchTerm.COMMENT: 1}
+TERM_MAX_LENGTH = 100
+DOCUMENTS_KEY = 'search:documents'
+DOCUMENTS_TIMEOUT = 60 * 60
+
+_fts_tables = {}
+
+
+def tokenize(text):
+    """Слова в нижнем регистре; то же делает unicode61 в FTS5."""
+    return [
+        word[:TERM_MAX_LENGTH]
+        for word in re.findall(r'\w+', text.lower())
+    ]
+
+
+def fts_available():
+    name = connection.settings_dict['NAME']
+    if name not in _fts_tables:
+        _fts_tables[name] = (
+            connection.vendor == 'sqlite'
+            and FTS_TABLE in connection.introspection.table_names()
+        )
+    return _fts_tables[name]
+
+
+def _documents():
+    """
+    Число проиндексированных текстов для idf. Хранится в кэше
+    и сдвигается при индексации, раз в DOCUMENTS_TIMEOUT
+    пересчитывается по базе, чтобы не копить расхождение.
+    """
+    documents = cache.get(DOCUMENTS_KEY)
+    if documents is None:
+        documents = Post.objects.count() + Comment.objects.count()
+        cache.add(DOCUMENTS_KEY, documents, DOCUMENTS_TIMEOUT)
+    return documents
+
+
+def _shift_documents(delta):
+    try:
+        cache.incr(DOCUMENTS_KEY, delta)
+    except ValueError:
+        # ключа нет: его посчитает следующий _documents()
+        pass
+
+
+class Fts5Backend:
+    """
+    Индекс в виртуальной таблице FTS5. rowid = id * 2 + сдвиг вида,
+    поэтому переиндексация и удаление идут по rowid, без сканирования.
+    Ранжирование - bm25, текст поста весит вдвое больше комментария.
+    """
+
+    @staticmethod
+    def _rowid(kind, object_id):
+        return object_id * 2 + KIND_OFFSETS[kind]
+
+    @staticmethod
+    def _match(query):
+        return ' '.join(f'"{term}"*' for term in tokenize(query))
+
+    def index(self, kind, object_id, post_id, text, created=False):
+        rowid = self._rowid(kind, object_id)
+        with connection.cursor() as cursor:
+            if not created:
+                cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s',
+                               [rowid])
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, body, kind, post_id) '
+                'VALUES (%s, %s, %s, %s)',
+                [rowid, text, kind, post_id]
+            )
+
+    def remove(self, kind, object_id):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s',
+                           [self._rowid(kind, object_id)])
+
+    def clear(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+
+    def count(self, query):
+        match = self._match(query)
+        if not match:
+            return 0
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT COUNT(DISTINCT post_id) FROM {FTS_TABLE} '
+                f'WHERE {FTS_TABLE} MATCH %s',
+                [match]
+            )
+            return cursor.fetchone()[0]
+
+    def search(self, query, offset, limit):
+        match = self._match(query)
+        if not match:
+            return []
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT post_id FROM {FTS_TABLE} '
+                f'WHERE {FTS_TABLE} MATCH %s GROUP BY post_id '
+                "ORDER BY SUM(rank * CASE kind WHEN 'post' THEN %s "
+                'ELSE %s END) LIMIT %s OFFSET %s',
+                [match, KIND_WEIGHTS[SearchTerm.POST],
+                 KIND_WEIGHTS[SearchTerm.COMMENT], limit, offset]
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+
+class PythonBackend:
+    """
+    Запасной вариант без FTS5: инвертированный индекс в SearchTerm,
+    ранжирование tf-idf считается в Python. Пост попадает в выдачу,
+    если в нём или в комментариях к нему есть все слова запроса.
+    """
+
+    def __init__(self):
+        self._ranked = {}
+
+    def index(self, kind, object_id, post_id, text, created=False):
+        if not created:
+            self.remove(kind, object_id)
+        rows = SearchTerm.objects.bulk_create([
+            SearchTerm(term=term, kind=kind, object_id=object_id,
+                       post_id=post_id, frequency=frequency)
+            for term, frequency in Counter(tokenize(text)).items()
+        ])
+        if rows:
+            _shift_documents(1)
+
+    def remove(self, kind, object_id):
+        deleted, _ = SearchTerm.objects.filter(
+            kind=kind, object_id=object_id
+        ).delete()
+        if deleted:
+            _shift_documents(-1)
+
+    def clear(self):
+        SearchTerm.objects.all().delete()
+        cache.delete(DOCUMENTS_KEY)
+
+    @staticmethod
+    def _prefixed(term):
+        # диапазон [term, следующая строка) вместо LIKE 'term%':
+        # LIKE в SQLite без учёта регистра и мимо индекса по term
+        upper = term[:-1] + chr(ord(term[-1]) + 1)
+        return SearchTerm.objects.filter(term__gte=term, term__lt=upper)
+
+    def _rank(self, query):
+        if query in self._ranked:
+            return self._ranked[query]
+        terms = set(tokenize(query))
+        documents = _documents()
+        scores = defaultdict(float)
+        matched = defaultdict(set)
+        for term in terms:
+            rows = list(self._prefixed(term).values_list(
+                'post_id', 'kind', 'object_id', 'frequency'
+            ))
+            sources = {(kind, object_id) for _, kind, object_id, _ in rows}
+            idf = math.log(1 + (documents - len(sources) + 0.5)
+                           / (len(sources) + 0.5))
+            for post_id, kind, _, frequency in rows:
+                scores[post_id] += (idf * KIND_WEIGHTS[kind]
+                                    * frequency * 2.2 / (frequency + 1.2))
+                matched[post_id].add(term)
+        ranked = sorted(
+            (post_id for post_id in scores if matched[post_id] == terms),
+            key=lambda post_id: (-scores[post_id], -post_id)
+        )
+        self._ranked[query] = ranked
+        return ranked
+
+    def count(self, query):
+        return len(self._rank(query))
+
+    def search(self, query, offset, limit):
+        return self._rank(query)[offset:offset + limit]
+
+
+def get_backend():
+    name = settings.SEARCH_BACKEND
+    if name == 'fts5' or (name == 'auto' and fts_available()):
+        return Fts5Backend()
+    return PythonBackend()
+
+
+def index_post(post, created=False):
+    get_backend().index(SearchTerm.POST, post.pk, post.pk, post.text,
+                        created)
+
+
+def index_comment(comment, created=False):
+    get_backend().index(SearchTerm.COMMENT, comment.pk, comment.post_id,
+                        comment.text, created)
+
+
+def remove_post(post):
+    get_backend().remove(SearchTerm.POST, post.pk)
+
+
+def remove_comment(comment):
+    get_backend().remove(SearchTerm.COMMENT, comment.pk)
+
+
+def rebuild(chunk_size=500):
+    """Переиндексирует все посты и комментарии, возвращает их число."""
+    backend = get_backend()
+    posts = Post.objects.order_by().values_list('id', 'text')
+    comments = Comment.objects.order_by().values_list('id', 'post_id', 'text')
+    indexed = 0
+    with transaction.atomic():
+        backend.clear()
+        for post_id, text in posts.iterator(chunk_size=chunk_size):
+            backend.index(SearchTerm.POST, post_id, post_id, text, True)
+            indexed += 1
+        for comment_id, post_id, text in comments.iterator(
+                chunk_size=chunk_size):
+            backend.index(SearchTerm.COMMENT, comment_id, post_id, text,
+                          True)
+            indexed += 1
+    return indexed
+
+
+def search_post_ids(query, limit):
+    return get_backend().search(query, 0, limit)
+
+
+class SearchResults:
+    """
+    Ранжированная выдача, которую понимает Paginator:
+    count() и срезы, посты подгружаются только для нужной страницы.
+    """
+
+    def __init__(self, query):
+        self.query = query
+        self.backend = get_backend()
+        self._count = None
+
+    def count(self):
+        if self._count is None:
+            self._count = self.backend.count(self.query)
+        return self._count
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        start = index.start or 0
+        stop = self.count() if index.stop is None else index.stop
+        ids = self.backend.search(self.query, start, stop - start)
+        posts = Post.objects.for_list().in_bulk(ids)
+        return [posts[post_id] for post_id in ids if post_id in posts]
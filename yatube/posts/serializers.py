@@ -1,4 +1,4 @@
-from .models import Post
+from .models import Comment, Post
 from rest_framework import serializers
 
 
@@ -6,3 +6,29 @@ class PostSerializer(serializers.ModelSerializer):
     class Meta:
         model = Post
         fields = ('text', 'pub_date', 'author')
+
+
+class PostListSerializer(serializers.ModelSerializer):
+    """Компактная карточка поста для лент API."""
+    author = serializers.SlugRelatedField(slug_field='username',
+                                          read_only=True)
+    group = serializers.SlugRelatedField(slug_field='slug', read_only=True)
+    image = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Post
+        fields = ('id', 'text', 'pub_date', 'author', 'group', 'image',
+                  'image_width', 'image_height', 'comment_count')
+
+    def get_image(self, post):
+        return post.image.url if post.image else None
+
+
+class CommentListSerializer(serializers.ModelSerializer):
+    """Комментарий для подгрузки обсуждения пачками."""
+    author = serializers.SlugRelatedField(slug_field='username',
+                                          read_only=True)
+
+    class Meta:
+        model = Comment
+        fields = ('id', 'author', 'text', 'created')
@@ -0,0 +1,39 @@
+from django import template
+from django.conf import settings
+from sorl.thumbnail import default
+
+from posts import images
+
+register = template.Library()
+
+
+@register.inclusion_tag('includes/picture.html')
+def picture(post, variant_set, css_class=''):
+    """
+    {% picture post 'card' %} - <picture> с srcset и sizes из манифеста
+    вариантов поста. Урлы собираются из сохранённых имён файлов,
+    хранилище ключей миниатюр и сами файлы не трогаются.
+    """
+    formats = images.load_variants(post).get(variant_set, {})
+    sources = []
+    for image_format, entries in formats.items():
+        sources.append({
+            'type': images.MIME_TYPES[image_format],
+            'srcset': ', '.join(f'{default.storage.url(name)} {width}w'
+                                for name, width, _ in entries),
+            'largest': entries[-1],
+        })
+    if not sources:
+        return {'fallback': None}
+    # последний формат в IMAGE_VARIANT_FORMATS понимают все браузеры
+    fallback = sources.pop()
+    name, width, height = fallback['largest']
+    return {
+        'sources': sources,
+        'fallback': fallback,
+        'src': default.storage.url(name),
+        'width': width,
+        'height': height,
+        'sizes': settings.IMAGE_VARIANTS[variant_set]['sizes'],
+        'css_class': css_class,
+    }
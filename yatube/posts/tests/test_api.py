@@ -0,0 +1,77 @@
+from http import HTTPStatus
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Follow, Group, Post
+
+User = get_user_model()
+
+
+class FeedApiTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='api_author')
+        cls.reader = User.objects.create_user(username='api_reader')
+        cls.reader_client = Client()
+        cls.reader_client.force_login(cls.reader)
+        cls.group = Group.objects.create(title='api', slug='api',
+                                         description='api')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        for number in range(settings.POSTS_PER_PAGE + 3):
+            Post.objects.create(author=cls.author, group=cls.group,
+                                text=f'api {number}')
+
+    def test_feeds_return_compact_json(self):
+        urls = (
+            reverse('posts:api_index'),
+            reverse('posts:api_group', args=(self.group.slug,)),
+            reverse('posts:api_profile', args=(self.author.username,)),
+            reverse('posts:api_follow'),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                data = self.reader_client.get(url).json()
+                self.assertEqual(len(data['results']),
+                                 settings.POSTS_PER_PAGE)
+                self.assertEqual(data['results'][0]['author'],
+                                 self.author.username)
+                self.assertEqual(data['results'][0]['group'],
+                                 self.group.slug)
+                self.assertIsNotNone(data['next'])
+                self.assertIsNone(data['previous'])
+
+    def test_cursor_walks_to_last_page(self):
+        url = reverse('posts:api_index')
+        first = self.client.get(url).json()
+        second = self.client.get(url, {'cursor': first['next']}).json()
+        self.assertEqual(len(second['results']), 3)
+        self.assertIsNone(second['next'])
+        ids = {post['id'] for post in first['results'] + second['results']}
+        self.assertEqual(len(ids), settings.POSTS_PER_PAGE + 3)
+
+    def test_etag_gives_not_modified_until_feed_changes(self):
+        url = reverse('posts:api_index')
+        response = self.client.get(url)
+        etag = response['ETag']
+        self.assertIn('Last-Modified', response)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+        Post.objects.first().delete()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_follow_feed_revalidates_on_unfollow(self):
+        url = reverse('posts:api_follow')
+        etag = self.reader_client.get(url)['ETag']
+        Follow.objects.filter(user=self.reader, author=self.author).delete()
+        response = self.reader_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(response.json()['results'], [])
+
+    def test_follow_feed_requires_login(self):
+        response = self.client.get(reverse('posts:api_follow'))
+        self.assertEqual(response.status_code, HTTPStatus.UNAUTHORIZED)
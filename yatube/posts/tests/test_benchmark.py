@@ -0,0 +1,78 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+
+from core import benchmark
+from .. import benchmark as scenarios
+from ..models import Post, Profile, TimelineEntry
+
+
+class BenchmarkTest(TestCase):
+    def test_percentiles_use_nearest_rank(self):
+        samples = list(range(1, 101))
+        self.assertEqual(benchmark.percentile(samples, 50), 50)
+        self.assertEqual(benchmark.percentile(samples, 99), 99)
+        self.assertEqual(benchmark.summarize([5.0])['p95'], 5.0)
+
+    def test_seed_builds_derived_data(self):
+        volumes = scenarios.seed(users=5, groups=2, posts=40, comments=30,
+                                 follows=2, batch_size=7)
+        self.assertEqual(volumes, {'users': 5, 'groups': 2, 'posts': 40,
+                                   'comments': 30, 'follows': 10})
+        self.assertEqual(
+            sum(Profile.objects.values_list('post_count', flat=True)), 40
+        )
+        self.assertEqual(
+            sum(Post.objects.values_list('comment_count', flat=True)), 30
+        )
+        self.assertTrue(TimelineEntry.objects.exists())
+
+    def test_command_writes_comparable_report(self):
+        scenarios.seed(users=3, groups=1, posts=15, comments=5, follows=1)
+        handle, path = tempfile.mkstemp(suffix='.json', dir=settings.BASE_DIR)
+        os.close(handle)
+        self.addCleanup(os.remove, path)
+        call_command('benchmark_views', existing=True, rounds=2, warmup=0,
+                     output=path, stdout=open(os.devnull, 'w'))
+        call_command('benchmark_views', existing=True, rounds=2, warmup=0,
+                     compare=path, stdout=open(os.devnull, 'w'))
+        with open(path, encoding='utf-8') as stream:
+            report = json.load(stream)
+        self.assertEqual(
+            set(report['results']),
+            {name for name, _, _ in scenarios.scenarios()}
+        )
+        result = report['results']['follow_index']
+        self.assertEqual(result['rounds'], 2)
+        self.assertGreater(result['queries'], 0)
+        self.assertIn('p95', result['latency_ms'])
+
+    def test_compare_with_zero_baseline(self):
+        scenarios.seed(users=3, groups=1, posts=15, comments=5, follows=1)
+        handle, path = tempfile.mkstemp(suffix='.json')
+        os.close(handle)
+        self.addCleanup(os.remove, path)
+        call_command('benchmark_views', existing=True, rounds=1, warmup=0,
+                     only=['index'], output=path,
+                     stdout=open(os.devnull, 'w'))
+        with open(path, encoding='utf-8') as stream:
+            report = json.load(stream)
+        report['results']['index']['latency_ms']['p50'] = 0
+        with open(path, 'w', encoding='utf-8') as stream:
+            json.dump(report, stream)
+        out = StringIO()
+        call_command('benchmark_views', existing=True, rounds=1, warmup=0,
+                     only=['index'], compare=path, stdout=out)
+        self.assertIn('index          p50 n/a', out.getvalue())
+
+    def test_cold_run_keeps_site_cache(self):
+        cache.set('feed:kept', 'html')
+        call_command('benchmark_views', existing=True, cold=True, rounds=1,
+                     warmup=0, only=['index'], stdout=open(os.devnull, 'w'))
+        self.assertEqual(cache.get('feed:kept'), 'html')
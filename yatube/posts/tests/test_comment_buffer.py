@@ -0,0 +1,135 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from .. import comment_buffer, search
+from ..models import Comment, Post
+
+User = get_user_model()
+
+
+@override_settings(COMMENT_WRITE_BUFFER=True, COMMENT_BUFFER_THREAD=False)
+class CommentBufferTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        comment_buffer.flush()
+        self.user = User.objects.create_user(username='buffer_user')
+        self.client.force_login(self.user)
+        self.post = Post.objects.create(author=self.user, text='buffered')
+        self.detail_url = reverse('posts:post_detail', args=(self.post.id,))
+        self.add_url = reverse('posts:add_comment', args=(self.post.id,))
+
+    def comment(self, text):
+        return self.client.post(self.add_url, {'text': text})
+
+    def test_comment_is_queued_not_inserted(self):
+        with self.assertNumQueries(3):
+            response = self.comment('в очереди')
+        self.assertRedirects(response, self.detail_url)
+        self.assertFalse(Comment.objects.exists())
+
+    def test_author_reads_own_pending_comments(self):
+        self.comment('первый')
+        self.comment('второй')
+        response = self.client.get(self.detail_url)
+        self.assertEqual([comment.text for comment
+                          in response.context['comments']],
+                         ['первый', 'второй'])
+        stranger = Client()
+        response = stranger.get(self.detail_url)
+        self.assertEqual(list(response.context['comments']), [])
+
+    def test_pending_comment_changes_etag(self):
+        etag = self.client.get(self.detail_url)['ETag']
+        self.comment('новый')
+        response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_flush_writes_batch_with_side_effects(self):
+        for number in range(3):
+            self.comment(f'пачка {number}')
+        # посты и точка сохранения; SQLite не отдаёт id из bulk_create,
+        # так что на комментарий вставка, счётчик и строка индекса
+        with self.assertNumQueries(3 + 3 * 3):
+            self.assertEqual(comment_buffer.flush(), 3)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 3)
+        self.assertEqual(
+            list(Comment.objects.order_by('created')
+                 .values_list('text', flat=True)),
+            ['пачка 0', 'пачка 1', 'пачка 2']
+        )
+        self.assertEqual(search.SearchResults('пачка').count(), 1)
+        response = self.client.get(self.detail_url)
+        self.assertEqual(len(response.context['comments']), 3)
+
+    def test_flush_keeps_comments_queued_meanwhile(self):
+        self.comment('записан')
+        written = comment_buffer.pending_entries(self.post.pk, self.user)
+        self.comment('ждёт')
+        comment_buffer.write(written)
+        self.assertEqual(
+            [entry['text'] for entry in
+             comment_buffer.pending_entries(self.post.pk, self.user)],
+            ['ждёт']
+        )
+
+    def test_expired_counter_is_seeded_again(self):
+        self.comment('до')
+        prefix = comment_buffer._pending_prefix(self.post.pk, self.user.pk)
+        cache.delete(f'{prefix}:seq')
+        self.comment('после')
+        self.assertEqual(
+            [entry['text'] for entry in
+             comment_buffer.pending_entries(self.post.pk, self.user)],
+            ['после']
+        )
+
+    def test_reads_start_from_lowest_pending(self):
+        for number in range(3):
+            self.comment(f'номер {number}')
+        comment_buffer.flush()
+        self.comment('последний')
+        prefix = comment_buffer._pending_prefix(self.post.pk, self.user.pk)
+        comment_buffer.pending_entries(self.post.pk, self.user)
+        with mock.patch.object(cache, 'get_many',
+                               wraps=cache.get_many) as get_many:
+            entries = comment_buffer.pending_entries(self.post.pk,
+                                                     self.user)
+        self.assertEqual([entry['text'] for entry in entries],
+                         ['последний'])
+        self.assertEqual(get_many.call_args_list[-1][0][0],
+                         [f'{prefix}:{entries[0]["seq"]}'])
+
+    def test_written_comment_is_not_shown_twice(self):
+        self.comment('один раз')
+        entries = comment_buffer.pending_entries(self.post.pk, self.user)
+        comment_buffer.flush()
+        # запись закоммичена, а поток ещё не убрал её из кэша
+        for entry in entries:
+            cache.set(comment_buffer._entry_key(entry), entry)
+        response = self.client.get(self.detail_url)
+        self.assertEqual([comment.text for comment
+                          in response.context['comments']], ['один раз'])
+        # такой же текст ещё раз - новый комментарий, а не копия
+        for entry in entries:
+            cache.delete(comment_buffer._entry_key(entry))
+        self.comment('один раз')
+        response = self.client.get(self.detail_url)
+        self.assertEqual(len(response.context['comments']), 2)
+
+    def test_comments_to_deleted_post_are_dropped(self):
+        self.comment('в пустоту')
+        Post.objects.filter(pk=self.post.pk).delete()
+        self.assertEqual(comment_buffer.flush(), 0)
+        self.assertFalse(Comment.objects.exists())
+
+    def test_unknown_post_is_404(self):
+        response = self.client.post(
+            reverse('posts:add_comment', args=(self.post.id + 100,)),
+            {'text': 'мимо'}
+        )
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,88 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from .. import counters, follow_graph
+from ..models import Follow, Post, Profile
+
+User = get_user_model()
+
+
+class FollowGraphTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.reader = User.objects.create_user(username='graph_reader')
+        self.author = User.objects.create_user(username='graph_author')
+        self.other = User.objects.create_user(username='graph_other')
+        self.client.force_login(self.reader)
+
+    def follow(self, author):
+        self.client.get(reverse('posts:profile_follow',
+                                args=[author.username]))
+
+    def unfollow(self, author):
+        self.client.get(reverse('posts:profile_unfollow',
+                                args=[author.username]))
+
+    def test_counts_follow_and_unfollow(self):
+        self.follow(self.author)
+        self.follow(self.other)
+        self.follow(self.author)
+        self.assertEqual(follow_graph.counts([self.reader.pk,
+                                              self.author.pk]),
+                         {self.reader.pk: (0, 2), self.author.pk: (1, 0)})
+        self.unfollow(self.author)
+        self.assertEqual(follow_graph.counts([self.reader.pk,
+                                              self.author.pk]),
+                         {self.reader.pk: (0, 1), self.author.pk: (0, 0)})
+
+    def test_cached_set_is_dropped_on_change(self):
+        self.assertEqual(follow_graph.following_ids(self.reader.pk),
+                         frozenset())
+        self.follow(self.author)
+        with self.assertNumQueries(1):
+            self.assertTrue(follow_graph.follows(self.reader, self.author))
+        with self.assertNumQueries(0):
+            self.assertTrue(follow_graph.follows(self.reader, self.author))
+        self.unfollow(self.author)
+        with self.assertNumQueries(1):
+            self.assertFalse(follow_graph.follows(self.reader, self.author))
+
+    def test_batched_lookup(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        follow_graph.following_ids(self.reader.pk)
+        with self.assertNumQueries(0):
+            followed = follow_graph.is_following(
+                self.reader, [self.author, self.other.pk]
+            )
+        self.assertEqual(followed, {self.author.pk})
+        self.assertEqual(
+            follow_graph.is_following(AnonymousUser(), [self.author]),
+            frozenset()
+        )
+
+    def test_reset_after_bulk_write(self):
+        follow_graph.following_ids(self.reader.pk)
+        Follow.objects.bulk_create(
+            [Follow(user=self.reader, author=self.other)]
+        )
+        counters.recount()
+        follow_graph.reset()
+        self.assertEqual(follow_graph.following_ids(self.reader.pk),
+                         {self.other.pk})
+        self.assertEqual(
+            Profile.objects.get(user=self.other).follower_count, 1
+        )
+
+    def test_profile_shows_counts_and_search_marks_followed(self):
+        self.follow(self.author)
+        Post.objects.create(author=self.author, text='граф подписок')
+        Post.objects.create(author=self.other, text='граф без подписки')
+        response = self.client.get(reverse('posts:profile',
+                                           args=[self.author.username]))
+        self.assertTrue(response.context['following'])
+        self.assertContains(response, 'Подписчиков: 1')
+        response = self.client.get(reverse('posts:search'), {'q': 'граф'})
+        self.assertContains(response, 'Вы подписаны', count=1)
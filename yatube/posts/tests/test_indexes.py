@@ -0,0 +1,53 @@
+from unittest import skipUnless
+
+from django.db import connection
+from django.test import TestCase
+from django.utils import timezone
+
+from ..models import Comment, Post
+from ..paginators import KeysetPaginator
+from ..query_plans import explain, feed_querysets, uses_full_scan
+
+
+@skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN из SQLite')
+class FeedIndexesTest(TestCase):
+    def test_list_views_use_indexes(self):
+        expected_indexes = {
+            'posts:index': 'post_pub_date_id_idx',
+            'posts:group_list': 'post_group_pub_date_id_idx',
+            'posts:profile': 'post_author_pub_date_id_idx',
+            'posts:follow_index': 'timeline_user_pub_date_idx',
+            'posts:post_detail': 'comment_post_created_id_idx',
+        }
+        for view_name, queryset in feed_querysets().items():
+            with self.subTest(view_name=view_name):
+                plan = explain(queryset)
+                self.assertFalse(uses_full_scan(plan), plan)
+                self.assertIn(expected_indexes[view_name], '\n'.join(plan))
+
+    def test_keyset_pages_use_indexes_without_sort(self):
+        posts = Post.objects.for_list()
+        paginators = {
+            'post_pub_date_id_idx': KeysetPaginator(posts, 10),
+            'post_group_pub_date_id_idx': KeysetPaginator(
+                posts.filter(group_id=1), 10
+            ),
+            'post_author_pub_date_id_idx': KeysetPaginator(
+                posts.filter(author_id=1), 10
+            ),
+            'comment_post_created_id_idx': KeysetPaginator(
+                Comment.objects.filter(post_id=1).select_related('author'),
+                10, date_field='created', descending=False
+            ),
+        }
+        now = timezone.now()
+        for index, paginator in paginators.items():
+            for forward in (True, False):
+                with self.subTest(index=index, forward=forward):
+                    plan = explain(
+                        paginator._ordered(forward).filter(
+                            paginator._beyond(now, 5, forward)
+                        )[:11]
+                    )
+                    self.assertFalse(uses_full_scan(plan), plan)
+                    self.assertIn(index, '\n'.join(plan))
@@ -0,0 +1,107 @@
+import shutil
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import DatabaseError
+from django.urls import reverse
+from sorl.thumbnail import default
+
+from .. import images, media_dedup
+from ..models import Post
+from .utils import SMALL_GIF, TempMediaTestCase
+
+User = get_user_model()
+
+
+class CollapseDuplicatesTest(TempMediaTestCase):
+    def setUp(self):
+        cache.clear()
+        default.kvstore.clear()
+        self.addCleanup(shutil.rmtree, self.media_root, True)
+        self.user = User.objects.create_user(username='dedup_author')
+        # файлы, сохранённые ещё до хранилища по хэшу, под своими именами
+        plain = FileSystemStorage(location=self.media_root)
+        names = [plain.save(f'posts/copy{number}.gif',
+                            ContentFile(SMALL_GIF))
+                 for number in range(3)]
+        names.append(plain.save('posts/unique.gif', ContentFile(b'x' * 35)))
+        manifests = [{'card': {'JPEG': [['cache/kept.jpg', 2, 1]]}},
+                     {'card': {'JPEG': [['cache/stale.jpg', 2, 1]]}},
+                     None, None]
+        self.posts = [
+            Post.objects.create(
+                author=self.user, text=name, image=name,
+                image_variants=manifest and images.dump_variants(manifest)
+            )
+            for name, manifest in zip(names, manifests)
+        ]
+        for name in ('cache/kept.jpg', 'cache/stale.jpg'):
+            plain.save(name, ContentFile(b'thumbnail'))
+
+    def test_find_duplicates_groups_identical_files(self):
+        groups = media_dedup.find_duplicates(default_storage, 'posts')
+        self.assertEqual(list(groups.values()), [
+            ['posts/copy0.gif', 'posts/copy1.gif', 'posts/copy2.gif']
+        ])
+
+    def test_dry_run_changes_nothing(self):
+        report = media_dedup.collapse(default_storage, 'posts', True)
+        self.assertEqual(report, {'groups': 1, 'files': 2, 'posts': 3,
+                                  'bytes': 2 * len(SMALL_GIF) + 9})
+        self.assertTrue(default_storage.exists('posts/copy1.gif'))
+        self.assertTrue(default_storage.exists('cache/stale.jpg'))
+
+    def test_collapse_keeps_one_file_and_one_thumbnail_set(self):
+        out = StringIO()
+        call_command('collapse_duplicate_media', stdout=out)
+        self.assertIn('лишних файлов: 2', out.getvalue())
+        images_ = set()
+        for post in self.posts[:3]:
+            post.refresh_from_db()
+            images_.add(post.image.name)
+            self.assertEqual(images.load_variants(post)['card']['JPEG'][0][0],
+                             'cache/kept.jpg')
+        self.assertEqual(len(images_), 1)
+        canonical = images_.pop()
+        self.assertRegex(canonical, r'^posts/[0-9a-f]{2}/[0-9a-f]{64}\.gif$')
+        with default_storage.open(canonical) as image:
+            self.assertEqual(image.read(), SMALL_GIF)
+        for name in ('posts/copy0.gif', 'posts/copy1.gif',
+                     'posts/copy2.gif', 'cache/stale.jpg'):
+            self.assertFalse(default_storage.exists(name), name)
+        self.assertTrue(default_storage.exists('cache/kept.jpg'))
+        self.assertTrue(default_storage.exists('posts/unique.gif'))
+        self.assertEqual(media_dedup.find_duplicates(default_storage,
+                                                     'posts'), {})
+
+    def test_failed_repoint_keeps_referenced_files(self):
+        with mock.patch('django.db.models.query.QuerySet.update',
+                        side_effect=DatabaseError('locked')):
+            with self.assertRaises(DatabaseError):
+                media_dedup.collapse(default_storage, 'posts')
+        for post in Post.objects.all():
+            self.assertTrue(default_storage.exists(post.image.name),
+                            post.image.name)
+        self.assertTrue(default_storage.exists('cache/stale.jpg'))
+        self.assertEqual(list(media_dedup.find_duplicates(
+            default_storage, 'posts').values()), [
+            ['posts/copy0.gif', 'posts/copy1.gif', 'posts/copy2.gif']
+        ])
+
+    def test_new_upload_of_same_picture_reuses_file(self):
+        call_command('collapse_duplicate_media', stdout=StringIO())
+        self.posts[0].refresh_from_db()
+        self.client.force_login(self.user)
+        self.client.post(reverse('posts:post_create'), {
+            'text': 'снова та же',
+            'image': SimpleUploadedFile('again.gif', SMALL_GIF,
+                                        content_type='image/gif')
+        })
+        post = Post.objects.get(text='снова та же')
+        self.assertEqual(post.image.name, self.posts[0].image.name)
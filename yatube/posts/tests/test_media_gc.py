@@ -0,0 +1,123 @@
+import os
+import shutil
+import time
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.test import override_settings
+from sorl.thumbnail import default
+
+from .. import images, media_gc
+from ..media_gc import Collector
+from ..models import Post
+from .utils import TempMediaTestCase
+
+User = get_user_model()
+
+OLD = time.time() - 2 * 24 * 3600
+
+
+@override_settings(MEDIA_GC_MIN_AGE=3600)
+class MediaGarbageCollectorTest(TempMediaTestCase):
+    def setUp(self):
+        cache.clear()
+        default.kvstore.clear()
+        self.addCleanup(shutil.rmtree, self.media_root, True)
+        author = User.objects.create_user(username='gc_author')
+        self.live = self.save('posts/live.gif', b'live')
+        self.orphan = self.save('posts/old.gif', b'replaced')
+        self.young = self.save('posts/fresh.gif', b'uploading', old=False)
+        self.variant = self.save('cache/aa/bb/variant.jpg', b'variant')
+        self.stale_variant = self.save('cache/cc/dd/stale.jpg', b'stale')
+        self.leftover = self.save('posts/.upload-abc', b'broken upload')
+        Post.objects.create(
+            author=author, text='жив', image=self.live,
+            image_variants=images.dump_variants(
+                {'card': {'JPEG': [[self.variant, 2, 1]]}}
+            )
+        )
+
+    @staticmethod
+    def save(name, content, old=True):
+        name = default_storage.save(name, ContentFile(content))
+        if old:
+            os.utime(default_storage.path(name), (OLD, OLD))
+        return name
+
+    def exists(self):
+        return {name: default_storage.exists(name) for name in (
+            self.live, self.orphan, self.young, self.variant,
+            self.stale_variant, self.leftover
+        )}
+
+    def test_dry_run_reports_without_deleting(self):
+        removed = []
+        stats = Collector(default_storage, dry_run=True,
+                          report=lambda name, size: removed.append(name)
+                          ).run()
+        self.assertEqual(sorted(removed), sorted(
+            [self.orphan, self.stale_variant, self.leftover]
+        ))
+        self.assertEqual(stats['bytes'], len(b'replaced' b'stale'
+                                             b'broken upload'))
+        self.assertTrue(all(self.exists().values()))
+
+    def test_removes_only_orphans(self):
+        out = StringIO()
+        call_command('collect_media_garbage', stdout=out)
+        self.assertIn('Удалено: 3', out.getvalue())
+        self.assertEqual(self.exists(), {
+            self.live: True, self.orphan: False, self.young: True,
+            self.variant: True, self.stale_variant: False,
+            self.leftover: False,
+        })
+
+    def test_deleted_post_leaves_orphans(self):
+        Post.objects.all().delete()
+        Collector(default_storage).run()
+        self.assertFalse(default_storage.exists(self.live))
+        self.assertFalse(default_storage.exists(self.variant))
+
+    def test_runs_incrementally_within_time_budget(self):
+        runs = 0
+        while True:
+            runs += 1
+            stats = Collector(default_storage, max_seconds=0,
+                              batch_size=1).run()
+            if stats['done']:
+                break
+            self.assertLess(runs, 20)
+        self.assertGreater(runs, 1)
+        self.assertEqual(self.exists(), {
+            self.live: True, self.orphan: False, self.young: True,
+            self.variant: True, self.stale_variant: False,
+            self.leftover: False,
+        })
+
+    def test_live_thumbnails_are_collected_within_time_budget(self):
+        author = User.objects.get(username='gc_author')
+        for number in range(3):
+            Post.objects.create(author=author, text=f'ещё {number}',
+                                image=self.live)
+        runs = 0
+        with mock.patch.object(media_gc, 'live_thumbnails',
+                               wraps=media_gc.live_thumbnails) as chunks:
+            while not Collector(default_storage, max_seconds=0,
+                                batch_size=1).run()['done']:
+                runs += 1
+                # не больше одной пачки постов сверх лимита времени
+                self.assertLessEqual(chunks.call_count, runs)
+                self.assertLess(runs, 30)
+        self.assertGreater(chunks.call_count, 1)
+        for call in chunks.call_args_list:
+            self.assertEqual(call[0][2:], (1,))
+        self.assertEqual(self.exists(), {
+            self.live: True, self.orphan: False, self.young: True,
+            self.variant: True, self.stale_variant: False,
+            self.leftover: False,
+        })
@@ -1,7 +1,8 @@
 from django.contrib.auth import get_user_model
 from django.test import TestCase
+from django.urls import reverse
 
-from ..models import Group, Post
+from ..models import Comment, Group, Post, Profile
 
 User = get_user_model()
 
@@ -62,3 +63,47 @@ class PostModelTest(TestCase):
                     post._meta.get_field(field).verbose_name,
                     expected_value
                 )
+
+
+class CountersTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='counter_user')
+
+    def test_post_count_follows_create_and_delete(self):
+        post = Post.objects.create(author=self.user, text='counted')
+        Post.objects.create(author=self.user, text='counted too')
+        self.assertEqual(Profile.objects.get(user=self.user).post_count, 2)
+        post.delete()
+        self.assertEqual(Profile.objects.get(user=self.user).post_count, 1)
+
+    def test_comment_count_follows_create_and_delete(self):
+        post = Post.objects.create(author=self.user, text='commented')
+        comment = Comment.objects.create(post=post, author=self.user,
+                                         text='first')
+        Comment.objects.create(post=post, author=self.user, text='second')
+        post.refresh_from_db()
+        self.assertEqual(post.comment_count, 2)
+        comment.delete()
+        post.refresh_from_db()
+        self.assertEqual(post.comment_count, 1)
+
+    def test_comment_moves_updated_forward(self):
+        post = Post.objects.create(author=self.user, text='fresh')
+        previous = post.updated
+        for text in ('first', 'second'):
+            Comment.objects.create(post=post, author=self.user, text=text)
+            post.refresh_from_db()
+            self.assertGreater(post.updated, previous)
+            previous = post.updated
+
+    def test_profile_page_for_user_without_profile(self):
+        author = User.objects.create_user(username='no_profile')
+        Post.objects.create(author=author, text='до профилей')
+        Profile.objects.filter(user=author).delete()
+        response = self.client.get(
+            reverse('posts:profile', args=(author.username,))
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Profile.objects.get(user=author).post_count, 1)
@@ -0,0 +1,99 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from core.query_budget import QueryBudgetExceeded, query_budget
+from core.query_budget import QueryBudgetMixin
+from ..models import Comment, Follow, Group, Post
+from ..urls import app_name, urlpatterns
+
+User = get_user_model()
+
+
+class QueryBudgetTest(QueryBudgetMixin, TestCase):
+    """Число запросов не должно расти вместе с числом постов."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='budget_author')
+        cls.reader = User.objects.create_user(username='budget_reader')
+        cls.reader_client = Client()
+        cls.reader_client.force_login(cls.reader)
+        cls.author_client = Client()
+        cls.author_client.force_login(cls.author)
+        cls.group = Group.objects.create(title='budget', slug='budget',
+                                         description='budget')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        commenters = [
+            User.objects.create_user(username=f'commenter_{i}')
+            for i in range(3)
+        ]
+        for number in range(settings.POSTS_PER_PAGE * 2):
+            cls.post = Post.objects.create(author=cls.author,
+                                           group=cls.group,
+                                           text=f'budget {number}')
+            for commenter in commenters:
+                Comment.objects.create(post=cls.post, author=commenter,
+                                       text='comment')
+        cls.stranger = User.objects.create_user(username='budget_stranger')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_every_posts_url_has_budget(self):
+        for pattern in urlpatterns:
+            view_name = f'{app_name}:{pattern.name}'
+            with self.subTest(view_name=view_name):
+                self.assertIn(view_name, settings.QUERY_BUDGETS)
+
+    def test_read_views_fit_budget(self):
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:index') + '?page=2',
+            reverse('posts:group_list', args=(self.group.slug,)),
+            reverse('posts:profile', args=(self.author.username,)),
+            reverse('posts:post_detail', args=(self.post.id,)),
+            reverse('posts:post_create'),
+            reverse('posts:follow_index'),
+            reverse('posts:get_post', args=(self.post.id,)),
+            reverse('posts:api_comments', args=(self.post.id,)),
+            reverse('posts:api_index'),
+            reverse('posts:api_group', args=(self.group.slug,)),
+            reverse('posts:api_profile', args=(self.author.username,)),
+            reverse('posts:api_follow'),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertQueryBudget(url, client=self.reader_client)
+
+    def test_author_views_fit_budget(self):
+        self.assertQueryBudget(
+            reverse('posts:post_edit', args=(self.post.id,)),
+            client=self.author_client
+        )
+
+    def test_write_views_fit_budget(self):
+        self.assertQueryBudget(
+            reverse('posts:add_comment', args=(self.post.id,)),
+            client=self.reader_client, method='post',
+            data={'text': 'budget comment'}
+        )
+        stranger = Client()
+        stranger.force_login(self.stranger)
+        self.assertQueryBudget(
+            reverse('posts:profile_follow', args=(self.author.username,)),
+            client=stranger
+        )
+        self.assertQueryBudget(
+            reverse('posts:profile_unfollow', args=(self.author.username,)),
+            client=stranger
+        )
+
+    def test_budget_violation_is_reported(self):
+        with self.assertRaises(QueryBudgetExceeded):
+            with query_budget(1):
+                list(Post.objects.all())
+                list(Group.objects.all())
@@ -0,0 +1,102 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from .. import recommendations
+from ..models import Follow, Post, Recommendation
+
+User = get_user_model()
+
+
+class RecommendationsTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.users = {
+            name: User.objects.create_user(username=name)
+            for name in ('reader', 'twin', 'shared', 'hidden', 'niche',
+                         'lonely')
+        }
+        for name in ('shared', 'hidden', 'niche'):
+            Post.objects.create(author=self.users[name], text=name)
+        self.follow('reader', 'shared')
+        self.follow('twin', 'shared')
+        self.follow('twin', 'hidden')
+        self.follow('twin', 'niche')
+        self.follow('niche', 'hidden')
+
+    def follow(self, user, author):
+        Follow.objects.create(user=self.users[user],
+                              author=self.users[author])
+
+    def suggested(self, name):
+        return list(Recommendation.objects.filter(
+            user=self.users[name]
+        ).order_by('rank').values_list('author__username', flat=True))
+
+    def test_co_follow_ranking_excludes_followed_and_self(self):
+        recommendations.build(
+            [user.pk for user in self.users.values()], top=5
+        )
+        self.assertEqual(self.suggested('reader'), ['hidden', 'niche'])
+        self.assertNotIn('twin', self.suggested('twin'))
+
+    def test_users_without_follows_get_popular_authors(self):
+        recommendations.build([self.users['lonely'].pk], top=2)
+        self.assertEqual(self.suggested('lonely'), ['shared', 'hidden'])
+
+    def test_rebuild_replaces_previous_rows(self):
+        reader = self.users['reader'].pk
+        recommendations.build([reader], top=5)
+        self.follow('reader', 'hidden')
+        recommendations.build([reader], top=5)
+        self.assertEqual(self.suggested('reader'), ['niche'])
+
+    def test_command_with_worker_processes(self):
+        call_command('build_recommendations', workers=2, chunk_size=2,
+                     stdout=open('/dev/null', 'w'))
+        self.assertEqual(self.suggested('reader'), ['hidden', 'niche'])
+
+    def test_follow_index_shows_fresh_recommendations(self):
+        recommendations.build([self.users['reader'].pk], top=5)
+        self.client.force_login(self.users['reader'])
+        response = self.client.get(reverse('posts:follow_index'))
+        self.assertEqual(
+            [row.author.username
+             for row in response.context['recommendations']],
+            ['hidden', 'niche']
+        )
+        self.client.get(reverse('posts:profile_follow', args=['hidden']))
+        response = self.client.get(reverse('posts:follow_index'))
+        self.assertEqual(
+            [row.author.username
+             for row in response.context['recommendations']],
+            ['niche']
+        )
+        self.assertContains(response, 'Кого почитать')
+
+    def test_hub_readers_are_sampled_not_lowest_ids(self):
+        pairs = [(reader, 1) for reader in range(2, 1002)]
+        graph = recommendations.FollowGraph(pairs, max_neighbours=10)
+        sampled = graph.followers[1]
+        self.assertEqual(len(sampled), 10)
+        self.assertNotEqual(sorted(sampled), list(range(2, 12)))
+        self.assertGreater(max(sampled), 500)
+        self.assertEqual(
+            recommendations.FollowGraph(pairs, max_neighbours=10)
+            .followers[1],
+            sampled
+        )
+
+    def test_connection_is_closed_before_fork(self):
+        with mock.patch.object(recommendations, 'connection') as connection:
+            connection.in_atomic_block = False
+            recommendations.build(
+                [user.pk for user in self.users.values()], top=5,
+                workers=2, chunk_size=2
+            )
+        connection.close.assert_called_once_with()
+        self.assertEqual(self.suggested('reader'), ['hidden', 'niche'])
@@ -0,0 +1,91 @@
+from importlib import import_module
+from types import SimpleNamespace
+
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from .. import search
+from ..models import Comment, Post, SearchTerm
+from ..query_plans import explain
+
+User = get_user_model()
+
+
+class SearchContract:
+    """Одни и те же проверки для FTS5 и для запасного бэкенда."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='search_user')
+        cls.in_text = Post.objects.create(author=cls.user,
+                                          text='Кракен всплыл у берега')
+        cls.in_comment = Post.objects.create(author=cls.user,
+                                             text='Обычный пост')
+        Comment.objects.create(post=cls.in_comment, author=cls.user,
+                               text='Там был кракен')
+        Post.objects.create(author=cls.user, text='Ничего интересного')
+
+    def test_post_text_ranks_above_comment(self):
+        response = self.client.get(reverse('posts:search'), {'q': 'кракен'})
+        self.assertEqual(list(response.context['page_obj']),
+                         [self.in_text, self.in_comment])
+
+    def test_all_words_must_match_and_prefixes_work(self):
+        results = search.SearchResults('кракен берег')
+        self.assertEqual(list(results[:10]), [self.in_text])
+
+    def test_index_follows_edit_and_delete(self):
+        post = Post.objects.create(author=self.user, text='левиафан')
+        self.assertEqual(search.SearchResults('левиафан').count(), 1)
+        post.text = 'кит'
+        post.save()
+        self.assertEqual(search.SearchResults('левиафан').count(), 0)
+        post.delete()
+        self.assertEqual(search.SearchResults('кит').count(), 0)
+
+    def test_api_search(self):
+        data = self.client.get(reverse('posts:api_search'),
+                               {'q': 'кракен'}).json()
+        self.assertEqual(data['count'], 2)
+        self.assertEqual(data['results'][0]['id'], self.in_text.id)
+
+    def test_admin_uses_index(self):
+        admin = User.objects.create_superuser('search_admin', 'a@a.ru', 'x')
+        self.client.force_login(admin)
+        response = self.client.get(reverse('admin:posts_post_changelist'),
+                                   {'q': 'кракен'})
+        self.assertEqual(
+            set(response.context['cl'].result_list),
+            {self.in_text, self.in_comment}
+        )
+
+
+@override_settings(SEARCH_BACKEND='fts5')
+class Fts5SearchTest(SearchContract, TestCase):
+    pass
+
+
+@override_settings(SEARCH_BACKEND='python')
+class PythonSearchTest(SearchContract, TestCase):
+    def test_one_indexed_query_per_word(self):
+        search.SearchResults('прогрев').count()
+        backend = search.PythonBackend()
+        with self.assertNumQueries(2):
+            backend.count('кракен берег')
+        plan = '\n'.join(explain(backend._prefixed('крак')))
+        self.assertIn('search_term_idx (term>? AND term<?)', plan)
+
+    def test_migration_backfills_terms_without_fts(self):
+        backfill = import_module(
+            'posts.migrations.0014_backfill_search_terms'
+        ).backfill_search_terms
+        SearchTerm.objects.all().delete()
+        schema_editor = SimpleNamespace(
+            connection=SimpleNamespace(vendor='postgresql')
+        )
+        backfill(apps, schema_editor)
+        results = search.SearchResults('кракен')
+        self.assertEqual(list(results[:10]), [self.in_text, self.in_comment])
@@ -0,0 +1,213 @@
+from datetime import timedelta
+from io import BytesIO, StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+from sorl.thumbnail import default
+from sorl.thumbnail.images import ImageFile
+
+from .. import images, thumbnails
+from ..media_gc import Collector
+from ..models import Post, ThumbnailJob
+from .utils import SMALL_GIF, TempMediaTestCase
+
+User = get_user_model()
+
+
+class ThumbnailPipelineTest(TempMediaTestCase):
+    def setUp(self):
+        cache.clear()
+        default.kvstore.clear()
+        self.user = User.objects.create_user(username='thumb_author')
+        self.client.force_login(self.user)
+
+    def create_post(self, upload=None):
+        self.client.post(reverse('posts:post_create'), {
+            'text': 'с картинкой',
+            'image': upload or SimpleUploadedFile('small.gif', SMALL_GIF,
+                                                  content_type='image/gif')
+        })
+        return Post.objects.get(author=self.user)
+
+    @staticmethod
+    def png(size):
+        buffer = BytesIO()
+        Image.new('RGB', size, 'red').save(buffer, 'PNG')
+        return SimpleUploadedFile('big.png', buffer.getvalue(),
+                                  content_type='image/png')
+
+    def test_upload_queues_job_and_falls_back_to_original(self):
+        post = self.create_post()
+        self.assertFalse(post.thumbnails_ready)
+        job = ThumbnailJob.objects.get(post=post)
+        self.assertEqual(job.status, ThumbnailJob.PENDING)
+        response = self.client.get(reverse('posts:post_detail',
+                                           args=(post.id,)))
+        self.assertContains(response, post.image.url)
+
+    def test_worker_generates_thumbnails(self):
+        post = self.create_post()
+        job = ThumbnailJob.objects.get(post=post)
+        self.assertTrue(thumbnails.process(job.pk))
+        self.assertFalse(thumbnails.process(job.pk))
+        post.refresh_from_db()
+        self.assertTrue(post.thumbnails_ready)
+        job.refresh_from_db()
+        self.assertEqual(job.status, ThumbnailJob.DONE)
+        response = self.client.get(reverse('posts:post_detail',
+                                           args=(post.id,)))
+        self.assertContains(response, '/cache/')
+
+    def test_upload_records_dimensions_from_header(self):
+        post = self.create_post()
+        self.assertEqual((post.image_width, post.image_height), (2, 1))
+        response = self.client.get(reverse('posts:post_detail',
+                                           args=(post.id,)))
+        self.assertContains(response, 'width="2" height="1"')
+
+    @override_settings(IMAGE_MAX_PIXELS=100)
+    def test_oversized_upload_is_rejected(self):
+        response = self.client.post(reverse('posts:post_create'), {
+            'text': 'огромная', 'image': self.png((20, 10))
+        })
+        self.assertFormError(response, 'form', 'image',
+                             'Картинка 20x10 слишком большая')
+        self.assertFalse(Post.objects.exists())
+
+    @override_settings(IMAGE_MAX_SIDE=40, IMAGE_FORMAT='WEBP')
+    def test_worker_downscales_and_converts_original(self):
+        post = self.create_post(self.png((100, 50)))
+        original = post.image.name
+        job = ThumbnailJob.objects.get(post=post)
+        self.assertTrue(thumbnails.process(job.pk))
+        post.refresh_from_db()
+        self.assertTrue(post.image.name.endswith('.webp'))
+        self.assertEqual((post.image_width, post.image_height), (40, 20))
+        with Image.open(post.image.path) as image:
+            self.assertEqual((image.format, image.size), ('WEBP', (40, 20)))
+        job.refresh_from_db()
+        self.assertEqual(job.image, post.image.name)
+        # старый оригинал убирает сборщик мусора, а не воркер
+        self.assertTrue(post.image.storage.exists(original))
+        Collector(post.image.storage, min_age=0).run()
+        self.assertFalse(post.image.storage.exists(original))
+        self.assertTrue(post.image.storage.exists(post.image.name))
+
+    @override_settings(IMAGE_FORMAT='JPEG')
+    def test_jpeg_fallback_and_animation_kept(self):
+        post = self.create_post()
+        thumbnails.process(ThumbnailJob.objects.get(post=post).pk)
+        post.refresh_from_db()
+        self.assertTrue(post.image.name.endswith('.jpg'))
+        self.assertTrue(post.thumbnails_ready)
+
+        buffer = BytesIO()
+        frames = [Image.new('P', (4, 4), color) for color in (1, 2)]
+        frames[0].save(buffer, 'GIF', save_all=True,
+                       append_images=frames[1:])
+        post.delete()
+        post = self.create_post(SimpleUploadedFile(
+            'anim.gif', buffer.getvalue(), content_type='image/gif'
+        ))
+        original = post.image.name
+        thumbnails.process(ThumbnailJob.objects.get(post=post).pk)
+        post.refresh_from_db()
+        self.assertEqual(post.image.name, original)
+
+    @override_settings(THUMBNAIL_CLAIM_TIMEOUT=60, THUMBNAIL_MAX_ATTEMPTS=2)
+    def test_abandoned_job_is_reclaimed(self):
+        post = self.create_post()
+        job = ThumbnailJob.objects.get(post=post)
+        self.assertTrue(thumbnails.claim(job.pk))
+        self.assertFalse(thumbnails.claim(job.pk))
+        self.assertNotIn(job.pk, thumbnails.pending_jobs())
+        # воркер умер, не отчитавшись
+        ThumbnailJob.objects.filter(pk=job.pk).update(
+            claimed=timezone.now() - timedelta(minutes=2)
+        )
+        self.assertIn(job.pk, thumbnails.pending_jobs())
+        self.assertTrue(thumbnails.process(job.pk))
+        post.refresh_from_db()
+        self.assertTrue(post.thumbnails_ready)
+
+        job = ThumbnailJob.objects.create(post=post, image=post.image.name,
+                                          status=ThumbnailJob.RUNNING,
+                                          attempts=2)
+        self.assertFalse(thumbnails.claim(job.pk))
+        job.refresh_from_db()
+        self.assertEqual(job.status, ThumbnailJob.FAILED)
+
+    def test_backfill_queues_images_without_dimensions(self):
+        post = self.create_post()
+        ThumbnailJob.objects.all().delete()
+        Post.objects.filter(pk=post.pk).update(image_width=None,
+                                               thumbnails_ready=True)
+        self.assertEqual(thumbnails.backfill(), 1)
+        self.assertEqual(thumbnails.backfill(), 0)
+        thumbnails.process(ThumbnailJob.objects.get(post=post).pk)
+        post.refresh_from_db()
+        self.assertEqual(post.image_width, 2)
+
+    @override_settings(IMAGE_VARIANTS={'card': {
+        'geometry': (100, 50), 'widths': (20, 40, 80, 200),
+        'sizes': '50vw',
+    }, 'detail': {
+        'geometry': (100, 50), 'widths': (40,), 'sizes': '100vw',
+    }}, IMAGE_VARIANT_FORMATS=('WEBP', 'JPEG'), IMAGE_MAX_SIDE=1000)
+    def test_worker_builds_variant_manifest(self):
+        post = self.create_post(self.png((100, 60)))
+        thumbnails.process(ThumbnailJob.objects.get(post=post).pk)
+        post.refresh_from_db()
+        manifest = images.load_variants(post)
+        self.assertEqual(set(manifest), {'card', 'detail'})
+        self.assertEqual(list(manifest['card']), ['WEBP', 'JPEG'])
+        # шире оригинала не режется
+        self.assertEqual(
+            [(width, height) for _, width, height
+             in manifest['card']['JPEG']],
+            [(20, 10), (40, 20), (80, 40)]
+        )
+        name = manifest['card']['WEBP'][0][0]
+        self.assertTrue(name.endswith('.webp'))
+        self.assertTrue(post.image.storage.exists(name))
+
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, 'type="image/webp"')
+        self.assertContains(response, f'/media/{name} 20w')
+        self.assertContains(response, 'sizes="50vw"')
+        self.assertContains(response, 'width="80" height="40"')
+
+    def test_new_upload_resets_manifest(self):
+        post = self.create_post()
+        thumbnails.process(ThumbnailJob.objects.get(post=post).pk)
+        post.refresh_from_db()
+        self.assertTrue(post.image_variants)
+        self.client.post(reverse('posts:post_edit', args=(post.id,)), {
+            'text': 'новая картинка', 'image': self.png((10, 10))
+        })
+        post.refresh_from_db()
+        self.assertIsNone(post.image_variants)
+        self.assertFalse(post.thumbnails_ready)
+
+    def test_warm_fills_kvstore_from_manifest(self):
+        post = self.create_post()
+        thumbnails.process(ThumbnailJob.objects.get(post=post).pk)
+        post.refresh_from_db()
+        default.kvstore.clear()
+        name, width, height = images.load_variants(post)['card']['JPEG'][0]
+        post.image.storage.delete(name)
+        # размеры из манифеста: файл миниатюры не нужен
+        self.assertGreater(thumbnails.warm(post), 0)
+        cached = default.kvstore.get(ImageFile(name, default.storage))
+        self.assertEqual(cached.size, [width, height])
+        self.assertEqual(thumbnails.warm(post), 0)
+        default.kvstore.clear()
+        out = StringIO()
+        call_command('warm_thumbnails', posts=10, stdout=out)
+        self.assertIn('Постов: 1', out.getvalue())
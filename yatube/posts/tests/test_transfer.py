@@ -0,0 +1,117 @@
+import json
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from .. import search, transfer
+from ..models import (Comment, Follow, Group, Post, Profile,
+                      TimelineEntry)
+
+User = get_user_model()
+
+
+class TransferTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.tmp_dir = tempfile.mkdtemp()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(cls.tmp_dir, ignore_errors=True)
+
+    def setUp(self):
+        self.author = User.objects.create_user(username='dump_author')
+        self.reader = User.objects.create_user(username='dump_reader')
+        self.group = Group.objects.create(title='Группа', slug='dump',
+                                          description='Описание')
+        self.posts = [
+            Post.objects.create(author=self.author, group=self.group,
+                                text=f'Выгрузка {number}')
+            for number in range(5)
+        ]
+        self.old_date = timezone.now() - timedelta(days=30)
+        Post.objects.filter(pk=self.posts[0].pk).update(
+            pub_date=self.old_date
+        )
+        Comment.objects.create(post=self.posts[0], author=self.reader,
+                               text='Комментарий к выгрузке')
+        Follow.objects.create(user=self.reader, author=self.author)
+
+    def dump(self, name='dump.ndjson.gz'):
+        path = os.path.join(self.tmp_dir, name)
+        call_command('export_content', path, stdout=open(os.devnull, 'w'))
+        return path
+
+    def load(self, path, *args):
+        call_command('import_content', path, *args,
+                     stdout=open(os.devnull, 'w'))
+
+    def wipe(self):
+        Post.objects.all().delete()
+        Group.objects.all().delete()
+        Follow.objects.all().delete()
+
+    def test_round_trip_restores_rows_and_derived_state(self):
+        path = self.dump()
+        self.wipe()
+        self.load(path, '--batch-size', '2')
+        self.assertEqual(Post.objects.count(), 5)
+        self.assertEqual(Post.objects.get(pk=self.posts[0].pk).pub_date,
+                         self.old_date)
+        self.assertEqual(
+            Post.objects.get(pk=self.posts[0].pk).comment_count, 1
+        )
+        self.assertEqual(
+            Profile.objects.get(user=self.author).post_count, 5
+        )
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=self.reader).count(), 5
+        )
+        self.assertEqual(search.SearchResults('комментарий').count(), 1)
+        self.assertFalse(os.path.exists(f'{path}.checkpoint'))
+
+    def test_import_resumes_after_checkpoint(self):
+        path = self.dump('dump.ndjson')
+        Post.objects.all().delete()
+        done = sorted(post.pk for post in self.posts)[:3]
+        with open(f'{path}.checkpoint', 'w') as stream:
+            json.dump({'posts.post': done[-1]}, stream)
+        self.load(path, '--models', 'post', '--skip-rebuild')
+        self.assertEqual(
+            sorted(Post.objects.values_list('pk', flat=True)),
+            sorted(post.pk for post in self.posts)[3:]
+        )
+
+    def test_export_is_one_json_object_per_line(self):
+        path = self.dump('dump.ndjson')
+        with open(path, encoding='utf-8') as stream:
+            models = [json.loads(line)['model'] for line in stream]
+        self.assertEqual(
+            models,
+            ['posts.group'] + ['posts.post'] * 5
+            + ['posts.comment', 'posts.follow']
+        )
+
+    def test_rows_already_present_are_not_counted(self):
+        path = self.dump('dump.ndjson')
+        Post.objects.filter(pk__in=[post.pk for post in self.posts[:2]]
+                            ).delete()
+        kept = Post.objects.get(pk=self.posts[4].pk)
+        with open(path, encoding='utf-8') as stream:
+            importer = transfer.Importer(
+                100, transfer.Checkpoint(None), models=[Post]
+            )
+            loaded = importer.run(transfer.read_records(stream))
+        self.assertEqual(loaded, {'posts.post': 2})
+        self.assertEqual(Post.objects.get(pk=self.posts[0].pk).pub_date,
+                         self.old_date)
+        self.assertEqual(Post.objects.get(pk=kept.pk).updated, kept.updated)
+        self.assertTrue(Post._meta.get_field('pub_date').auto_now_add)
@@ -1,11 +1,16 @@
+from unittest import mock
+
 from django import forms
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
-from django.test import Client, TestCase
+from django.test import Client, TestCase, override_settings
 from django.urls import reverse
+from django.utils import timezone
 
-from ..models import Group, Post, Follow
+from .. import feed_cache
+from ..conditional import feed_validators
+from ..models import Comment, Group, Post, Follow, TimelineEntry
 
 User = get_user_model()
 
@@ -163,19 +168,40 @@ class PostViewsTest(TestCase):
         response_1 = (
             PostViewsTest.authorized_user.get(reverse('posts:index')))
         old_content = response_1.content
+        response_2 = (
+            PostViewsTest.authorized_user.get(reverse('posts:index')))
+        self.assertEqual(response_2.content, old_content)
         Post.objects.create(
             text='test cache index page',
             author=self.user,
             group=self.group
         )
-        response_2 = (
-            PostViewsTest.authorized_user.get(reverse('posts:index')))
-        self.assertEqual(response_2.content, old_content)
-        cache.clear()
         response_3 = (
             PostViewsTest.authorized_user.get(reverse('posts:index')))
         self.assertNotEqual(response_3.content, old_content)
 
+    def test_index_cache_serves_stale_while_locked(self):
+        cache.clear()
+        old_content = PostViewsTest.guest_user.get(
+            reverse('posts:index')).content
+        Post.objects.create(text='fresh post', author=self.user)
+        cache.add('index_page:first:lock', 'busy', 10)
+        response = PostViewsTest.guest_user.get(reverse('posts:index'))
+        self.assertEqual(response.content, old_content)
+        cache.delete('index_page:first:lock')
+        response = PostViewsTest.guest_user.get(reverse('posts:index'))
+        self.assertContains(response, 'fresh post')
+
+    def test_index_cache_ignores_unrelated_query(self):
+        cache.set('index_page:first',
+                  (feed_cache.get_version('index_page'), 'cached feed'))
+        for query in ({'utm_source': 'mail'}, {'page': '1', 'ref': 'x'},
+                      {'page': 'junk'}, {'cursor': 'junk'}):
+            with self.subTest(query=query):
+                response = PostViewsTest.guest_user.get(
+                    reverse('posts:index'), query)
+                self.assertContains(response, 'cached feed')
+
     def test_follow_index_uses_correct_context(self):
         for obj, post_obj in PostViewsTest.index_obj_list.items():
             with self.subTest(obj=obj):
@@ -263,3 +289,239 @@ class PaginatorViewsTest(TestCase):
                 response = (PaginatorViewsTest.auth_user.
                             get(reversed_names + '?page=2'))
                 self.assertEqual(len(response.context['page_obj']), posts)
+
+
+@override_settings(PAGINATION_MODES={'index': 'keyset'})
+class KeysetPaginatorViewsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='keyset_user')
+        objs = [
+            Post(text=f'keyset {i}', author=cls.user)
+            for i in range(15)
+        ]
+        Post.objects.bulk_create(objs)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_keyset_pages_walk_whole_feed(self):
+        response = self.client.get(reverse('posts:index'))
+        first_page = response.context['page_obj']
+        self.assertEqual(len(first_page), settings.POSTS_PER_PAGE)
+        self.assertFalse(first_page.has_previous())
+        self.assertTrue(first_page.has_next())
+        response = self.client.get(
+            reverse('posts:index'), {'cursor': first_page.next_cursor})
+        second_page = response.context['page_obj']
+        self.assertEqual(len(second_page), 15 - settings.POSTS_PER_PAGE)
+        self.assertFalse(second_page.has_next())
+        seen = {post.id for post in first_page} | {
+            post.id for post in second_page}
+        self.assertEqual(len(seen), 15)
+        response = self.client.get(
+            reverse('posts:index'), {'cursor': second_page.previous_cursor})
+        self.assertEqual(
+            [post.id for post in response.context['page_obj']],
+            [post.id for post in first_page]
+        )
+
+    def test_broken_cursor_returns_first_page(self):
+        response = self.client.get(reverse('posts:index'),
+                                   {'cursor': 'garbage'})
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.context['page_obj'].has_previous())
+
+
+class TimelineTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='timeline_author')
+        cls.reader = User.objects.create_user(username='timeline_reader')
+        cls.reader_client = Client()
+        cls.reader_client.force_login(cls.reader)
+        cls.old_post = Post.objects.create(author=cls.author,
+                                           text='old post')
+
+    def test_follow_backfills_and_unfollow_prunes(self):
+        self.reader_client.get(reverse('posts:profile_follow',
+                                       args=(self.author.username,)))
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.reader, post=self.old_post).exists())
+        self.reader_client.get(reverse('posts:profile_unfollow',
+                                       args=(self.author.username,)))
+        self.assertFalse(TimelineEntry.objects.filter(
+            user=self.reader).exists())
+
+    def test_new_post_fans_out_to_followers(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        new_post = Post.objects.create(author=self.author, text='new post')
+        response = self.reader_client.get(reverse('posts:follow_index'))
+        self.assertEqual(response.context['page_obj'][0], new_post)
+        self.assertEqual(len(response.context['page_obj']), 2)
+
+
+class PostCardCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='card_author')
+        cls.group = Group.objects.create(title='cards', slug='cards',
+                                         description='cards')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+        self.post = Post.objects.create(author=self.user, group=self.group,
+                                        text='card before edit')
+        self.group_url = reverse('posts:group_list', args=(self.group.slug,))
+
+    def test_card_is_served_from_cache(self):
+        self.client.get(self.group_url)
+        Post.objects.filter(pk=self.post.pk).update(text='silent change')
+        self.assertContains(self.client.get(self.group_url),
+                            'card before edit')
+
+    def test_edit_invalidates_card(self):
+        self.client.get(self.group_url)
+        self.client.post(
+            reverse('posts:post_edit', args=(self.post.id,)),
+            {'text': 'card after edit', 'group': self.group.id}
+        )
+        self.assertContains(self.client.get(self.group_url),
+                            'card after edit')
+
+    def test_comment_invalidates_card(self):
+        self.client.get(self.group_url)
+        Post.objects.filter(pk=self.post.pk).update(text='silent change')
+        self.client.post(reverse('posts:add_comment', args=(self.post.id,)),
+                         {'text': 'comment'})
+        self.assertContains(self.client.get(self.group_url), 'silent change')
+
+
+class ConditionalGetTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='etag_user')
+        cls.post = Post.objects.create(author=cls.user, text='etag post')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def assertRevalidates(self, url, change):
+        etag = self.client.get(url)['ETag']
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        change()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_feeds_revalidate_on_new_post(self):
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:profile', args=(self.user.username,)),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertRevalidates(url, lambda: Post.objects.create(
+                    author=self.user, text='another etag post'))
+
+    def test_post_detail_revalidates_on_comment(self):
+        self.assertRevalidates(
+            reverse('posts:post_detail', args=(self.post.id,)),
+            lambda: self.client.post(
+                reverse('posts:add_comment', args=(self.post.id,)),
+                {'text': 'etag comment'})
+        )
+
+    def test_revalidate_on_comments_in_same_instant(self):
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:post_detail', args=(self.post.id,)),
+        )
+        # оба комментария получают одно время, updated не меняется
+        with mock.patch('django.utils.timezone.now',
+                        return_value=timezone.now()):
+            for text in ('first', 'second'):
+                etags = {url: self.client.get(url)['ETag'] for url in urls}
+                self.client.post(
+                    reverse('posts:add_comment', args=(self.post.id,)),
+                    {'text': text})
+                for url, etag in etags.items():
+                    with self.subTest(url=url, comment=text):
+                        response = self.client.get(
+                            url, HTTP_IF_NONE_MATCH=etag)
+                        self.assertEqual(response.status_code, 200)
+
+    def test_feed_validators_skip_database(self):
+        with self.assertNumQueries(0):
+            feed_validators(reverse('posts:index'), self.user.pk)
+
+    def test_validators_depend_on_user(self):
+        url = reverse('posts:index')
+        etag = self.client.get(url)['ETag']
+        self.client.logout()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+
+@override_settings(COMMENTS_PER_PAGE=3)
+class CommentChunksTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.post = Post.objects.create(
+            author=User.objects.create_user(username='chunk_author'),
+            text='busy post'
+        )
+        cls.comments = [
+            Comment.objects.create(
+                post=cls.post,
+                author=User.objects.create_user(username=f'chunk_{i}'),
+                text=f'comment {i}'
+            )
+            for i in range(8)
+        ]
+
+    def setUp(self):
+        cache.clear()
+
+    def test_post_detail_shows_first_chunk_oldest_first(self):
+        response = self.client.get(
+            reverse('posts:post_detail', args=(self.post.id,)))
+        page = response.context['comments']
+        self.assertEqual(list(page), self.comments[:3])
+        self.assertContains(response, page.next_cursor)
+
+    def test_json_chunks_walk_whole_thread(self):
+        url = reverse('posts:api_comments', args=(self.post.id,))
+        seen, cursor = [], ''
+        while True:
+            with self.assertNumQueries(2):
+                data = self.client.get(url, {'cursor': cursor}).json()
+            seen += [comment['id'] for comment in data['results']]
+            cursor = data['next']
+            if cursor is None:
+                break
+        self.assertEqual(seen, [comment.id for comment in self.comments])
+        self.assertEqual(data['results'][-1]['author'], 'chunk_7')
+
+    def test_cursor_link_opens_next_page(self):
+        url = reverse('posts:post_detail', args=(self.post.id,))
+        first = self.client.get(url).context['comments']
+        second = self.client.get(
+            url, {'comments': first.next_cursor}).context['comments']
+        self.assertEqual(list(second), self.comments[3:6])
+        self.assertTrue(second.has_previous())
+        back = self.client.get(
+            url, {'comments': second.previous_cursor}).context['comments']
+        self.assertEqual(list(back), self.comments[:3])
+
+    def test_unknown_post_is_404(self):
+        response = self.client.get(
+            reverse('posts:api_comments', args=(self.post.id + 100,)))
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,41 @@
+import os
+import shutil
+import tempfile
+
+from django.test import TestCase, override_settings
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+class TempMediaTestCase(TestCase):
+    """
+    MEDIA_ROOT и файл метаданных sorl на время класса - во временном
+    каталоге системы, после класса каталог удаляется. Воркеры миниатюр
+    выключены, задания тесты выполняют сами.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp_dir = tempfile.mkdtemp()
+        cls.media_root = os.path.join(cls.tmp_dir, 'media')
+        cls._media_settings = override_settings(
+            MEDIA_ROOT=cls.media_root,
+            THUMBNAIL_KVSTORE_PATH=os.path.join(cls.tmp_dir,
+                                                'thumbnails.sqlite3'),
+            THUMBNAIL_WORKERS=0
+        )
+        cls._media_settings.enable()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls._media_settings.disable()
+        shutil.rmtree(cls.tmp_dir, ignore_errors=True)
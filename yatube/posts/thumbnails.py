@@ -0,0 +1,208 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.images import ImageFile
+
+from . import feed_cache, images
+from .models import Post, ThumbnailJob
+
+logger = logging.getLogger('yatube.thumbnails')
+
+# {% thumbnail %} шаблонов для постов без манифеста вариантов
+LEGACY_GEOMETRIES = [
+    ('980x400', {'crop': 'center', 'upscale': True}),
+    ('960x339', {'crop': 'center', 'upscale': True}),
+]
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.THUMBNAIL_WORKERS,
+                thread_name_prefix='thumbnails'
+            )
+        return _executor
+
+
+def schedule(post):
+    """
+    Ставит нарезку миниатюр в очередь после коммита.
+    До готовности шаблоны показывают исходную картинку.
+    """
+    Post.objects.filter(pk=post.pk).update(thumbnails_ready=False,
+                                           image_variants=None)
+    post.thumbnails_ready = False
+    post.image_variants = None
+    if not post.image:
+        return None
+    job = ThumbnailJob.objects.create(post=post, image=post.image.name)
+    if settings.THUMBNAIL_WORKERS:
+        transaction.on_commit(
+            lambda: _get_executor().submit(_run_in_thread, job.pk)
+        )
+    return job
+
+
+def _run_in_thread(job_pk):
+    close_old_connections()
+    try:
+        process(job_pk)
+    except Exception:
+        logger.exception('Задание %s упало', job_pk)
+    finally:
+        close_old_connections()
+
+
+def _abandoned():
+    """
+    Задания в работе, чей воркер не отчитался за THUMBNAIL_CLAIM_TIMEOUT;
+    у взятых до появления claimed времени нет вовсе.
+    """
+    expired = timezone.now() - timedelta(
+        seconds=settings.THUMBNAIL_CLAIM_TIMEOUT
+    )
+    return Q(status=ThumbnailJob.RUNNING) & (
+        Q(claimed__lt=expired) | Q(claimed__isnull=True)
+    )
+
+
+def claim(job_pk):
+    """
+    Забирает задание, если его ещё не взял другой воркер или если
+    взявший его воркер умер. Брошенное задание без оставшихся попыток
+    помечается FAILED: скорее всего, его картинка и роняет воркер.
+    """
+    jobs = ThumbnailJob.objects.filter(pk=job_pk)
+    jobs.filter(
+        _abandoned(), attempts__gte=settings.THUMBNAIL_MAX_ATTEMPTS
+    ).update(status=ThumbnailJob.FAILED, error='Воркер не отчитался')
+    return jobs.filter(Q(status=ThumbnailJob.PENDING) | _abandoned()).update(
+        status=ThumbnailJob.RUNNING, attempts=F('attempts') + 1,
+        claimed=timezone.now()
+    )
+
+
+def _normalize(job, post):
+    """
+    Ужимает оригинал и переключает пост на новый файл, если картинку
+    за это время не заменили. Возвращает False, если заменили.
+    Ставший ненужным файл не удаляется: его имя под хэшем могла
+    только что получить такая же загрузка, пост которой ещё
+    не закоммичен. Его уберёт collect_media_garbage, когда файл
+    постареет.
+    """
+    storage = post.image.storage
+    name, width, height = images.normalize(job.image, storage)
+    updated = Post.objects.filter(pk=post.pk, image=job.image).update(
+        image=name, image_width=width, image_height=height,
+        updated=timezone.now()
+    )
+    post.image_width, post.image_height = width, height
+    if name == job.image or not updated:
+        return bool(updated)
+    post.image.name = job.image = name
+    job.save(update_fields=['image'])
+    return True
+
+
+def process(job_pk):
+    """
+    Ужимает оригинал и нарезает варианты из IMAGE_VARIANTS
+    для одного задания; манифест вариантов сохраняется в пост.
+    """
+    if not claim(job_pk):
+        return False
+    job = ThumbnailJob.objects.select_related('post').get(pk=job_pk)
+    post = job.post
+    try:
+        current = (post.image.name == job.image
+                   and _normalize(job, post))
+        if current:
+            manifest = images.build_variants(post.image, post.image_width)
+    except Exception as error:
+        job.error = repr(error)
+        job.status = (ThumbnailJob.PENDING
+                      if job.attempts < settings.THUMBNAIL_MAX_ATTEMPTS
+                      else ThumbnailJob.FAILED)
+        job.save(update_fields=['status', 'error'])
+        raise
+    if not current:
+        # картинку уже заменили, этим займётся более новое задание
+        job.status = ThumbnailJob.DONE
+        job.save(update_fields=['status'])
+        return True
+    Post.objects.filter(pk=post.pk, image=job.image).update(
+        thumbnails_ready=True, image_variants=images.dump_variants(manifest),
+        updated=timezone.now()
+    )
+    feed_cache.bump_version('index_page')
+    job.status = ThumbnailJob.DONE
+    job.save(update_fields=['status'])
+    return True
+
+
+def backfill():
+    """
+    Ставит в очередь картинки, загруженные до обработки оригиналов
+    или без манифеста вариантов. Пока задание не выполнено, шаблоны
+    показывают то же, что и раньше, поэтому thumbnails_ready
+    не сбрасывается. Посты с заданием в очереди или в работе
+    пропускаются: повторный запуск не дублирует работу.
+    """
+    jobs = [
+        ThumbnailJob(post_id=post_id, image=name)
+        for post_id, name in Post.objects.filter(
+            Q(image_width__isnull=True) | Q(image_variants__isnull=True)
+        ).exclude(image='').exclude(thumbnail_jobs__status__in=(
+            ThumbnailJob.PENDING, ThumbnailJob.RUNNING
+        )).values_list('pk', 'image').iterator()
+    ]
+    ThumbnailJob.objects.bulk_create(jobs, batch_size=500)
+    return len(jobs)
+
+
+def pending_jobs():
+    return ThumbnailJob.objects.filter(
+        Q(status=ThumbnailJob.PENDING) | _abandoned()
+    ).values_list('pk', flat=True)
+
+
+def warm(post):
+    """
+    Записывает в хранилище ключей sorl метаданные картинки поста.
+    Размеры берутся из поста и манифеста, файлы не открываются;
+    для постов без манифеста миниатюры шаблонов режутся, если их нет.
+    Возвращает число записанных ключей.
+    """
+    kvstore = default.kvstore
+    source = ImageFile(post.image)
+    if post.image_width:
+        source.set_size([post.image_width, post.image_height])
+    kvstore.get_or_set(source)
+    written = 0
+    manifest = images.load_variants(post)
+    if not manifest:
+        for geometry, options in LEGACY_GEOMETRIES:
+            get_thumbnail(post.image, geometry, **options)
+        return len(LEGACY_GEOMETRIES)
+    for formats in manifest.values():
+        for entries in formats.values():
+            for name, width, height in entries:
+                thumbnail = ImageFile(name, default.storage)
+                if kvstore.get(thumbnail) is None:
+                    thumbnail.set_size([width, height])
+                    kvstore.set(thumbnail, source)
+                    written += 1
+    return written
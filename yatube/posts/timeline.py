@@ -0,0 +1,55 @@
+from itertools import islice
+
+from django.conf import settings
+
+from .models import Follow, Post, TimelineEntry
+
+
+def _bulk_insert(entries):
+    """Вставляет записи пачками, не держа в памяти всю ленту."""
+    entries = iter(entries)
+    batch = list(islice(entries, settings.TIMELINE_BATCH_SIZE))
+    while batch:
+        TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True)
+        batch = list(islice(entries, settings.TIMELINE_BATCH_SIZE))
+
+
+def fan_out_post(post):
+    """Раскладывает новый пост в ленты всех подписчиков автора."""
+    follower_ids = (Follow.objects.filter(author_id=post.author_id)
+                    .values_list('user_id', flat=True)
+                    .iterator(chunk_size=settings.TIMELINE_BATCH_SIZE))
+    _bulk_insert(
+        TimelineEntry(user_id=user_id, post=post, pub_date=post.pub_date)
+        for user_id in follower_ids
+    )
+
+
+def backfill(user_id, author_id):
+    """Дописывает в ленту читателя уже опубликованные посты автора."""
+    posts = (Post.objects.filter(author_id=author_id)
+             .values_list('id', 'pub_date')
+             .iterator(chunk_size=settings.TIMELINE_BATCH_SIZE))
+    _bulk_insert(
+        TimelineEntry(user_id=user_id, post_id=post_id, pub_date=pub_date)
+        for post_id, pub_date in posts
+    )
+
+
+def prune(user_id, author_id):
+    """Убирает посты автора из ленты отписавшегося читателя."""
+    TimelineEntry.objects.filter(
+        user_id=user_id, post__author_id=author_id
+    ).delete()
+
+
+def rebuild():
+    """Дописывает в ленты все недостающие посты по текущим подпискам."""
+    rows = (Follow.objects.filter(author__posts__isnull=False)
+            .values_list('user_id', 'author__posts__id',
+                         'author__posts__pub_date')
+            .iterator(chunk_size=settings.TIMELINE_BATCH_SIZE))
+    _bulk_insert(
+        TimelineEntry(user_id=user_id, post_id=post_id, pub_date=pub_date)
+        for user_id, post_id, pub_date in rows
+    )
@@ -0,0 +1,222 @@
+import datetime
+import gzip
+import json
+import os
+import time
+
+from django.core.management.color import no_style
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+from django.db.models import Case, Value, When
+
+from . import counters, feed_cache, follow_graph, search, timeline
+from .models import Comment, Follow, Group, Post
+
+DATES_CHUNK = 100
+
+# порядок важен: при импорте строки ссылаются только на уже загруженное
+MODELS = {
+    'group': Group,
+    'post': Post,
+    'comment': Comment,
+    'follow': Follow,
+}
+
+
+class DumpEncoder(DjangoJSONEncoder):
+    """Даты целиком, с микросекундами: DjangoJSONEncoder режет их до мс."""
+
+    def default(self, o):
+        if isinstance(o, (datetime.datetime, datetime.time)):
+            return o.isoformat()
+        return super().default(o)
+
+
+def open_dump(path, mode):
+    """Открывает дамп как текст; файлы *.gz читаются и пишутся через gzip."""
+    if path.endswith('.gz'):
+        return gzip.open(path, f'{mode}t', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+
+def _fields(model):
+    return [field for field in model._meta.concrete_fields
+            if not field.primary_key]
+
+
+def export_model(stream, model, chunk_size):
+    """Пишет таблицу построчно в NDJSON, по порядку первичного ключа."""
+    fields = _fields(model)
+    rows = (model.objects.order_by('pk')
+            .values_list('pk', *(field.attname for field in fields))
+            .iterator(chunk_size=chunk_size))
+    label = model._meta.label_lower
+    written = 0
+    for pk, *values in rows:
+        stream.write(json.dumps(
+            {
+                'model': label,
+                'pk': pk,
+                'fields': {field.name: value
+                           for field, value in zip(fields, values)},
+            },
+            cls=DumpEncoder, ensure_ascii=False
+        ))
+        stream.write('\n')
+        written += 1
+    return written
+
+
+def read_records(stream):
+    """Разбирает строки дампа, пропуская пустые."""
+    for number, line in enumerate(stream, 1):
+        if line.strip():
+            try:
+                yield json.loads(line)
+            except ValueError as error:
+                raise ValueError(f'строка {number}: {error}')
+
+
+def build_object(model, record):
+    obj = model(pk=model._meta.pk.to_python(record['pk']))
+    for field in _fields(model):
+        if field.name in record['fields']:
+            setattr(obj, field.attname,
+                    field.to_python(record['fields'][field.name]))
+    return obj
+
+
+def _date_fields(model):
+    return [field for field in model._meta.concrete_fields
+            if getattr(field, 'auto_now', False)
+            or getattr(field, 'auto_now_add', False)]
+
+
+def restore_dates(model, dates):
+    """
+    bulk_create вызывает pre_save, и auto_now/auto_now_add затирают
+    даты из дампа. Они возвращаются UPDATE с CASE по id; dates -
+    [(pk, {поле: дата})]. Пачками, чтобы не упереться в лимит
+    параметров запроса SQLite.
+    """
+    fields = _date_fields(model)
+    for start in range(0, len(dates), DATES_CHUNK):
+        chunk = dates[start:start + DATES_CHUNK]
+        model.objects.filter(pk__in=[pk for pk, _ in chunk]).update(**{
+            field.attname: Case(
+                *(When(pk=pk, then=Value(values[field.attname],
+                                         output_field=field))
+                  for pk, values in chunk),
+                output_field=field
+            )
+            for field in fields
+        })
+
+
+class Checkpoint:
+    """
+    Последний загруженный id по каждой модели. Пишется после
+    каждой пачки, поэтому прерванный импорт продолжается с места обрыва.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.last_ids = {}
+        if path and os.path.exists(path):
+            with open(path, encoding='utf-8') as stream:
+                self.last_ids = json.load(stream)
+
+    def is_done(self, label, pk):
+        return pk <= self.last_ids.get(label, 0)
+
+    def save(self, label, pk):
+        self.last_ids[label] = pk
+        if not self.path:
+            return
+        tmp_path = f'{self.path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as stream:
+            json.dump(self.last_ids, stream)
+        os.replace(tmp_path, self.path)
+
+    def remove(self):
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class Importer:
+    """Загружает NDJSON пачками через bulk_create."""
+
+    def __init__(self, batch_size, checkpoint, models=None, report=None):
+        self.batch_size = batch_size
+        self.checkpoint = checkpoint
+        self.models = {model._meta.label_lower: model
+                       for model in (models or MODELS.values())}
+        self.report = report or (lambda label, loaded, elapsed: None)
+        self.loaded = dict.fromkeys(self.models, 0)
+        self.skipped = 0
+        self._started = {}
+
+    def run(self, records):
+        label, batch = None, []
+        for record in records:
+            if record.get('model') not in self.models:
+                self.skipped += 1
+                continue
+            if record['model'] != label:
+                self._flush(label, batch)
+                label, batch = record['model'], []
+            if self.checkpoint.is_done(label, record['pk']):
+                self.skipped += 1
+                continue
+            batch.append(build_object(self.models[label], record))
+            if len(batch) >= self.batch_size:
+                self._flush(label, batch)
+                batch = []
+        self._flush(label, batch)
+        self._reset_sequences()
+        return self.loaded
+
+    def _flush(self, label, batch):
+        if not batch:
+            return
+        model = self.models[label]
+        self._started.setdefault(label, time.monotonic())
+        # pre_save в bulk_create перепишет даты в самих объектах
+        dates = [(obj.pk, {field.attname: getattr(obj, field.attname)
+                           for field in _date_fields(model)})
+                 for obj in batch]
+        rows = model.objects.filter(pk__in=[pk for pk, _ in dates])
+        with transaction.atomic():
+            existing = set(rows.values_list('pk', flat=True))
+            model.objects.bulk_create(batch, ignore_conflicts=True)
+            # ignore_conflicts молча пропускает строки, которые уже есть
+            inserted = set(rows.values_list('pk', flat=True)) - existing
+            if dates[0][1]:
+                restore_dates(model, [(pk, values) for pk, values in dates
+                                      if pk in inserted])
+        self.checkpoint.save(label, batch[-1].pk)
+        self.loaded[label] += len(inserted)
+        self.report(label, self.loaded[label],
+                    time.monotonic() - self._started[label])
+
+    def _reset_sequences(self):
+        # pk пришли из дампа; без сброса PostgreSQL выдаст занятые id
+        models = [self.models[label] for label, loaded in self.loaded.items()
+                  if loaded]
+        statements = connection.ops.sequence_reset_sql(no_style(), models)
+        if statements:
+            with connection.cursor() as cursor:
+                for sql in statements:
+                    cursor.execute(sql)
+
+
+def rebuild_derived():
+    """
+    bulk_create не шлёт сигналов: счётчики, ленты подписок,
+    поисковый индекс и кэши восстанавливаются здесь.
+    """
+    counters.recount()
+    follow_graph.reset()
+    timeline.rebuild()
+    search.rebuild()
+    feed_cache.bump_version('index_page')
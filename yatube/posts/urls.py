@@ -13,9 +13,18 @@ urlpatterns = [
          views.add_comment, name='add_comment'),
     path('posts/<int:post_id>/edit/', views.post_edit, name='post_edit'),
     path('follow/', views.follow_index, name='follow_index'),
+    path('search/', views.search, name='search'),
     path('profile/<str:username>/follow/', views.profile_follow,
          name='profile_follow'),
     path('profile/<str:username>/unfollow/', views.profile_unfollow,
          name='profile_unfollow'),
-    path('api/v1/posts/<int:post_id>/', views.get_post, name='get_post')
+    path('api/v1/posts/<int:post_id>/', views.get_post, name='get_post'),
+    path('api/v1/posts/<int:post_id>/comments/', views.api_comments,
+         name='api_comments'),
+    path('api/v1/posts/', views.api_index, name='api_index'),
+    path('api/v1/group/<slug:slug>/', views.api_group, name='api_group'),
+    path('api/v1/profile/<str:username>/', views.api_profile,
+         name='api_profile'),
+    path('api/v1/follow/', views.api_follow, name='api_follow'),
+    path('api/v1/search/', views.api_search, name='api_search')
 ]
@@ -1,79 +1,149 @@
 from django.conf import settings
 from django.core.paginator import Paginator
-from django.http import JsonResponse
+from django.http import Http404, JsonResponse
+from django.utils.http import urlencode
 from django.shortcuts import get_object_or_404, redirect, render
 from django.contrib.auth.decorators import login_required
-from django.views.decorators.cache import cache_page
-from .serializers import PostSerializer
+from django.template.loader import render_to_string
+from django.utils.functional import SimpleLazyObject
+from . import (comment_buffer, counters, feed_cache, follow_graph,
+               recommendations, thumbnails)
+from .conditional import (feed_validators, make_validators, not_modified,
+                          render_conditional, set_validators)
+from .serializers import (CommentListSerializer, PostListSerializer,
+                          PostSerializer)
 from .forms import CommentForm, PostForm
-from .models import Group, Post, User, Follow
+from .models import Comment, Follow, Group, Post, User
+from .paginators import InvalidCursor, KeysetPaginator, decode_cursor
+from .search import SearchResults
 
 
-@cache_page(20, key_prefix='index_page')
 def index(request):
-    """Вьюшка для главной страницы."""
+    """
+    Вьюшка для главной страницы.
+    HTML ленты берётся из кэша по поколению; пока он свежий,
+    page_obj остаётся ленивым и в базу не ходим.
+    """
     template = 'posts/index.html'
-    post_list = Post.objects.select_related('group', 'author').all()
-    page_obj = pagination(
+    post_list = Post.objects.for_list()
+    page_obj = SimpleLazyObject(lambda: pagination(
         request,
         post_list,
         settings.POSTS_PER_PAGE
-    )
-    context = {
-        'page_obj': page_obj,
-        'index': True
-    }
-    return render(request, template, context)
+    ))
+
+    def get_context():
+        feed = feed_cache.get_or_render(
+            'index_page',
+            page_key(request),
+            lambda: render_to_string(
+                'includes/index_feed.html', {'page_obj': page_obj}, request
+            )
+        )
+        return {
+            'page_obj': page_obj,
+            'feed': feed,
+            'index': True
+        }
+    validators = feed_validators(request.get_full_path(), request.user.pk)
+    return render_conditional(request, validators, template, get_context)
 
 
 def group_post(request, slug):
     """Вьюшка для страницы групп."""
     group = get_object_or_404(Group, slug=slug)
-    post_list = group.posts.all()
-    page_obj = pagination(
-        request,
-        post_list,
-        settings.POSTS_PER_PAGE
-    )
+    post_list = group.posts.for_list()
     template = 'posts/group_list.html'
-    context = {
-        'group': group,
-        'page_obj': page_obj
-    }
-    return render(request, template, context)
+
+    def get_context():
+        page_obj = pagination(
+            request,
+            post_list,
+            settings.POSTS_PER_PAGE
+        )
+        return {
+            'group': group,
+            'page_obj': page_obj
+        }
+    validators = feed_validators(
+        request.get_full_path(), request.user.pk,
+        group.title, group.description
+    )
+    return render_conditional(request, validators, template, get_context)
 
 
 def profile(request, username):
     """Вьюшка для страницы пользователя."""
-    author = get_object_or_404(User, username=username)
-    author_posts_list = author.posts.all()
-    following = False
-    if request.user.is_authenticated:
-        following = Follow.objects.filter(user=request.user,
-                                          author=author).exists()
-    page_obj = pagination(
-        request,
-        author_posts_list,
-        settings.POSTS_PER_PAGE
+    author = get_object_or_404(
+        User.objects.select_related('profile'),
+        username=username
     )
-    context = {
-        'author': author,
-        'page_obj': page_obj,
-        'following': following
-    }
-    return render(request, 'posts/profile.html', context)
+    author_posts_list = author.posts.for_list()
+    following = follow_graph.follows(request.user, author)
+    profile = counters.profile_of(author)
+
+    def get_context():
+        page_obj = pagination(
+            request,
+            author_posts_list,
+            settings.POSTS_PER_PAGE
+        )
+        return {
+            'author': author,
+            'page_obj': page_obj,
+            'following': following
+        }
+    validators = feed_validators(
+        request.get_full_path(), request.user.pk,
+        following, profile.follower_count, profile.following_count
+    )
+    return render_conditional(
+        request, validators, 'posts/profile.html', get_context
+    )
+
+
+def comments_page(post_id, cursor):
+    """
+    Пачка комментариев от старых к новым по курсору (created, id),
+    авторы подтягиваются тем же запросом.
+    """
+    paginator = KeysetPaginator(
+        Comment.objects.filter(post_id=post_id).select_related('author'),
+        settings.COMMENTS_PER_PAGE,
+        date_field='created',
+        descending=False
+    )
+    return paginator.get_page(cursor)
 
 
 def post_detail(request, post_id):
     """Вьюшка для стриницы отдельного поста."""
-    post = get_object_or_404(Post, id=post_id)
-    comments = post.comments.all()
-    context = {
-        'post': post,
-        'form': CommentForm(),
-        'comments': comments
-    }
-    return render(request, 'posts/post_detail.html', context)
+    post = get_object_or_404(Post.objects.for_list(), id=post_id)
+    cursor = request.GET.get('comments')
+    # буфер читается раньше комментариев из базы, см. pending_comments
+    pending = comment_buffer.pending_entries(post.pk, request.user)
+
+    def get_context():
+        comments = comments_page(post.pk, cursor)
+        if not comments.has_next():
+            # свои комментарии из буфера записи видны автору сразу
+            comments.object_list += comment_buffer.pending_comments(
+                pending, request.user, comments.object_list
+            )
+        return {
+            'post': post,
+            'form': CommentForm(),
+            'comments': comments
+        }
+    # updated сдвигается и правкой поста, и новым комментарием,
+    # но двум комментариям за одно мгновение одной даты мало
+    validators = make_validators(
+        post.updated, post.comment_count, request.user.pk, cursor,
+        comment_buffer.pending_token(pending)
+    )
+    return render_conditional(
+        request, validators, 'posts/post_detail.html', get_context
+    )
 
 
 @login_required
@@ -85,14 +155,16 @@ def post_create(request):
     form = PostForm(request.POST, files=request.FILES or None)
     if form.is_valid():
         form.instance.author = request.user
-        form.save()
+        post = form.save()
+        if 'image' in form.changed_data:
+            thumbnails.schedule(post)
         return redirect('posts:profile', request.user)
     return render(request, 'posts/create_post.html', {'form': form})
 
 
 def post_edit(request, post_id):
     post = get_object_or_404(Post, pk=post_id)
-    if post.author != request.user:
+    if post.author_id != request.user.id:
         return redirect('posts:post_detail', post_id=post_id)
 
     form = PostForm(
@@ -101,7 +173,9 @@ def post_edit(request, post_id):
         instance=post
     )
     if form.is_valid():
-        form.save()
+        post = form.save()
+        if 'image' in form.changed_data:
+            thumbnails.schedule(post)
         return redirect('posts:post_detail', post_id=post_id)
     context = {
         'post': post,
@@ -111,8 +185,41 @@ def post_edit(request, post_id):
     return render(request, 'posts/create_post.html', context)
 
 
+def pagination_mode(request):
+    """Режим пагинации (offset или keyset) по имени url."""
+    url_name = getattr(request.resolver_match, 'url_name', None)
+    return settings.PAGINATION_MODES.get(url_name, 'offset')
+
+
+def page_key(request):
+    """
+    Ключ страницы ленты в кэше: только курсор или номер страницы,
+    которые и правда читает пагинация. Прочие параметры, мусор
+    и первая страница дают 'first'.
+    """
+    if pagination_mode(request) == 'keyset':
+        cursor = request.GET.get('cursor', '')
+        try:
+            decode_cursor(cursor)
+        except InvalidCursor:
+            return 'first'
+        return f'cursor:{cursor}'
+    try:
+        number = int(request.GET.get('page', 1))
+    except ValueError:
+        return 'first'
+    return f'page:{number}' if number > 1 else 'first'
+
+
 def pagination(request, posts_list, pages_on_screen):
-    """Отдельный метод для пагинации."""
+    """
+    Отдельный метод для пагинации.
+    Режим (offset или keyset) выбирается по имени url
+    в settings.PAGINATION_MODES.
+    """
+    if pagination_mode(request) == 'keyset':
+        paginator = KeysetPaginator(posts_list, pages_on_screen)
+        return paginator.get_page(request.GET.get('cursor'))
     paginator = Paginator(posts_list, pages_on_screen)
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
@@ -121,8 +228,17 @@ def pagination(request, posts_list, pages_on_screen):
 
 @login_required
 def add_comment(request, post_id):
-    post = get_object_or_404(Post, id=post_id)
     form = CommentForm(request.POST or None)
+    if comment_buffer.enabled():
+        # запись уйдёт фоновому потоку пачкой; пост, удалённый
+        # до записи, отсеется там же
+        if not Post.objects.filter(pk=post_id).exists():
+            raise Http404('Пост не найден')
+        if form.is_valid():
+            comment_buffer.enqueue(post_id, request.user,
+                                   form.cleaned_data['text'])
+        return redirect('posts:post_detail', post_id=post_id)
+    post = get_object_or_404(Post, id=post_id)
     if form.is_valid():
         comment = form.save(commit=False)
         comment.author = request.user
@@ -133,7 +249,9 @@ def add_comment(request, post_id):
 
 @login_required
 def follow_index(request):
-    post_list = Post.objects.filter(author__following__user=request.user)
+    post_list = Post.objects.for_list().filter(
+        timeline__user=request.user
+    ).order_by('-timeline__pub_date')
     page_obj = pagination(
         request,
         post_list,
@@ -141,7 +259,8 @@ def follow_index(request):
     )
     context = {
         'page_obj': page_obj,
-        'follow': True
+        'follow': True,
+        'recommendations': recommendations.for_user(request.user)
     }
     return render(request, 'posts/follow.html', context)
 
@@ -165,6 +284,104 @@ def profile_unfollow(request, username):
 
 def get_post(request, post_id):
     post = get_object_or_404(Post, id=post_id)
-    serializer = PostSerializer(post)
-    response = JsonResponse(data=serializer.data)
-    return response
+    etag, last_modified = make_validators(post.updated, post.comment_count)
+    response = not_modified(request, etag, last_modified)
+    if response is None:
+        serializer = PostSerializer(post)
+        response = JsonResponse(data=serializer.data)
+    return set_validators(response, etag, last_modified)
+
+
+def api_feed(request, post_list, *validator_extra):
+    """Общая часть списочных API: валидаторы, курсор, JSON."""
+    etag, last_modified = feed_validators(
+        request.GET.get('cursor'), *validator_extra
+    )
+    response = not_modified(request, etag, last_modified)
+    if response is None:
+        paginator = KeysetPaginator(post_list, settings.POSTS_PER_PAGE)
+        page = paginator.get_page(request.GET.get('cursor'))
+        response = JsonResponse({
+            'results': PostListSerializer(page, many=True).data,
+            'next': page.next_cursor,
+            'previous': page.previous_cursor
+        })
+    return set_validators(response, etag, last_modified)
+
+
+def api_comments(request, post_id):
+    """Следующая пачка комментариев для бесконечной прокрутки."""
+    post = get_object_or_404(
+        Post.objects.only('updated', 'comment_count'), pk=post_id
+    )
+    cursor = request.GET.get('cursor')
+    etag, last_modified = make_validators(post.updated, post.comment_count,
+                                          cursor)
+    response = not_modified(request, etag, last_modified)
+    if response is None:
+        page = comments_page(post.pk, cursor)
+        response = JsonResponse({
+            'results': CommentListSerializer(page, many=True).data,
+            'next': page.next_cursor,
+            'previous': page.previous_cursor
+        })
+    return set_validators(response, etag, last_modified)
+
+
+def api_index(request):
+    return api_feed(request, Post.objects.for_list())
+
+
+def api_group(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+    return api_feed(request, group.posts.for_list())
+
+
+def api_profile(request, username):
+    author = get_object_or_404(User, username=username)
+    return api_feed(request, author.posts.for_list())
+
+
+def api_follow(request):
+    if not request.user.is_authenticated:
+        return JsonResponse(
+            {'detail': 'Учетные данные не были предоставлены.'}, status=401
+        )
+    post_list = Post.objects.for_list().filter(timeline__user=request.user)
+    # подписки и отписки меняют ленту, не трогая сами посты
+    return api_feed(
+        request, post_list, request.user.pk,
+        sorted(follow_graph.following_ids(request.user.pk))
+    )
+
+
+def search_page(request):
+    """Страница из ранжированной выдачи поиска, None без запроса."""
+    query = request.GET.get('q', '').strip()
+    if not query:
+        return query, None
+    paginator = Paginator(SearchResults(query), settings.POSTS_PER_PAGE)
+    return query, paginator.get_page(request.GET.get('page'))
+
+
+def search(request):
+    """Вьюшка поиска по постам и комментариям."""
+    query, page_obj = search_page(request)
+    context = {
+        'query': query,
+        'page_obj': page_obj,
+        'extra_query': urlencode({'q': query})
+    }
+    return render(request, 'posts/search.html', context)
+
+
+def api_search(request):
+    query, page_obj = search_page(request)
+    if page_obj is None:
+        return JsonResponse({'detail': 'Пустой запрос.'}, status=400)
+    return JsonResponse({
+        'results': PostListSerializer(page_obj, many=True).data,
+        'count': page_obj.paginator.count,
+        'page': page_obj.number,
+        'num_pages': page_obj.paginator.num_pages
+    })
@@ -0,0 +1,29 @@
+import os
+
+from django.core.exceptions import ImproperlyConfigured
+
+# Окружение задаётся явно: DJANGO_SETTINGS_MODULE=yatube.settings.<имя>
+# или DJANGO_SETTINGS_MODULE=yatube.settings и YATUBE_ENV=<имя>.
+# dev - отладочные инструменты и DEBUG, prod - только то, что нужно сайту,
+# test - prod без общего кэша и файлов работающего сайта (pytest.ini,
+# manage.py test)
+ENVIRONMENTS = ('dev', 'prod', 'test')
+
+_module = os.environ.get('DJANGO_SETTINGS_MODULE', '')
+if _module.startswith(f'{__name__}.'):
+    ENVIRONMENT = _module[len(__name__) + 1:]
+else:
+    ENVIRONMENT = os.environ.get('YATUBE_ENV')
+if ENVIRONMENT not in ENVIRONMENTS:
+    raise ImproperlyConfigured(
+        f'Задайте YATUBE_ENV ({", ".join(ENVIRONMENTS)}) или '
+        f'DJANGO_SETTINGS_MODULE={__name__}.<окружение>, '
+        f'сейчас окружение: {ENVIRONMENT!r}'
+    )
+
+if ENVIRONMENT == 'dev':
+    from .dev import *  # noqa: F401,F403
+elif ENVIRONMENT == 'prod':
+    from .prod import *  # noqa: F401,F403
+else:
+    from .test import *  # noqa: F401,F403
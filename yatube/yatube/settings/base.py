@@ -0,0 +1,344 @@
+"""
+Django settings for yatube project: common part.
+
+Generated by 'django-admin startproject' using Django 2.2.19.
+Environment-specific settings live in dev.py and prod.py,
+yatube/settings/__init__.py picks one of them by YATUBE_ENV.
+
+For more information on this file, see
+https://docs.djangoproject.com/en/2.2/topics/settings/
+
+For the full list of settings and their values, see
+https://docs.djangoproject.com/en/2.2/ref/settings/
+"""
+
+import os
+
+# Build paths inside the project like this: os.path.join(BASE_DIR, ...)
+BASE_DIR = os.path.dirname(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+)
+
+
+# Quick-start development settings - unsuitable for production
+# See https://docs.djangoproject.com/en/2.2/howto/deployment/checklist/
+
+# SECURITY WARNING: keep the secret key used in production secret!
+SECRET_KEY = 'h89@ps^kc6gp399xw_jr#=rs@zqzq6&(qwxk!jsa+x!waf_n5g'
+
+# SECURITY WARNING: don't run with debug turned on in production!
+DEBUG = False
+
+
+ALLOWED_HOSTS = [
+    'amnazarov.ddns.net',
+    '51.250.107.160'
+    'localhost',
+    '127.0.0.1',
+    '[::1]',
+    'testserver',
+    'www.armennazarov.pythonanywhere.com',
+    'armennazarov.pythonanywhere.com'
+]
+
+
+# Application definition
+
+INSTALLED_APPS = [
+    'django.contrib.admin',
+    'django.contrib.auth',
+    'django.contrib.contenttypes',
+    'django.contrib.sessions',
+    'django.contrib.messages',
+    'django.contrib.staticfiles',
+    'posts.apps.PostsConfig',
+    'users.apps.UsersConfig',
+    'core.apps.CoreConfig',
+    'about.apps.AboutConfig',
+    'sorl.thumbnail',
+    'rest_framework'
+]
+
+MIDDLEWARE = [
+    'core.middleware.PerfMiddleware',
+    'django.middleware.security.SecurityMiddleware',
+    'django.contrib.sessions.middleware.SessionMiddleware',
+    'django.middleware.common.CommonMiddleware',
+    'django.middleware.csrf.CsrfViewMiddleware',
+    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'django.contrib.messages.middleware.MessageMiddleware',
+    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.middleware.QueryBudgetMiddleware'
+]
+
+ROOT_URLCONF = 'yatube.urls'
+
+TEMPLATES = [
+    {
+        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'DIRS': [os.path.join(BASE_DIR, 'templates')],
+        'APP_DIRS': True,
+        'OPTIONS': {
+            'context_processors': [
+                'django.template.context_processors.debug',
+                'django.template.context_processors.request',
+                'django.contrib.auth.context_processors.auth',
+                'django.contrib.messages.context_processors.messages',
+                'core.context_processors.year.year'
+            ],
+        },
+    },
+]
+
+WSGI_APPLICATION = 'yatube.wsgi.application'
+
+
+# Database
+# https://docs.djangoproject.com/en/2.2/ref/settings/#databases
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+    }
+}
+
+
+AUTH_PASSWORD_VALIDATORS = [
+    {
+        'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.CommonPasswordValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.NumericPasswordValidator',
+    },
+]
+
+
+# Internationalization
+# https://docs.djangoproject.com/en/2.2/topics/i18n/
+
+LANGUAGE_CODE = 'ru'
+
+TIME_ZONE = 'UTC'
+
+USE_I18N = True
+
+USE_L10N = True
+
+USE_TZ = True
+
+
+# Static files (CSS, JavaScript, Images)
+# https://docs.djangoproject.com/en/2.2/howto/static-files/
+
+STATIC_URL = '/static/'
+STATIC_ROOT = os.path.join(BASE_DIR, 'static/')
+# STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
+
+MEDIA_URL = '/media/'
+MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+# картинки постов лежат под хэшем содержимого: одинаковые загрузки
+# занимают один файл; миниатюры sorl пишутся по своим именам
+DEFAULT_FILE_STORAGE = 'core.storage.ContentAddressedStorage'
+CONTENT_ADDRESSED_PREFIXES = ('posts/',)
+
+LOGIN_URL = 'users:login'
+LOGIN_REDIRECT_URL = 'posts:index'
+
+
+EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
+
+
+# paginator posts per page
+POSTS_PER_PAGE = 10
+# комментариев на странице поста и в одной пачке api_comments
+COMMENTS_PER_PAGE = 50
+
+# режим пагинации по имени url: 'offset' (Paginator, ?page=)
+# или 'keyset' (курсор по pub_date и id, ?cursor=)
+PAGINATION_MODES = {
+    'index': 'offset',
+    'group_list': 'offset',
+    'profile': 'offset',
+    'follow_index': 'offset',
+}
+
+
+# размер пачки при раскладке постов по лентам подписчиков
+TIMELINE_BATCH_SIZE = 500
+
+
+# максимум SQL-запросов на вьюшку, считая сессию и пользователя;
+# проверяется тестами posts/tests/test_query_budget.py
+# и QueryBudgetMiddleware при DEBUG = True
+QUERY_BUDGETS = {
+    'posts:index': 5,
+    'posts:group_list': 6,
+    'posts:profile': 7,
+    'posts:post_detail': 5,
+    'posts:post_create': 3,
+    'posts:add_comment': 6,
+    'posts:post_edit': 4,
+    'posts:follow_index': 6,
+    'posts:profile_follow': 10,
+    'posts:profile_unfollow': 7,
+    'posts:get_post': 1,
+    'posts:api_comments': 2,
+    'posts:api_index': 2,
+    'posts:api_group': 3,
+    'posts:api_profile': 3,
+    'posts:api_follow': 4,
+    'posts:search': 5,
+    'posts:api_search': 3,
+}
+
+
+# адаптивные варианты картинки поста для srcset: пропорции кадра,
+# ширины и атрибут sizes. Режутся фоновым воркером сразу после загрузки
+# в каждом из IMAGE_VARIANT_FORMATS (WEBP пропускается без поддержки
+# в Pillow), шаблоны берут готовый манифест из поста
+IMAGE_VARIANTS = {
+    'card': {
+        'geometry': (980, 400),
+        'widths': (320, 640, 980, 1960),
+        'sizes': '(min-width: 768px) 75vw, 100vw',
+    },
+    'detail': {
+        'geometry': (960, 339),
+        'widths': (320, 640, 960, 1920),
+        'sizes': '(min-width: 992px) 960px, 100vw',
+    },
+}
+IMAGE_VARIANT_FORMATS = ('WEBP', 'JPEG')
+# метаданные миниатюр sorl: отдельный файл SQLite на хост, перед ним
+# LRU на LRU_SIZE ключей в каждом процессе; при старте в LRU поднимаются
+# PRELOAD последних ключей, manage.py warm_thumbnails заполняет файл
+# для WARM_POSTS свежих постов
+THUMBNAIL_KVSTORE = 'core.thumbnail_kvstore.SQLiteKVStore'
+THUMBNAIL_KVSTORE_PATH = os.environ.get(
+    'YATUBE_THUMBNAIL_KVSTORE_PATH',
+    os.path.join(BASE_DIR, 'thumbnails.sqlite3')
+)
+THUMBNAIL_KVSTORE_LRU_SIZE = 20000
+THUMBNAIL_KVSTORE_PRELOAD = 5000
+THUMBNAIL_WARM_POSTS = 500
+# потоков в процессе веб-сервера; 0 - только manage.py thumbnail_worker
+THUMBNAIL_WORKERS = 2
+THUMBNAIL_MAX_ATTEMPTS = 3
+# задание в работе дольше стольких секунд считается брошенным
+# (воркер умер) и забирается заново
+THUMBNAIL_CLAIM_TIMEOUT = 10 * 60
+
+# загрузки крупнее мегабайта Django пишет во временный файл, а не в память
+FILE_UPLOAD_MAX_MEMORY_SIZE = 2 ** 20
+# проверяются в форме по заголовку картинки
+IMAGE_MAX_UPLOAD_SIZE = 20 * 2 ** 20
+IMAGE_MAX_PIXELS = 40_000_000
+# оригинал ужимается воркером миниатюр до IMAGE_MAX_SIDE по длинной
+# стороне и перекодируется в IMAGE_FORMAT (WEBP или JPEG)
+IMAGE_MAX_SIDE = 2048
+IMAGE_FORMAT = 'WEBP'
+IMAGE_QUALITY = 85
+# manage.py collect_media_garbage: не дольше MAX_SECONDS за запуск,
+# ссылки проверяются пачками по BATCH файлов, файлы моложе MIN_AGE
+# секунд не удаляются - их пост мог ещё не закоммититься
+MEDIA_GC_MAX_SECONDS = 60
+MEDIA_GC_BATCH = 500
+MEDIA_GC_MIN_AGE = 60 * 60
+
+# буфер записи комментариев: add_comment ставит комментарий в очередь,
+# фоновый поток пишет очередь пачками по BATCH раз в INTERVAL секунд;
+# THREAD = False - только явный comment_buffer.flush() (тесты)
+COMMENT_WRITE_BUFFER = os.environ.get('YATUBE_COMMENT_BUFFER') == '1'
+COMMENT_BUFFER_THREAD = True
+COMMENT_BUFFER_INTERVAL = 0.2
+COMMENT_BUFFER_BATCH = 200
+COMMENT_BUFFER_RETRIES = 3
+
+# поиск: 'fts5' (SQLite FTS5), 'python' (таблица SearchTerm) или 'auto';
+# после смены бэкенда нужен manage.py rebuild_search_index
+SEARCH_BACKEND = 'auto'
+# сколько лучших совпадений отдаётся поиску в админке
+SEARCH_ADMIN_LIMIT = 500
+
+# кого почитать: сколько авторов хранить и показывать на follow_index;
+# у автора-хаба для оценки берутся первые MAX_NEIGHBOURS читателей
+RECOMMENDATIONS_TOP = 20
+RECOMMENDATIONS_SHOWN = 5
+RECOMMENDATIONS_MAX_NEIGHBOURS = 1000
+
+# сколько живёт HTML ленты главной; актуальность держит счётчик
+# поколений, таймаут лишь ограничивает устаревший запас
+FEED_CACHE_TIMEOUT = 60 * 60
+# сколько живёт закэшированное множество подписок читателя; подписка
+# и отписка его сбрасывают, таймаут страхует от гонки с чтением
+FOLLOW_GRAPH_TIMEOUT = 60 * 10
+
+
+# общий кэш для всех воркеров, выбирается переменной окружения:
+# 'sqlite' - файл на одном хосте, 'redis' - нужен пакет redis,
+# 'locmem' - память одного процесса
+CACHE_BACKEND = os.environ.get('YATUBE_CACHE_BACKEND', 'sqlite')
+
+CACHE_PRESETS = {
+    'sqlite': {
+        'BACKEND': 'core.cache_backends.sqlite.SQLiteCache',
+        'LOCATION': os.environ.get(
+            'YATUBE_CACHE_PATH', os.path.join(BASE_DIR, 'cache.sqlite3')
+        ),
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+    'redis': {
+        'BACKEND': 'core.cache_backends.redis.RedisCache',
+        'LOCATION': os.environ.get(
+            'YATUBE_REDIS_URL', 'redis://127.0.0.1:6379/0'
+        ),
+        'OPTIONS': {'CLIENT_CLASS': 'redis.Redis'},
+    },
+    'locmem': {
+        'BACKEND': 'core.cache_backends.locmem.LocMemMetricsCache',
+    },
+}
+
+CACHES = {
+    'default': CACHE_PRESETS[CACHE_BACKEND]
+}
+
+
+CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
+
+
+# PerfMiddleware: JSON-строка на каждый запрос в логгер yatube.perf
+# и гистограммы по url этих пространств имён на /admin/perf/;
+# по умолчанию включена только в prod
+PERF_INSTRUMENTATION = os.environ.get('YATUBE_PERF') == '1'
+PERF_NAMESPACES = ('posts', 'users')
+PERF_FLUSH_EVERY = 50
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'bare': {'format': '%(message)s'},
+    },
+    'handlers': {
+        'perf': {
+            'class': 'logging.StreamHandler',
+            'formatter': 'bare',
+        },
+    },
+    'loggers': {
+        'yatube.perf': {
+            'handlers': ['perf'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
@@ -0,0 +1,16 @@
+from .base import *  # noqa: F401,F403
+from .base import INSTALLED_APPS, MIDDLEWARE
+
+DEBUG = True
+
+INSTALLED_APPS = INSTALLED_APPS + ['debug_toolbar']
+
+MIDDLEWARE = MIDDLEWARE[:]
+MIDDLEWARE.insert(
+    MIDDLEWARE.index('core.middleware.QueryBudgetMiddleware'),
+    'debug_toolbar.middleware.DebugToolbarMiddleware'
+)
+
+INTERNAL_IPS = ['127.0.0.1']
+
+THUMBNAIL_DEBUG = True
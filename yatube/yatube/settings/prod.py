@@ -0,0 +1,7 @@
+import os
+
+from .base import *  # noqa: F401,F403
+
+DEBUG = False
+
+PERF_INSTRUMENTATION = os.environ.get('YATUBE_PERF', '1') == '1'
@@ -0,0 +1,23 @@
+import os
+import tempfile
+
+from .prod import *  # noqa: F401,F403
+from .base import CACHE_PRESETS
+
+# cache.clear() в тестах не должен стирать поколения лент, подписки
+# и очередь комментариев работающего сайта
+CACHES = {
+    'default': CACHE_PRESETS['locmem']
+}
+
+# тесты, которые чистят хранилище ключей sorl, берут свой файл
+# в каталоге класса, остальные пишут сюда, а не в рабочий
+THUMBNAIL_KVSTORE_PATH = os.path.join(tempfile.gettempdir(),
+                                      'yatube-test-thumbnails.sqlite3')
+
+# JSON-строка на каждый запрос засыпала бы вывод тестов
+PERF_INSTRUMENTATION = False
+
+# фоновые потоки миниатюр переживали бы тест и гонялись с удалением
+# его временных каталогов; задания тесты выполняют сами
+THUMBNAIL_WORKERS = 0
@@ -2,7 +2,8 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
-import debug_toolbar
+
+from core.views import perf_stats
 
 
 handler404 = 'core.views.page_not_found'
@@ -11,6 +12,7 @@ handler403 = 'core.views.permission_denied'
 
 
 urlpatterns = [
+    path('admin/perf/', perf_stats, name='perf_stats'),
     path('admin/', admin.site.urls),
     path('', include('posts.urls', namespace='posts')),
     path('auth/', include('users.urls', namespace='users')),
@@ -23,4 +25,8 @@ if settings.DEBUG:
     urlpatterns += static(
         settings.MEDIA_URL, document_root=settings.MEDIA_ROOT
     )
+
+if 'debug_toolbar' in settings.INSTALLED_APPS:
+    import debug_toolbar
+
     urlpatterns += (path('__debug__/', include(debug_toolbar.urls)),)